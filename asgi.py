@@ -0,0 +1,90 @@
+import json
+import uuid
+import asyncio
+import logging
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app, log_sink, warm_up
+from chat_async import chat_turn_async, close_async_clients
+from http_client import close_outbound_clients
+
+# Every route except the async chat pipeline is served by the Flask app
+flask_application = WsgiToAsgi(app)
+
+async def read_body(receive):
+    """Read the full request body from an ASGI receive channel"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+async def send_json(send, status, data):
+    """Send a JSON response over an ASGI send channel"""
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def chat(scope, receive, send):
+    """Async /chat: many in-flight conversations share one worker process"""
+    try:
+        data = json.loads(await read_body(receive) or b'null')
+    except ValueError:
+        data = None
+    if not data or 'message' not in data:
+        await send_json(send, 400, {"error": "Mensagem não fornecida"})
+        return
+
+    # There is no Flask cookie session here; clients send the session_id they keep
+    session_id = data.get('session_id') or str(uuid.uuid4())
+
+    try:
+        ai_response, pix_job = await chat_turn_async(session_id, data['message'])
+    except Exception as e:
+        logging.error(f"Error in async chat endpoint: {e}")
+        await send_json(send, 500, {
+            "error": "Desculpe, ocorreu um erro interno. Tente novamente.",
+            "success": False
+        })
+        return
+
+    await send_json(send, 200, {
+        "response": ai_response,
+        "pix_job": pix_job,
+        "session_id": session_id,
+        "success": True
+    })
+
+async def lifespan(scope, receive, send):
+    """Handle ASGI lifespan events, closing shared clients on shutdown"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # A long-running server pays for database and client setup before the first request
+            await asyncio.to_thread(warm_up)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_clients()
+            close_outbound_clients()
+            log_sink.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """ASGI entry point: uvicorn asgi:application (or gunicorn -k uvicorn.workers.UvicornWorker)"""
+    if scope['type'] == 'lifespan':
+        await lifespan(scope, receive, send)
+    elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/chat':
+        await chat(scope, receive, send)
+    else:
+        await flask_application(scope, receive, send)
@@ -0,0 +1,115 @@
+"""Benchmark: bulk order import of large CSV and JSONL files through POST /orders/import.
+
+Writes files of N generated orders (about 5% with an invalid CPF, CEP,
+product or option) and streams each one as the request body, reading the
+NDJSON results as they come. Reports rows per second and the peak memory
+traced while importing (tracemalloc, in a second pass), for two file sizes:
+the peak should not grow with the file, since rows are read, priced and
+written one batch (BULK_IMPORT_BATCH_SIZE) at a time.
+
+Usage: python benchmarks/bench_bulk_import.py [rows] [small_rows]
+"""
+import os
+import csv
+import sys
+import json
+import time
+import random
+import tempfile
+import tracemalloc
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bulk.db')}"
+os.environ['BULK_IMPORT_TOKEN'] = 'benchmark'
+
+# (produto, tamanho, opções) as a customer's spreadsheet would spell them
+LINES = [
+    ("Livro Grampo (canoa)", "14x21", "Shrink Adicional"),
+    ("livro capa dura", "A5", "Laminação Fosco, Shrink Adicional"),
+    ("Livro Capa Couchê / Triplex", "16x23", "Colorido com orelha 8cm; Laminação Fosco"),
+    ("Livro Grampo", "20x20", "Somente frente"),
+    ("Livro Capa Dura", "14x21", ""),
+]
+INVALID = [
+    ("cpf", "111.111.111-11"),
+    ("cep", "123"),
+    ("produto", "Livro Inexistente"),
+    ("opcoes", "Laminação Xyz"),
+]
+CUSTOMER = {"nome": "Escola Estadual Modelo", "cpf": "529.982.247-25", "cep": "01310-100", "endereco": "Rua A, 100"}
+
+def generate_orders(count, seed=1):
+    rng = random.Random(seed)
+    for n in range(count):
+        produto, tamanho, opcoes = LINES[n % len(LINES)]
+        row = dict(CUSTOMER, produto=produto, tamanho=tamanho, opcoes=opcoes,
+                   quantidade=rng.randint(10, 500), paginas=rng.choice(("", 80, 120)))
+        if rng.random() < 0.05:
+            field, value = rng.choice(INVALID)
+            row[field] = value
+        yield row
+
+def write_csv(path, count):
+    columns = ["produto", "tamanho", "opcoes", "quantidade", "paginas", "nome", "cpf", "cep", "endereco"]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(columns)
+        for row in generate_orders(count):
+            writer.writerow([row[column] for column in columns])
+
+def write_jsonl(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in generate_orders(count):
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+def post_file(client, path, fmt, trace):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        response = client.post(
+            f'/orders/import?format={fmt}', input_stream=f, content_length=os.path.getsize(path),
+            headers={'Authorization': 'Bearer benchmark'}, content_type='application/octet-stream', buffered=False
+        )
+        summary = None
+        for chunk in response.response:
+            for line in chunk.decode('utf-8').splitlines():
+                result = json.loads(line)
+                if result.get('done'):
+                    summary = result
+        response.close()
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return summary, elapsed, peak
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    small_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    logging.disable(logging.WARNING)
+
+    import app as chat_app
+    import bulk_import
+    chat_app.init_database()
+    client = chat_app.app.test_client()
+    directory = tempfile.mkdtemp()
+
+    print(f"batch size {bulk_import.BULK_IMPORT_BATCH_SIZE} rows (one transaction each)")
+    print(f"  {'file':18} {'rows':>7} {'MiB':>6} {'imported':>8} {'rejected':>8} {'rows/s':>8} {'peak traced':>11}")
+    for fmt, write in (('csv', write_csv), ('jsonl', write_jsonl)):
+        for count in (small_rows, rows):
+            path = os.path.join(directory, f"orders-{count}.{fmt}")
+            write(path, count)
+            summary, elapsed, _ = post_file(client, path, fmt, trace=False)
+            _, _, peak = post_file(client, path, fmt, trace=True)
+            print(f"  {os.path.basename(path):18} {summary['rows']:7} {os.path.getsize(path) / 2**20:6.1f} "
+                  f"{summary['imported']:8} {summary['rejected']:8} {summary['rows'] / elapsed:8.0f} "
+                  f"{peak / 2**20:8.1f} MiB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: a mixed order of N products, as N separate orders and as one cart.
+
+Without a cart every product is its own conversation (product, name,
+CPF/CEP turns) and its own PIX charge. With the cart the customer names the
+products in one message (or adds them one turn at a time with "também
+quero ...") and completes the order once. The PIX gateway stub is slow; the
+script waits for every background charge and reports chat turns, gateway
+requests, the time until all charges were issued and the cart's total
+against the sum of the separate orders' totals (products, plus one freight).
+
+Usage: python benchmarks/bench_cart.py [products] [gateway_latency_s]
+"""
+import os
+import sys
+import time
+import tempfile
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cart.db')}"
+
+from stubs import FakeOpenAI, start_pix_stub
+
+# One line of a school's or self-publisher's mixed order each
+PRODUCTS = [
+    "100 livros grampo 14x21 com shrink",
+    "50 livros capa dura 14x21 com laminação fosca",
+    "30 livros grampo 21x29,7 com laminação brilho",
+    "200 livros grampo 20x20 com somente frente",
+    "80 livros capa dura 16x23 com laminação brilho",
+    "40 livros grampo 14x21 com laminação fosca",
+]
+CUSTOMER = ["Meu nome é João da Silva", "CPF 529.982.247-25, CEP 01310-100"]
+
+def wait_for_jobs(chat_app, session_ids):
+    from models import PixJob
+    with chat_app.app.app_context():
+        jobs = PixJob.query.filter(PixJob.session_id.in_(session_ids))
+        while jobs.filter(PixJob.status.in_(('pending', 'processing'))).count():
+            chat_app.db.session.rollback()
+            time.sleep(0.02)
+        jobs = jobs.all()
+        return [job.status for job in jobs], sum(float(job.valor) for job in jobs)
+
+def run(chat_app, pix_server, label, conversations):
+    client = chat_app.app.test_client()
+    requests_before = pix_server.requests
+    calls_before = chat_app.openai_client.calls
+    turns = 0
+    started = time.perf_counter()
+    for session_id, messages in conversations:
+        for message in messages:
+            client.post('/chat', json={'message': message, 'session_id': session_id})
+            turns += 1
+    statuses, charged = wait_for_jobs(chat_app, [session_id for session_id, _ in conversations])
+    elapsed = time.perf_counter() - started
+    return {
+        "label": label,
+        "turns": turns,
+        "openai_calls": chat_app.openai_client.calls - calls_before,
+        "gateway": pix_server.requests - requests_before,
+        "completed": statuses.count('completed'),
+        "charged": charged,
+        "elapsed": elapsed,
+    }
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    gateway_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    lines = [PRODUCTS[n % len(PRODUCTS)] for n in range(products)]
+    logging.disable(logging.WARNING)
+
+    pix_server, pix_url = start_pix_stub(gateway_latency)
+    os.environ['PIX_API_URL'] = pix_url
+
+    import app as chat_app
+    chat_app.openai_client = FakeOpenAI(0)
+    chat_app.init_database()
+
+    results = []
+    for label, conversations in (
+        ('separate', [(f"separate-{n}", [f"Quero {line}", *CUSTOMER]) for n, line in enumerate(lines)]),
+        ('cart', [("cart-message", [f"Quero {'; '.join(lines)}", *CUSTOMER])]),
+        ('cart-turns', [("cart-turns", [f"Quero {lines[0]}", *(f"também quero {line}" for line in lines[1:]), *CUSTOMER])]),
+    ):
+        results.append(run(chat_app, pix_server, label, conversations))
+
+    print(f"{products} products, gateway stub latency {gateway_latency * 1000:.0f} ms")
+    print(f"  {'':10} {'turns':>5} {'openai':>6} {'gateway':>7} {'charges':>7} {'charged R$':>10} {'until paid':>10}")
+    for result in results:
+        print(f"  {result['label']:10} {result['turns']:5} {result['openai_calls']:6} {result['gateway']:7} "
+              f"{result['completed']:7} {result['charged']:10.2f} {result['elapsed'] * 1000:8.0f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: cold start of the app with and without the catalog snapshot.
+
+Starts fresh interpreters (like a new serverless instance), each importing
+app.py and serving a first /chat turn (fake OpenAI client, SQLite), with the
+snapshot written by `python catalog.py` and with CATALOG_SNAPSHOT_PATH
+pointing nowhere (produtos.json parsed). Reports medians of process start to
+app imported, first turn, and catalog load alone (get_catalog() of a
+fresh process state, timed in-process after the imports).
+
+Usage: python benchmarks/bench_cold_start.py [runs]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def child():
+    started = time.perf_counter()
+    sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+    import app as chat_app
+    imported = time.perf_counter()
+
+    from stubs import FakeOpenAI
+    chat_app.openai_client = FakeOpenAI(0)
+    client = chat_app.app.test_client()
+    client.post('/chat', json={'message': 'quero 100 livros capa dura 14x21', 'session_id': f"cold-{time.time_ns()}"})
+    first_turn = time.perf_counter()
+
+    import catalog
+    loads = []
+    for _ in range(20):
+        # Dropped first: an unchanged version would otherwise keep the loaded catalog
+        catalog._catalog = None
+        load_started = time.perf_counter()
+        catalog.get_catalog(force=True)
+        loads.append(time.perf_counter() - load_started)
+
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "first_turn_ms": (first_turn - imported) * 1000,
+        "catalog_load_ms": statistics.median(loads) * 1000,
+    }))
+
+def run(runs, snapshot_path):
+    env = dict(os.environ, OPENAI_API_KEY='benchmark', CATALOG_SNAPSHOT_PATH=snapshot_path)
+    results = []
+    for n in range(runs):
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cold.db')}"
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, __file__, '--child'], env=env, capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        result["process_ms"] = (time.perf_counter() - started) * 1000
+        results.append(result)
+    return {key: statistics.median(result[key] for result in results) for key in results[0]}
+
+def main():
+    if sys.argv[1:] == ['--child']:
+        child()
+        return
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+
+    sys.path.insert(0, ROOT)
+    import catalog
+    snapshot_path = os.path.join(tempfile.mkdtemp(), 'produtos.snapshot')
+    catalog.build_snapshot(path=snapshot_path)
+
+    without = run(runs, os.path.join(tempfile.mkdtemp(), 'missing.snapshot'))
+    with_snapshot = run(runs, snapshot_path)
+
+    print(f"medians of {runs} cold starts     produtos.json   snapshot")
+    for key, label in (("import_ms", "import app"), ("first_turn_ms", "first /chat turn"),
+                       ("catalog_load_ms", "catalog load"), ("process_ms", "whole process")):
+        print(f"  {label:28} {without[key]:10.1f} ms {with_snapshot[key]:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
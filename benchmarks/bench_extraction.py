@@ -0,0 +1,213 @@
+"""Micro-benchmark: legacy regex ladder vs. compiled single-pass extractor.
+
+Usage: python benchmarks/bench_extraction.py [rounds]
+"""
+import os
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import extract_customer_data_from_message, get_vocabulary
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'chat_messages.txt')
+
+SESSION_FIELDS = (
+    'produto', 'tamanho', 'opcoes', 'quantidade', 'numero_paginas',
+    'nome', 'cpf', 'telefone', 'endereco_completo', 'cep'
+)
+
+def legacy_extract(message, customer_session):
+    """Extractor as it was in app.py before the compiled engine (reference only)"""
+    updates = {}
+    
+    # Extract product information
+    if not customer_session.produto:
+        # Extract product types with improved patterns
+        product_patterns = [
+            (r'\b(\d+\s*)?(livros?\s+grampo|livro\s+grampo)\b', 'Livro Grampo'),
+            (r'\b(\d+\s*)?(revistas?\s+grampo|revista\s+grampo)\b', 'Revista Grampo'),
+            (r'\b(\d+\s*)?(cadernos?\s+espiral|caderno\s+espiral)\b', 'Caderno Espiral'),
+            (r'\b(\d+\s*)?(cartões?\s+de\s+visita|cartão\s+de\s+visita)\b', 'Cartão de Visita'),
+            (r'\b(\d+\s*)?(banners?|banner)\b', 'Banner'),
+            (r'\b(\d+\s*)?(flyers?|flyer)\b', 'Flyer'),
+        ]
+        
+        for pattern, product_name in product_patterns:
+            product_match = re.search(pattern, message.lower())
+            if product_match:
+                updates['produto'] = product_name
+                # Also try to extract quantity from the same match
+                if product_match.group(1) and not customer_session.quantidade:
+                    quantity_str = product_match.group(1).strip()
+                    if quantity_str.isdigit():
+                        updates['quantidade'] = int(quantity_str)
+                break
+    
+    # Extract size information
+    if not customer_session.tamanho:
+        size_patterns = [
+            r'\b(a4|A4)\b',
+            r'\b(a5|A5)\b',
+            r'\b(14x21|14 x 21)\b',
+            r'\b(9x5|9 x 5)\b',
+            r'\b(120x80|120 x 80)\b',
+            r'\b(200x80|200 x 80)\b',
+        ]
+        
+        for pattern in size_patterns:
+            size_match = re.search(pattern, message, re.IGNORECASE)
+            if size_match:
+                size = size_match.group(1).upper()
+                if size in ['A4', 'A5']:
+                    updates['tamanho'] = size
+                elif '14' in size:
+                    updates['tamanho'] = '14x21'
+                elif '9' in size:
+                    updates['tamanho'] = '9x5'
+                elif '120' in size:
+                    updates['tamanho'] = '120x80'
+                elif '200' in size:
+                    updates['tamanho'] = '200x80'
+                break
+    
+    # Extract options (shrink, acabamento, etc.)
+    if not customer_session.opcoes:
+        option_patterns = [
+            r'\b(com shrink|shrink)\b',
+            r'\b(sem shrink)\b',
+            r'\b(capa comum|comum)\b',
+            r'\b(capa premium|premium)\b',
+            r'\b(simples)\b',
+            r'\b(com verniz|verniz)\b',
+            r'\b(sem verniz)\b',
+            r'\b(lona)\b',
+            r'\b(vinil)\b',
+            r'\b(fosco)\b',
+        ]
+        
+        for pattern in option_patterns:
+            option_match = re.search(pattern, message.lower())
+            if option_match:
+                option = option_match.group(1)
+                if 'com shrink' in option or option == 'shrink':
+                    updates['opcoes'] = 'Com Shrink'
+                elif 'sem shrink' in option:
+                    updates['opcoes'] = 'Sem Shrink'
+                elif 'capa premium' in option or option == 'premium':
+                    updates['opcoes'] = 'Premium'
+                elif 'capa comum' in option or option == 'comum':
+                    updates['opcoes'] = 'Comum'
+                elif option == 'simples':
+                    updates['opcoes'] = 'Simples'
+                elif 'com verniz' in option or option == 'verniz':
+                    updates['opcoes'] = 'Com Verniz'
+                elif 'sem verniz' in option:
+                    updates['opcoes'] = 'Sem Verniz'
+                elif option == 'lona':
+                    updates['opcoes'] = 'Lona'
+                elif option == 'vinil':
+                    updates['opcoes'] = 'Vinil'
+                elif option == 'fosco':
+                    updates['opcoes'] = 'Fosco'
+                break
+    
+    # Extract name patterns like "meu nome é João Silva" or "me chamo Maria"
+    name_patterns = [
+        r'(?:meu nome é|me chamo|sou|eu sou)\s+([A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+(?:\s+[A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+)*)',
+        r'nome[:\s]+([A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+(?:\s+[A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+)*)',
+        # Match common full name patterns
+        r'\b([A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+\s+[A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+(?:\s+[A-ZÁÀÉÈÍÌÓÒÚÙ][a-záàéèíìóòúù]+)*)\b'
+    ]
+    
+    if not customer_session.nome:
+        for pattern in name_patterns:
+            name_match = re.search(pattern, message, re.IGNORECASE)
+            if name_match:
+                # Validate it's not just a product name
+                potential_name = name_match.group(1).strip()
+                if len(potential_name.split()) >= 2 and not any(word in potential_name.lower() for word in ['livro', 'revista', 'caderno', 'cartão', 'banner', 'flyer']):
+                    updates['nome'] = potential_name
+                    break
+    
+    # Extract address information
+    if not customer_session.endereco_completo:
+        address_patterns = [
+            r'(?:endereço|endereco|moro|reside|residencia)[:\s]+([^,]+(?:,\s*\d+)?)',
+            r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*,?\s*\d+)\b',
+            # Street patterns with numbers
+            r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\s*,\s*\d+)\b'
+        ]
+        
+        for pattern in address_patterns:
+            address_match = re.search(pattern, message, re.IGNORECASE)
+            if address_match:
+                potential_address = address_match.group(1).strip()
+                # Validate it looks like an address
+                if any(char.isdigit() for char in potential_address) and len(potential_address) > 5:
+                    updates['endereco_completo'] = potential_address
+                    break
+    
+    # Extract CPF (11 digits)
+    cpf_match = re.search(r'\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b', message)
+    if cpf_match and not customer_session.cpf:
+        cpf = re.sub(r'[^\d]', '', cpf_match.group())
+        if len(cpf) == 11:  # Validate CPF length
+            updates['cpf'] = cpf
+    
+    # Extract CEP (8 digits)
+    cep_match = re.search(r'\b\d{5}-?\d{3}\b', message)
+    if cep_match and not customer_session.cep:
+        cep = re.sub(r'[^\d]', '', cep_match.group())
+        if len(cep) == 8:  # Validate CEP length
+            updates['cep'] = cep
+    
+    # Extract phone number
+    phone_match = re.search(r'\(?\d{2}\)?\s?\d{4,5}-?\d{4}', message)
+    if phone_match and not customer_session.telefone:
+        phone = re.sub(r'[^\d]', '', phone_match.group())
+        if len(phone) >= 10:  # Validate phone length
+            updates['telefone'] = phone
+    
+    # Extract quantity
+    qty_match = re.search(r'\b(\d+)\s*(?:unidade|unidades|peça|peças|exemplar|exemplares)\b', message.lower())
+    if qty_match and not customer_session.quantidade:
+        updates['quantidade'] = int(qty_match.group(1))
+    
+    # Extract number of pages
+    pages_match = re.search(r'\b(\d+)\s*(?:página|páginas|folha|folhas)\b', message.lower())
+    if pages_match and not customer_session.numero_paginas:
+        updates['numero_paginas'] = int(pages_match.group(1))
+    
+    return updates
+
+def load_corpus():
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def run(extractor, messages, rounds):
+    session = SimpleNamespace(**{field: None for field in SESSION_FIELDS})
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            extractor(message, session)
+    elapsed = time.perf_counter() - start
+    return rounds * len(messages) / elapsed
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    messages = load_corpus()
+    get_vocabulary()  # compile outside the timed loop
+
+    legacy = run(legacy_extract, messages, rounds)
+    compiled = run(extract_customer_data_from_message, messages, rounds)
+
+    print(f"corpus: {len(messages)} messages x {rounds} rounds")
+    print(f"legacy:   {legacy:12,.0f} msg/s")
+    print(f"compiled: {compiled:12,.0f} msg/s")
+    print(f"speedup:  {compiled / legacy:12.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: freight quotes served from the CEP-prefix cache.
+
+Quotes random orders (catalog product sizes x typical quantities x
+destination CEPs drawn from a small set of CEP sectors) through
+calculate_freight() with the fake provider (fixed latency standing in for the
+Melhor Envio round trip), and reports how many provider calls were needed and
+the latency of cached vs uncached quotes.
+
+Usage: python benchmarks/bench_freight.py [orders] [provider_latency_s]
+"""
+import os
+import sys
+import time
+import random
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+import app as chat_app
+import freight
+from catalog import get_catalog
+
+QUANTITIES = [1, 50, 100, 200, 300, 500]
+SECTORS = ['01310', '04538', '20040', '22250', '30110', '40010', '70040', '80010', '90010', '69005']
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    logging.disable(logging.WARNING)
+    random.seed(7)
+
+    provider = freight.FakeFreightProvider(latency=latency)
+    freight.set_freight_provider(provider)
+    catalog = get_catalog()
+    sizes = [(produto, tamanho) for produto, tamanhos in catalog.tamanhos.items() for tamanho in tamanhos]
+
+    timings = {True: [], False: []}
+    start = time.perf_counter()
+    for _ in range(orders):
+        produto, tamanho = random.choice(sizes)
+        quantidade = random.choice(QUANTITIES)
+        cep = random.choice(SECTORS) + f"{random.randrange(1000):03d}"
+        began = time.perf_counter()
+        result = chat_app.calculate_freight(
+            freight.FREIGHT_ORIGIN_CEP, cep,
+            **freight.shipment_package([{"produto": produto, "tamanho": tamanho, "quantidade": quantidade}])
+        )
+        timings[bool(result.get('cached'))].append(time.perf_counter() - began)
+        # Orders arrive spread over time; give background precompute a chance to run
+        time.sleep(0.002)
+    elapsed = time.perf_counter() - start
+
+    print(f"{orders} orders, {len(sizes)} product sizes x {len(QUANTITIES)} quantities, "
+          f"{len(freight.catalog_package_profiles())} precomputed package profiles, "
+          f"{len(SECTORS)} CEP sectors in {elapsed:.1f}s")
+    for cached, values in ((False, timings[False]), (True, timings[True])):
+        if values:
+            label = 'cached' if cached else 'provider'
+            print(f"{label:8} quotes: {len(values):4}  avg {sum(values) / len(values) * 1000:8.3f} ms")
+    print(f"provider calls: {provider.calls} (without cache: {orders})")
+    print(freight.freight_cache.stats)
+
+if __name__ == '__main__':
+    main()
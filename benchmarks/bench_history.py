@@ -0,0 +1,93 @@
+"""Benchmark: conversation history fetch latency on a large conversation_logs table.
+
+Seeds a SQLite table (1,000,000 rows by default) and compares the old query
+(oldest 20 rows, no index) with ConversationLog.recent() on the composite
+(session_id, timestamp, id) index. The rows go to a copy of conversation_logs
+(bench_conversation_logs, dropped at the end), so a database_url pointing at
+the app's database leaves its history alone.
+
+Usage: python benchmarks/bench_history.py [rows] [database_url]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import MetaData, create_engine, select, insert
+
+from models import ConversationLog
+
+# Same columns and index as conversation_logs, under names of its own
+BENCH_TABLE = 'bench_conversation_logs'
+
+MESSAGES_PER_SESSION = 40
+BATCH_SIZE = 50000
+LOOKUPS = 300
+
+def seed(engine, table, rows):
+    start_time = datetime(2025, 1, 1)
+    sessions = max(1, rows // MESSAGES_PER_SESSION)
+    with engine.begin() as conn:
+        for offset in range(0, rows, BATCH_SIZE):
+            batch = []
+            for n in range(offset, min(offset + BATCH_SIZE, rows)):
+                batch.append({
+                    'session_id': f"session-{n % sessions}",
+                    'role': 'user' if n % 2 == 0 else 'assistant',
+                    'content': f"mensagem {n} sobre livro grampo 14x21",
+                    'timestamp': start_time + timedelta(seconds=n),
+                })
+            conn.execute(insert(table), batch)
+    return sessions
+
+def measure(engine, query_for, sessions):
+    session_ids = [f"session-{random.randrange(sessions)}" for _ in range(LOOKUPS)]
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        for session_id in session_ids:
+            conn.execute(query_for(session_id)).fetchall()
+        return (time.perf_counter() - start) / LOOKUPS * 1000
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    url = sys.argv[2] if len(sys.argv) > 2 else f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'history.db')}"
+    engine = create_engine(url)
+    table = ConversationLog.__table__.to_metadata(MetaData(), name=BENCH_TABLE)
+    index = next(iter(table.indexes))
+    index.name = f"ix_{BENCH_TABLE}_session_timestamp"
+
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    index.drop(engine)
+
+    start = time.perf_counter()
+    sessions = seed(engine, table, rows)
+    print(f"seeded {rows:,} rows / {sessions:,} sessions in {time.perf_counter() - start:.1f}s")
+
+    def oldest_20(session_id):
+        return select(table).where(table.c.session_id == session_id).order_by(table.c.timestamp).limit(20)
+
+    def latest_20(session_id):
+        return select(table).where(table.c.session_id == session_id).order_by(
+            table.c.timestamp.desc(), table.c.id.desc()
+        ).limit(20)
+
+    before = measure(engine, oldest_20, sessions)
+
+    start = time.perf_counter()
+    index.create(engine)
+    print(f"index built in {time.perf_counter() - start:.1f}s")
+
+    after = measure(engine, latest_20, sessions)
+
+    print(f"old query (oldest 20, no index):  {before:9.3f} ms/fetch")
+    print(f"recent()  (latest 20, indexed):   {after:9.3f} ms/fetch")
+    print(f"speedup: {before / after:.0f}x")
+    table.drop(engine)
+
+if __name__ == '__main__':
+    main()
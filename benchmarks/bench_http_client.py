@@ -0,0 +1,90 @@
+"""Benchmark: pooled outbound HTTP client vs a new connection per call.
+
+Runs against the local PIX/freight stub (benchmarks/stubs.py), which adds a
+per-connection delay standing in for the TCP + TLS handshake to the gateway:
+
+  * sequential PIX charges with requests.post (old code) vs the keep-alive pool
+  * retries: the stub answers 503 twice, the charge still succeeds
+  * circuit breaker: calls to a dead port fail fast once the circuit opens
+  * freight quote through calculate_freight()
+
+Usage: python benchmarks/bench_http_client.py [calls] [handshake_delay_s]
+"""
+import os
+import sys
+import time
+import socket
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ.setdefault('HTTP_BACKOFF', '0.05')
+os.environ.setdefault('CIRCUIT_RESET_TIMEOUT', '60')
+
+import requests
+
+from stubs import start_pix_stub
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def timed(calls, func):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1000
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    handshake_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.03
+    logging.disable(logging.WARNING)
+
+    server, url = start_pix_stub(delay=0.005, handshake_delay=handshake_delay)
+    os.environ['PIX_API_URL'] = url
+    os.environ['FREIGHT_API_URL'] = url.replace('/api/pagamento', '/api/v2/me/shipment/calculate')
+    os.environ['FREIGHT_API_TOKEN'] = 'benchmark'
+
+    import app as chat_app
+    from http_client import OutboundClient, get_outbound_client
+
+    payload = {"name": "Cliente Teste", "cpfCnpj": "52998224725", "value": 60.0, "billingType": "pix"}
+
+    connections = server.connections
+    fresh = timed(calls, lambda: requests.post(url, json=payload, timeout=30))
+    fresh_connections = server.connections - connections
+
+    connections = server.connections
+    pooled_client = OutboundClient('bench')
+    pooled = timed(calls, lambda: pooled_client.post(url, json=payload))
+    pooled_connections = server.connections - connections
+
+    print(f"requests.post (new connection): {fresh:8.2f} ms/call  {fresh_connections} connections")
+    print(f"OutboundClient (keep-alive):    {pooled:8.2f} ms/call  {pooled_connections} connections")
+    print(f"saved per call: {fresh - pooled:.2f} ms")
+
+    server.fail_next = 2
+    requests_before = server.requests
+    result = chat_app.generate_pix("Cliente Teste", "52998224725", 60.0, "Benchmark")
+    print(f"PIX with two 503s: success={result['success']} after {server.requests - requests_before} attempts")
+
+    dead_client = OutboundClient('dead', connect_timeout=0.2)
+    dead_url = f"http://127.0.0.1:{free_port()}/api/pagamento"
+    timings = []
+    for _ in range(8):
+        start = time.perf_counter()
+        try:
+            dead_client.post(dead_url, json=payload)
+        except requests.exceptions.RequestException as e:
+            timings.append((type(e).__name__, (time.perf_counter() - start) * 1000))
+    print("dead service: " + ", ".join(f"{name} {ms:.1f}ms" for name, ms in timings))
+    print(f"circuit state: {dead_client.breaker.state}")
+
+    freight = chat_app.calculate_freight('01310100', '20040002')
+    print(f"freight quote: {freight}")
+    print(f"pix pool circuit: {get_outbound_client('pix').breaker.state}")
+
+if __name__ == '__main__':
+    main()
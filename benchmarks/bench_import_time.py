@@ -0,0 +1,113 @@
+"""Benchmark: import-time profile and per-route cold start of app.py.
+
+Profiles `import app` with python -X importtime and lists the packages it
+pulls in by cumulative import time. Then starts fresh interpreters (like new
+serverless instances) that import the app and serve a single request: GET /
+(the static chat page) or a first POST /chat (fake OpenAI client, SQLite).
+Reports median import and first-request times, and which heavy packages the
+process had loaded once the request was served.
+
+Usage: python benchmarks/bench_import_time.py [runs] [top]
+"""
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages worth deferring: LLM client, HTTP client, ORM
+HEAVY = ('openai', 'httpx', 'requests', 'sqlalchemy', 'flask_sqlalchemy', 'tiktoken')
+
+_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def child(route):
+    started = time.perf_counter()
+    sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+    import app as chat_app
+    imported = time.perf_counter()
+
+    client = chat_app.app.test_client()
+    if route == 'index':
+        response = client.get('/')
+    else:
+        from stubs import FakeOpenAI
+        chat_app.openai_client = FakeOpenAI(0)
+        response = client.post('/chat', json={'message': 'qual a diferença entre capa dura e couchê?', 'session_id': 'cold'})
+    served = time.perf_counter()
+
+    print(json.dumps({
+        "status": response.status_code,
+        "import_ms": (imported - started) * 1000,
+        "request_ms": (served - imported) * 1000,
+        "loaded": [name for name in HEAVY if name in sys.modules],
+    }))
+
+def child_env():
+    return dict(
+        os.environ,
+        OPENAI_API_KEY='benchmark',
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}",
+    )
+
+def import_profile(top):
+    """Cumulative import time (µs) of the modules app.py imports directly, slowest first"""
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True
+    ).stderr
+    total = 0
+    packages = {}
+    children = []
+    # Children are listed before their parent; keep the direct children of `app` only
+    # (interpreter startup imports, e.g. site, come first)
+    for _, cumulative_us, indent, name in _IMPORTTIME.findall(output):
+        if len(indent) == 1:
+            if name == 'app':
+                total = int(cumulative_us)
+                for child_name, child_us in children:
+                    package = child_name.split('.')[0]
+                    packages[package] = packages.get(package, 0) + child_us
+            children = []
+        elif len(indent) == 3:
+            children.append((name, int(cumulative_us)))
+    return total, sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+def run(route, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', route], env=child_env(), capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {
+        "status": results[0]["status"],
+        "import_ms": statistics.median(result["import_ms"] for result in results),
+        "request_ms": statistics.median(result["request_ms"] for result in results),
+        "loaded": results[0]["loaded"],
+    }
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2])
+        return
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    total, packages = import_profile(top)
+    print(f"import app: {total / 1000:.1f} ms (-X importtime); slowest imports:")
+    for package, cumulative in packages:
+        print(f"  {package:24} {cumulative / 1000:8.1f} ms")
+
+    print(f"medians of {runs} fresh processes")
+    for route in ('index', 'chat'):
+        result = run(route, runs)
+        print(f"  {route:6} import {result['import_ms']:7.1f} ms, first request {result['request_ms']:7.1f} ms "
+              f"(HTTP {result['status']}), loaded: {', '.join(result['loaded']) or '-'}")
+
+if __name__ == '__main__':
+    main()
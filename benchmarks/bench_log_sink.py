@@ -0,0 +1,96 @@
+"""Benchmark: write-behind conversation log sink vs per-row commits.
+
+1. Insert throughput: THREADS writers insert conversation_logs rows either with
+   one commit per row (the original save_conversation_log) or through the
+   LogSink in 'buffered' and 'group' durability.
+2. Request latency: /chat turns (fake OpenAI without latency) with
+   LOG_DURABILITY transactional, group and buffered.
+
+Usage: python benchmarks/bench_log_sink.py [rows_per_thread] [turns] [database_url]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import logging
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+if len(sys.argv) > 3:
+    os.environ['DATABASE_URL'] = sys.argv[3]
+else:
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'logs.db')}"
+
+from sqlalchemy import insert
+
+from stubs import FakeOpenAI
+
+THREADS = 8
+
+def row(n):
+    return {"session_id": f"bench-{n % 50}", "role": "user", "content": f"mensagem {n}", "timestamp": datetime.utcnow()}
+
+def run_threads(rows_per_thread, write_one):
+    def worker(offset):
+        for n in range(rows_per_thread):
+            write_one(row(offset + n))
+
+    threads = [threading.Thread(target=worker, args=(t * rows_per_thread,)) for t in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return THREADS * rows_per_thread / (time.perf_counter() - start)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    rows_per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    logging.disable(logging.WARNING)
+
+    import app as chat_app
+    from models import ConversationLog
+
+    # Tables and the sink's writer thread are set up on first use; the sink is driven directly here
+    chat_app.init_database()
+
+    table = ConversationLog.__table__
+    sink = chat_app.log_sink
+    with chat_app.app.app_context():
+        engine = chat_app.db.engine
+
+    def per_row_commit(values):
+        with engine.begin() as conn:
+            conn.execute(insert(table), [values])
+
+    print(f"insert throughput, {THREADS} threads x {rows_per_thread} rows:")
+    print(f"  per-row commit:  {run_threads(rows_per_thread, per_row_commit):9.0f} rows/s")
+    for mode in ('group', 'buffered'):
+        sink.mode = mode
+        rate = run_threads(rows_per_thread, sink.write)
+        print(f"  sink {mode:9}   {rate:9.0f} rows/s")
+    sink.flush()
+
+    chat_app.openai_client = FakeOpenAI(0)
+    client = chat_app.app.test_client()
+    print(f"/chat latency, {turns} turns:")
+    for mode in ('transactional', 'group', 'buffered'):
+        sink.mode = mode
+        latencies = []
+        for n in range(turns):
+            start = time.perf_counter()
+            client.post('/chat', json={'message': f'oi, pergunta {n}', 'session_id': f"{mode}-{n % 20}"})
+            latencies.append(time.perf_counter() - start)
+        print(f"  {mode:13}  p50 {percentile(latencies, 0.5) * 1000:6.2f} ms  p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+    sink.close()
+    print(f"sink: {sink.stats}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark: overhead of the chat stage timers, enabled and disabled.
+
+Times `with stage(...)` blocks around an empty body with metrics enabled and
+with METRICS_ENABLED off (the no-op timer), and the cost of rendering /metrics.
+
+Usage: python benchmarks/bench_metrics.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+STAGES = ('session_load', 'extraction', 'history', 'prompt_build', 'openai', 'pricing', 'freight', 'pix', 'persistence')
+
+def time_stages(iterations):
+    start = time.perf_counter()
+    for n in range(iterations):
+        with metrics.stage(STAGES[n % len(STAGES)]):
+            pass
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    baseline = (time.perf_counter() - start) / iterations
+
+    metrics.METRICS_ENABLED = True
+    enabled = time_stages(iterations) - baseline
+    metrics.METRICS_ENABLED = False
+    disabled = time_stages(iterations) - baseline
+
+    start = time.perf_counter()
+    text = metrics.render_metrics()
+    render = time.perf_counter() - start
+
+    print(f"stage timer, enabled:  {enabled * 1e9:7.0f} ns  ({enabled * len(STAGES) * 1e6:.2f} us per turn of {len(STAGES)} stages)")
+    print(f"stage timer, disabled: {disabled * 1e9:7.0f} ns")
+    print(f"/metrics render: {render * 1000:.2f} ms, {len(text.splitlines())} lines")
+
+if __name__ == '__main__':
+    main()
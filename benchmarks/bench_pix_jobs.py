@@ -0,0 +1,80 @@
+"""Benchmark: chat latency of the order-completing turn with background PIX jobs.
+
+Each session sends the product, then the name, then the CPF/CEP turn that
+completes the order, twice at the same time (double submit). The PIX gateway
+stub is slow. The script reports the latency of the completing turns, how
+long the background jobs take, and how many charges reached the gateway
+(expected: one per session).
+
+Usage: python benchmarks/bench_pix_jobs.py [sessions] [gateway_latency_s]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pix.db')}"
+
+from stubs import FakeOpenAI, start_pix_stub
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    gateway_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+    logging.disable(logging.WARNING)
+
+    pix_server, pix_url = start_pix_stub(gateway_latency)
+    os.environ['PIX_API_URL'] = pix_url
+
+    import app as chat_app
+    from models import PixJob
+
+    chat_app.openai_client = FakeOpenAI(0.05)
+    client = chat_app.app.test_client()
+    latencies = []
+    lock = threading.Lock()
+
+    def completing_turn(session_id):
+        start = time.perf_counter()
+        chat_app.app.test_client().post('/chat', json={
+            'message': 'CPF 529.982.247-25, CEP 01310-100',
+            'session_id': session_id
+        })
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for n in range(sessions):
+        session_id = f"pix-{n}"
+        client.post('/chat', json={'message': 'Quero 100 livros grampo 14x21 com shrink', 'session_id': session_id})
+        client.post('/chat', json={'message': 'Meu nome é João da Silva', 'session_id': session_id})
+        threads = [threading.Thread(target=completing_turn, args=(session_id,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    with chat_app.app.app_context():
+        while PixJob.query.filter(PixJob.status.in_(('pending', 'processing'))).count():
+            chat_app.db.session.rollback()
+            time.sleep(0.05)
+        statuses = [job.status for job in PixJob.query.all()]
+    elapsed = time.perf_counter() - start
+
+    print(f"gateway stub latency: {gateway_latency * 1000:.0f} ms")
+    print(f"completing turns: {len(latencies)}  p50 {percentile(latencies, 0.5) * 1000:.0f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"all charges issued after {elapsed:.1f}s: {statuses.count('completed')} completed, "
+          f"{statuses.count('failed')} failed")
+    print(f"gateway requests: {pix_server.requests} for {sessions} sessions")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark: FAQ turns answered from the response cache instead of OpenAI.
+
+Replays benchmarks/data/chat_messages.txt as the first message of many new
+sessions through /chat (fake OpenAI with fixed latency, SQLite) and reports
+hit/miss latency, the cache counters and the raw lookup cost.
+
+Usage: python benchmarks/bench_response_cache.py [sessions] [openai_latency_s]
+"""
+import os
+import sys
+import time
+import tempfile
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cache.db')}"
+
+import app as chat_app
+from response_cache import response_cache
+from stubs import FakeOpenAI
+
+LOOKUPS = 100000
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    logging.disable(logging.INFO)
+
+    with open(os.path.join(ROOT, 'benchmarks', 'data', 'chat_messages.txt'), encoding='utf-8') as f:
+        messages = [line.strip() for line in f if line.strip()]
+
+    chat_app.openai_client = FakeOpenAI(latency)
+    client = chat_app.app.test_client()
+    timings = {'hit': [], 'miss': [], 'skip': []}
+
+    for n in range(sessions):
+        for i, message in enumerate(messages):
+            start = time.perf_counter()
+            response = client.post('/chat', json={'message': message, 'session_id': f"bench-{n}-{i}"})
+            timings[response.headers['X-Response-Cache']].append(time.perf_counter() - start)
+
+    for kind, values in timings.items():
+        if values:
+            print(f"{kind:5} turns: {len(values):5}  avg {sum(values) / len(values) * 1000:8.2f} ms/turn")
+    print(response_cache.snapshot())
+
+    key = next(iter(response_cache._entries))
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        response_cache.get(key)
+    print(f"cache lookup: {(time.perf_counter() - start) / LOOKUPS * 1e6:.2f} us")
+
+if __name__ == '__main__':
+    main()
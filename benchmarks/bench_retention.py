@@ -0,0 +1,101 @@
+"""Benchmark: retention run over a large, mostly idle database.
+
+Fills customer_sessions and conversation_logs with SESSIONS sessions (most of
+them idle for longer than RETENTION_SESSION_IDLE_DAYS, some active with old
+and new messages), runs retention.run_retention() and reports rows expired
+per second, the longest delete transaction (how long writers could be
+blocked), archive size versus the data removed, and checks that every
+deleted row is in the archive and every active session survived.
+
+Usage: python benchmarks/bench_retention.py [sessions] [messages_per_session]
+"""
+import os
+import sys
+import time
+import glob
+import random
+import tempfile
+import logging
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+WORKDIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'retention.db')}"
+
+from sqlalchemy import event, insert, select, func
+
+ACTIVE_FRACTION = 0.1
+
+def main():
+    total_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    logging.disable(logging.WARNING)
+    random.seed(3)
+
+    import app as chat_app
+    import retention
+
+    chat_app.init_database()
+
+    with chat_app.app.app_context():
+        engine = chat_app.db.engine
+    now = datetime.utcnow()
+    sessions, logs = retention.sessions, retention.logs
+
+    active = set(random.sample(range(total_sessions), int(total_sessions * ACTIVE_FRACTION)))
+    with engine.begin() as conn:
+        session_rows, log_rows = [], []
+        for n in range(total_sessions):
+            last_seen = now - timedelta(days=1 if n in active else random.randint(31, 400))
+            session_rows.append({
+                "session_id": f"s-{n}", "produto": "Livro Grampo (canoa)", "tamanho": "14x21", "quantidade": 100,
+                "status": "em_andamento", "pix_gerado": False, "created_at": last_seen, "updated_at": last_seen,
+            })
+            for m in range(messages):
+                # Active sessions: half of their messages are older than RETENTION_LOG_DAYS
+                stamp = now - timedelta(days=120 if n in active and m < messages // 2 else 0, minutes=messages - m)
+                if n not in active:
+                    stamp = last_seen - timedelta(minutes=messages - m)
+                log_rows.append({"session_id": f"s-{n}", "role": "user", "content": f"mensagem {m} " * 8, "timestamp": stamp})
+        conn.execute(insert(sessions), session_rows)
+        conn.execute(insert(logs), log_rows)
+    db_size = os.path.getsize(os.path.join(WORKDIR, 'retention.db'))
+
+    # Longest transaction of the run: how long a writer could wait on SQLite's lock
+    transactions = []
+
+    def on_begin(conn):
+        conn.info['began'] = time.perf_counter()
+
+    def on_commit(conn):
+        if 'began' in conn.info:
+            transactions.append(time.perf_counter() - conn.info.pop('began'))
+
+    event.listen(engine, 'begin', on_begin)
+    event.listen(engine, 'commit', on_commit)
+
+    archive_dir = os.path.join(WORKDIR, 'archive')
+    started = time.perf_counter()
+    result = retention.run_retention(engine, now=now, archive_dir=archive_dir)
+    elapsed = time.perf_counter() - started
+
+    files = glob.glob(os.path.join(archive_dir, '*', '*.jsonl.gz'))
+    archived_rows = sum(len(retention.read_archive(path)) for path in files)
+    archive_size = sum(os.path.getsize(path) for path in files)
+    with engine.connect() as conn:
+        remaining_sessions = conn.execute(select(func.count()).select_from(sessions)).scalar()
+        remaining_logs = conn.execute(select(func.count()).select_from(logs)).scalar()
+
+    deleted = result['sessions'] + result['session_logs'] + result['old_logs']
+    print(f"{total_sessions} sessions x {messages} messages, {len(active)} active, database {db_size / 2**20:.1f} MiB")
+    print(f"retention: {result} in {elapsed:.1f}s ({deleted / elapsed:.0f} rows/s, "
+          f"includes {retention.RETENTION_BATCH_PAUSE_MS} ms pause per batch)")
+    print(f"transactions: {len(transactions)}, longest {max(transactions) * 1000:.1f} ms")
+    print(f"archive: {len(files)} files, {archive_size / 2**20:.2f} MiB, {archived_rows} rows (deleted {deleted})")
+    print(f"remaining: {remaining_sessions} sessions (expected {len(active)}), "
+          f"{remaining_logs} messages (expected {len(active) * (messages - messages // 2)})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark: /chat turns with and without the hot-session cache.
+
+Runs the same conversations (fake OpenAI without latency, SQLite) with the
+CustomerSession cache disabled and enabled, and reports SQL statements per
+turn (X-DB-Statements), latency percentiles and the cache counters.
+
+Usage: python benchmarks/bench_session_cache.py [sessions] [turns_per_session]
+"""
+import os
+import sys
+import time
+import tempfile
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sessions.db')}"
+
+from stubs import FakeOpenAI
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    logging.disable(logging.WARNING)
+
+    import app as chat_app
+
+    chat_app.openai_client = FakeOpenAI(0)
+    client = chat_app.app.test_client()
+    cache = chat_app.session_cache
+
+    for local in (False, True):
+        cache.local = local
+        cache.clear()
+        statements, latencies = [], []
+        for turn in range(turns):
+            for n in range(sessions):
+                start = time.perf_counter()
+                response = client.post('/chat', json={
+                    'message': f'Quero {100 + turn} livros grampo 14x21',
+                    'session_id': f"{'cached' if local else 'uncached'}-{n}"
+                })
+                latencies.append(time.perf_counter() - start)
+                statements.append(int(response.headers.get('X-DB-Statements', 0)))
+        label = 'cache on ' if local else 'cache off'
+        print(f"{label}  {sum(statements) / len(statements):5.2f} statements/turn  "
+              f"p50 {percentile(latencies, 0.5) * 1000:6.2f} ms  p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+    print(cache.snapshot())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Offline evaluation of model routing: the same conversations with and without tiers.
+
+Replays the conversations of the replay fixture (or --from-logs DATABASE_URL,
+the user messages of conversation_logs) through /chat twice, fully offline:
+once with every turn on OPENAI_MODEL (routing.OPENAI_MODEL_FAST emptied) and
+once with routing on. The fake OpenAI client answers each model with its own
+latency (--full-latency, --fast-latency), so the comparison shows how turns
+split between the tiers, the estimated cost (routing.MODEL_PRICES, prompt
+tokens estimated from the prompt length) and OpenAI time per turn. Which
+reasons sent turns to which tier is listed for review against the logs.
+
+Usage: python benchmarks/eval_routing.py [--conversations FILE] [--from-logs URL]
+       [--full-latency S] [--fast-latency S] [--repeat N]
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stubs import FakeOpenAI
+from replay import DEFAULT_CONVERSATIONS, load_conversations, load_logged_conversations, setup_environment, replay
+
+def run_pass(chat_app, client, conversations, label, repeat):
+    import routing
+
+    chat_app.response_cache.clear()
+    routing.routing_stats.clear()
+    chat_app.openai_client.models.clear()
+
+    started = time.perf_counter()
+    for run in range(repeat):
+        replay(client, conversations, f"{label}-{run}", lambda send: send())
+    elapsed = time.perf_counter() - started
+
+    stats = routing.routing_snapshot()
+    calls = sum(value for key, value in stats.items() if key.endswith('_calls'))
+    seconds = sum(value for key, value in stats.items() if key.endswith('_seconds'))
+    return {
+        "label": label,
+        "elapsed": elapsed,
+        "calls": calls,
+        "models": dict(chat_app.openai_client.models),
+        "cost_usd": sum(value for key, value in stats.items() if key.endswith('_cost_usd')),
+        "openai_ms_per_call": seconds / calls * 1000 if calls else 0.0,
+        "reasons": {key[len('reason_'):]: value for key, value in stats.items() if key.startswith('reason_')},
+    }
+
+def print_pass(result, turns):
+    print(f"{result['label']:8} {result['calls']:5} calls  {result['models']}")
+    print(f"         cost ${result['cost_usd']:.4f} (${result['cost_usd'] / max(turns, 1) * 1000:.3f} per 1k turns), "
+          f"OpenAI {result['openai_ms_per_call']:.1f} ms/call, {turns / result['elapsed']:.1f} turns/s")
+    print(f"         reasons {result['reasons']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', default=DEFAULT_CONVERSATIONS)
+    parser.add_argument('--from-logs', metavar='DATABASE_URL')
+    parser.add_argument('--full-latency', type=float, default=0.05)
+    parser.add_argument('--fast-latency', type=float, default=0.02)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    args.gateway_latency = 0.0
+    args.database_url = None
+
+    if args.from_logs:
+        conversations = load_logged_conversations(args.from_logs)
+    else:
+        conversations = load_conversations(args.conversations)
+    setup_environment(args)
+
+    import app as chat_app
+    import routing
+
+    chat_app.openai_client = FakeOpenAI(model_latency={
+        routing.OPENAI_MODEL: args.full_latency,
+        routing.OPENAI_MODEL_FAST: args.fast_latency,
+    })
+    client = chat_app.app.test_client()
+    turns = sum(len(turns) for turns in conversations) * args.repeat
+
+    fast_model = routing.OPENAI_MODEL_FAST
+    routing.OPENAI_MODEL_FAST = ''
+    single = run_pass(chat_app, client, conversations, 'single', args.repeat)
+    routing.OPENAI_MODEL_FAST = fast_model
+    routed = run_pass(chat_app, client, conversations, 'routed', args.repeat)
+
+    print(f"{len(conversations)} conversations x {args.repeat}, {turns} turns; "
+          f"{routing.OPENAI_MODEL} {args.full_latency * 1000:.0f} ms, {fast_model} {args.fast_latency * 1000:.0f} ms")
+    print_pass(single, turns)
+    print_pass(routed, turns)
+    if single['cost_usd']:
+        print(f"routing: cost {routed['cost_usd'] / single['cost_usd']:.1%} of single tier, "
+              f"OpenAI time per call {routed['openai_ms_per_call'] / max(single['openai_ms_per_call'], 1e-9):.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Load test: sync vs. async chat pipeline in a single worker process, against local stubs.
+
+The sync path handles one turn at a time (one sync gunicorn worker); the async
+path runs N conversations concurrently on one event loop. OpenAI and the PIX
+gateway are replaced by stubs with fixed latency, the database is SQLite.
+
+Usage: python benchmarks/load_async.py [turns_per_level]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import FakeOpenAI, FakeAsyncOpenAI, start_pix_stub
+
+OPENAI_LATENCY = 0.2
+PIX_LATENCY = 0.05
+CONCURRENCY_LEVELS = (1, 10, 50, 100, 200)
+
+CONVERSATION = (
+    "Quero 100 livros grampo 14x21 com shrink",
+    "Meu nome é João da Silva",
+    "CPF 529.982.247-25, CEP 01310-100",
+)
+
+def setup_environment():
+    pix_server, pix_url = start_pix_stub(PIX_LATENCY)
+    db_path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['PIX_API_URL'] = pix_url
+    os.environ.setdefault('OPENAI_API_KEY', 'offline')
+    logging.disable(logging.INFO)
+    return pix_server
+
+def run_sync(app_module, turns):
+    """One worker, one turn at a time, like a sync gunicorn worker"""
+    app_module.openai_client = FakeOpenAI(OPENAI_LATENCY)
+    client = app_module.app.test_client()
+    start = time.perf_counter()
+    for i in range(turns):
+        message = CONVERSATION[i % len(CONVERSATION)]
+        client.post('/chat', json={'message': message, 'session_id': f"sync-{i // len(CONVERSATION)}"})
+    return turns / (time.perf_counter() - start)
+
+async def run_async(chat_async, concurrency, turns):
+    """One event loop, `concurrency` conversations in flight"""
+    conversations = max(1, turns // len(CONVERSATION))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def conversation(n):
+        async with semaphore:
+            for message in CONVERSATION:
+                await chat_async.chat_turn_async(f"async-{concurrency}-{n}", message)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(n) for n in range(conversations)))
+    return conversations * len(CONVERSATION) / (time.perf_counter() - start)
+
+async def main_async(chat_async, turns):
+    chat_async._openai_client = FakeAsyncOpenAI(OPENAI_LATENCY)
+    results = []
+    for concurrency in CONCURRENCY_LEVELS:
+        results.append((concurrency, await run_async(chat_async, concurrency, max(turns, concurrency * len(CONVERSATION)))))
+    await chat_async.close_async_clients()
+    return results
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    pix_server = setup_environment()
+
+    import app as app_module
+    import chat_async
+
+    # More threads than in-flight turns so blocking DB work never starves the loop
+    from concurrent.futures import ThreadPoolExecutor
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=64))
+
+    sync_rate = run_sync(app_module, turns)
+    async_results = loop.run_until_complete(main_async(chat_async, turns))
+    loop.close()
+
+    print(f"stubs: OpenAI {OPENAI_LATENCY * 1000:.0f} ms, PIX {PIX_LATENCY * 1000:.0f} ms, SQLite")
+    print(f"sync worker:            {sync_rate:8.1f} turns/s")
+    for concurrency, rate in async_results:
+        print(f"async, {concurrency:3d} in flight:   {rate:8.1f} turns/s  ({rate / sync_rate:5.1f}x)")
+    print(f"PIX stub requests: {pix_server.requests}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Replay harness: recorded conversations through the Flask app, fully offline.
+
+Every conversation of the fixture (one JSON object per line with a "turns"
+list, default benchmarks/data/conversations.jsonl) is replayed turn by turn
+through /chat, with a deterministic fake OpenAI client, the local PIX /
+freight stub and SQLite (or --database-url, e.g. Postgres). Each repeat uses
+new session ids, so repeats behave like new customers.
+
+Reports throughput, request and per-stage latency percentiles (the metrics
+module's stage timers), SQL statements per turn, memory allocated per turn
+(tracemalloc, in a separate pass so it does not skew timings) and peak RSS.
+--save-baseline writes the summary as JSON; --baseline compares against one
+and exits with status 1 when a metric regressed beyond --tolerance.
+
+Recorded production conversations can be replayed with --from-logs DATABASE_URL
+(user messages of conversation_logs, grouped by session).
+
+Usage: python benchmarks/replay.py [--repeat N] [--openai-latency S] [--conversations FILE]
+       [--from-logs URL] [--database-url URL] [--save-baseline FILE] [--baseline FILE] [--tolerance F]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import resource
+import tempfile
+import tracemalloc
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stubs import FakeOpenAI, start_pix_stub
+
+DEFAULT_CONVERSATIONS = os.path.join(ROOT, 'benchmarks', 'data', 'conversations.jsonl')
+
+# Differences below these are noise, whatever the relative change
+NOISE_FLOOR = {"ms": 0.5, "statements": 0.1, "kib": 16, "turns_per_s": 0}
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+def load_conversations(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['turns'] for line in f if line.strip()]
+
+def load_logged_conversations(database_url):
+    """User messages of conversation_logs, grouped by session in their original order"""
+    from sqlalchemy import create_engine, text
+
+    conversations = defaultdict(list)
+    with create_engine(database_url).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT session_id, content FROM conversation_logs WHERE role = 'user' ORDER BY session_id, timestamp, id"
+        ))
+        for session_id, content in rows:
+            conversations[session_id].append(content)
+    return list(conversations.values())
+
+def setup_environment(args):
+    stub, pix_url = start_pix_stub(args.gateway_latency)
+    os.environ['PIX_API_URL'] = pix_url
+    os.environ['FREIGHT_API_URL'] = pix_url.replace('/api/pagamento', '/api/v2/me/shipment/calculate')
+    os.environ['FREIGHT_API_TOKEN'] = 'offline'
+    os.environ['OPENAI_API_KEY'] = 'offline'
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'replay.db')}"
+    logging.disable(logging.WARNING)
+    return stub
+
+def replay(client, conversations, run, on_turn):
+    for index, turns in enumerate(conversations):
+        session_id = f"replay-{run}-{index}"
+        for message in turns:
+            on_turn(lambda: client.post('/chat', json={'message': message, 'session_id': session_id}))
+
+def wait_for_pix_jobs(chat_app):
+    from models import PixJob
+
+    with chat_app.app.app_context():
+        while PixJob.query.filter(PixJob.status.in_(('pending', 'processing'))).count():
+            chat_app.db.session.rollback()
+            time.sleep(0.02)
+        statuses = [status for (status,) in chat_app.db.session.query(PixJob.status)]
+        chat_app.db.session.rollback()
+    return statuses
+
+def run_benchmark(args, conversations):
+    stub = setup_environment(args)
+
+    import app as chat_app
+    import metrics
+
+    fake_openai = chat_app.openai_client = FakeOpenAI(args.openai_latency)
+    client = chat_app.app.test_client()
+
+    # Keep every stage sample, not just histogram buckets, for exact percentiles
+    stage_samples = defaultdict(list)
+    observe = metrics.stage_seconds.observe
+    collecting = [True]
+
+    def record(name, seconds):
+        if collecting[0]:
+            stage_samples[name].append(seconds)
+        observe(name, seconds)
+
+    metrics.stage_seconds.observe = record
+
+    latencies, statements, errors = [], [], [0]
+
+    def timed_turn(send):
+        started = time.perf_counter()
+        response = send()
+        latencies.append(time.perf_counter() - started)
+        statements.append(int(response.headers.get('X-DB-Statements', 0)))
+        if response.status_code != 200:
+            errors[0] += 1
+
+    # Warm-up: catalog, prompt prefix, connection pool
+    replay(client, conversations[:1], 'warmup', lambda send: send())
+    stage_samples.clear()
+
+    openai_calls = fake_openai.calls
+    local_turns = chat_app.dialogue_snapshot()["local"]
+    started = time.perf_counter()
+    for run in range(args.repeat):
+        replay(client, conversations, run, timed_turn)
+    elapsed = time.perf_counter() - started
+    openai_calls = fake_openai.calls - openai_calls
+    local_turns = chat_app.dialogue_snapshot()["local"] - local_turns
+    statuses = wait_for_pix_jobs(chat_app)
+    collecting[0] = False
+
+    # Memory pass: allocations per turn, traced separately from the timed runs
+    memory = []
+
+    def traced_turn(send):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        send()
+        memory.append(tracemalloc.get_traced_memory()[1] - before)
+
+    tracemalloc.start()
+    replay(client, conversations, 'memory', traced_turn)
+    tracemalloc.stop()
+    wait_for_pix_jobs(chat_app)
+
+    return {
+        # Cache hit rates depend on these: only compare runs with the same config
+        "config": {
+            "conversations": len(conversations),
+            "repeat": args.repeat,
+            "openai_latency": args.openai_latency,
+            "gateway_latency": args.gateway_latency,
+            "database": os.environ['DATABASE_URL'].split(':', 1)[0],
+        },
+        "turns": len(latencies),
+        "errors": errors[0],
+        "turns_per_s": round(len(latencies) / elapsed, 1),
+        "request_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+        },
+        "stage_ms": {
+            name: {
+                "count": len(samples),
+                "p50": round(percentile(samples, 0.5) * 1000, 3),
+                "p95": round(percentile(samples, 0.95) * 1000, 3),
+            }
+            for name, samples in sorted(stage_samples.items())
+        },
+        "openai_calls": openai_calls,
+        "local_reply_ratio": round(local_turns / len(latencies), 4) if latencies else 0.0,
+        "statements_per_turn": round(sum(statements) / len(statements), 2) if statements else 0.0,
+        "max_statements": max(statements, default=0),
+        "memory_kib_per_turn": {
+            "p50": round(percentile(memory, 0.5) / 1024, 1),
+            "max": round(max(memory, default=0) / 1024, 1),
+        },
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pix_jobs": {status: statuses.count(status) for status in sorted(set(statuses))},
+        "gateway_requests": stub.requests,
+    }
+
+def compare(summary, baseline, tolerance):
+    """(metric, baseline, current) for every metric worse than baseline by more than tolerance"""
+    checks = [("turns_per_s", "turns_per_s", summary["turns_per_s"], baseline.get("turns_per_s"), False)]
+    # p99 and stage p95 of a few hundred turns are too noisy to gate on; they are reported only
+    for key in ("p50", "p95"):
+        checks.append((f"request_ms.{key}", "ms", summary["request_ms"][key], baseline.get("request_ms", {}).get(key), True))
+    for name, values in summary["stage_ms"].items():
+        base = baseline.get("stage_ms", {}).get(name, {}).get("p50")
+        checks.append((f"stage_ms.{name}.p50", "ms", values["p50"], base, True))
+    checks.append(("statements_per_turn", "statements", summary["statements_per_turn"], baseline.get("statements_per_turn"), True))
+    checks.append(("memory_kib_per_turn.p50", "kib", summary["memory_kib_per_turn"]["p50"],
+                   baseline.get("memory_kib_per_turn", {}).get("p50"), True))
+
+    regressions = []
+    for metric, unit, current, base, lower_is_better in checks:
+        if base is None:
+            continue
+        worse_by = (current - base) if lower_is_better else (base - current)
+        if worse_by > NOISE_FLOOR[unit] and worse_by > abs(base) * tolerance:
+            regressions.append((metric, base, current))
+    return regressions
+
+def print_summary(summary):
+    print(f"{summary['turns']} turns, {summary['errors']} errors, {summary['turns_per_s']} turns/s")
+    request = summary['request_ms']
+    print(f"request     p50 {request['p50']:8.3f} ms  p95 {request['p95']:8.3f} ms  p99 {request['p99']:8.3f} ms")
+    for name, values in summary['stage_ms'].items():
+        print(f"  {name:13} p50 {values['p50']:8.3f} ms  p95 {values['p95']:8.3f} ms  ({values['count']} samples)")
+    print(f"OpenAI calls: {summary['openai_calls']}, turns answered locally: {summary['local_reply_ratio']:.1%}")
+    print(f"SQL statements per turn: {summary['statements_per_turn']} (max {summary['max_statements']})")
+    memory = summary['memory_kib_per_turn']
+    print(f"memory allocated per turn: p50 {memory['p50']} KiB, max {memory['max']} KiB; peak RSS {summary['peak_rss_mib']} MiB")
+    print(f"PIX jobs: {summary['pix_jobs']}, stub requests (PIX + freight): {summary['gateway_requests']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', default=DEFAULT_CONVERSATIONS)
+    parser.add_argument('--from-logs', metavar='DATABASE_URL')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--openai-latency', type=float, default=0.0)
+    parser.add_argument('--gateway-latency', type=float, default=0.0)
+    parser.add_argument('--database-url')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.from_logs:
+        conversations = load_logged_conversations(args.from_logs)
+    else:
+        conversations = load_conversations(args.conversations)
+
+    summary = run_benchmark(args, conversations)
+    print_summary(summary)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != summary["config"]:
+            print(f"warning: baseline config {baseline.get('config')} differs from {summary['config']}")
+        regressions = compare(summary, baseline, args.tolerance)
+        for metric, base, current in regressions:
+            print(f"REGRESSION {metric}: {base} -> {current}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regression beyond {args.tolerance:.0%} of {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Local stand-ins for the OpenAI API, the PIX gateway and the freight API, for offline benchmarks."""
+import json
+import time
+import uuid
+import asyncio
+import threading
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_REPLY = "Perfeito! Para continuar, qual o tamanho e a quantidade que você precisa?"
+
+def fake_completion(text=FAKE_REPLY, prompt_tokens=0):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason='stop')],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(text.split()),
+            total_tokens=prompt_tokens + len(text.split()),
+            prompt_tokens_details=None
+        )
+    )
+
+def fake_stream(text=FAKE_REPLY):
+    return iter([
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + ' '))])
+        for word in text.split()
+    ])
+
+class FakeOpenAI:
+    """Synchronous OpenAI client double with a fixed completion latency
+
+    model_latency overrides the latency per model; calls per model are counted in .models.
+    """
+
+    def __init__(self, latency=0.2, text=FAKE_REPLY, model_latency=None):
+        self.latency = latency
+        self.text = text
+        self.model_latency = model_latency or {}
+        self.calls = 0
+        self.models = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages=(), stream=False, model=None, **kwargs):
+        self.calls += 1
+        self.models[model] = self.models.get(model, 0) + 1
+        time.sleep(self.model_latency.get(model, self.latency))
+        prompt_tokens = sum(len(m['content']) for m in messages) // 4
+        return fake_stream(self.text) if stream else fake_completion(self.text, prompt_tokens)
+
+class FakeAsyncOpenAI:
+    """AsyncOpenAI client double with a fixed completion latency"""
+
+    def __init__(self, latency=0.2, text=FAKE_REPLY):
+        self.latency = latency
+        self.text = text
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages=(), **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt_tokens = sum(len(m['content']) for m in messages) // 4
+        return fake_completion(self.text, prompt_tokens)
+
+    async def close(self):
+        pass
+
+class _PixHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; avoid Nagle stalls on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        self.server.requests += 1
+        self.server.last_payload = payload
+        time.sleep(self.server.delay)
+
+        if self.server.stall_next > 0:
+            # Processed, but answered too late: the client sees a read timeout
+            self.server.stall_next -= 1
+            time.sleep(self.server.stall)
+
+        if self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            self._send_json(self.server.fail_status, {"error": "unavailable"})
+            return
+
+        if self.path.endswith('/shipment/calculate'):
+            self._send_json(200, [
+                {"id": 1, "name": "PAC", "price": "18.40", "delivery_time": 7},
+                {"id": 2, "name": "SEDEX", "price": "32.10", "delivery_time": 2},
+                {"id": 3, "name": "Jadlog", "error": "Serviço indisponível"},
+            ])
+            return
+
+        charge_id = f"pay_{uuid.uuid4().hex[:12]}"
+        charge = {
+            "id": charge_id,
+            "invoiceUrl": f"https://pix.example/{charge_id}",
+            "paymentLink": f"https://pix.example/link/{charge_id}",
+            "qrCode": "00020126580014BR.GOV.BCB.PIX",
+            "value": payload.get("value"),
+            "externalReference": payload.get("externalReference"),
+        }
+        self.server.charges.append(charge)
+        self._send_json(200, charge)
+
+    def do_GET(self):
+        # Charge lookup by externalReference (reconciliation)
+        self.server.lookups += 1
+        reference = parse_qs(urlparse(self.path).query).get('externalReference', [None])[0]
+        self._send_json(200, {"data": [charge for charge in self.server.charges if charge["externalReference"] == reference]})
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def finish_request(self, request, client_address):
+        # Runs once per TCP connection: stands in for the TCP + TLS handshake round trips
+        time.sleep(self.handshake_delay)
+        self.connections += 1
+        super().finish_request(request, client_address)
+
+def start_pix_stub(delay=0.05, handshake_delay=0.0):
+    """Start a local PIX gateway / freight API stub on a free port; returns (server, url)
+
+    server.requests and server.connections count calls and TCP connections,
+    server.last_payload is the last JSON body received, server.charges every charge
+    issued (looked up by externalReference with GET, counted in server.lookups);
+    set server.fail_next = N to answer the next N calls with server.fail_status
+    (503), and server.stall_next = N to hold the next N answers for
+    server.stall seconds.
+    """
+    server = _StubServer(('127.0.0.1', 0), _PixHandler)
+    server.delay = delay
+    server.handshake_delay = handshake_delay
+    server.requests = 0
+    server.connections = 0
+    server.last_payload = None
+    server.charges = []
+    server.lookups = 0
+    server.fail_next = 0
+    server.fail_status = 503
+    server.stall_next = 0
+    server.stall = 1.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/pagamento"
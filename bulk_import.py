@@ -0,0 +1,295 @@
+import io
+import os
+import csv
+import json
+import re
+import time
+import logging
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import Integer, Numeric, String, insert
+
+from models import CustomerSession
+from pricing import quote_batch
+from extraction import fold, is_valid_cpf, is_valid_cep
+
+# Bearer token required by POST /orders/import; the endpoint is disabled without one
+BULK_IMPORT_TOKEN = os.environ.get('BULK_IMPORT_TOKEN', '')
+
+# Orders of a CSV/JSONL upload are validated, priced and written in batches of this many rows,
+# one transaction each; memory stays bounded by the batch, whatever the file size
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', '500'))
+
+# Rows accepted per upload; the rest of the file is rejected with a single error line
+BULK_IMPORT_MAX_ROWS = int(os.environ.get('BULK_IMPORT_MAX_ROWS', '200000'))
+
+# Longest JSONL line or CSV field read, in characters
+BULK_IMPORT_MAX_LINE = 64 * 1024
+
+# Status of the CustomerSession rows written for imported orders
+IMPORTED_STATUS = 'importado'
+
+sessions = CustomerSession.__table__
+
+# Spreadsheet headers (folded) -> order field
+COLUMN_ALIASES = {
+    'produto': 'produto', 'product': 'produto',
+    'tamanho': 'tamanho', 'formato': 'tamanho', 'size': 'tamanho',
+    'opcoes': 'opcoes', 'opcao': 'opcoes', 'options': 'opcoes',
+    'quantidade': 'quantidade', 'qtd': 'quantidade', 'qtde': 'quantidade', 'quantity': 'quantidade',
+    'numero_paginas': 'numero_paginas', 'paginas': 'numero_paginas', 'numero de paginas': 'numero_paginas',
+    'pages': 'numero_paginas',
+    'nome': 'nome', 'cliente': 'nome', 'name': 'nome',
+    'cpf': 'cpf',
+    'cep': 'cep',
+    'endereco': 'endereco_completo', 'endereco_completo': 'endereco_completo', 'address': 'endereco_completo',
+    'telefone': 'telefone', 'celular': 'telefone', 'phone': 'telefone',
+}
+
+_NON_DIGIT = re.compile(r'\D')
+
+# Largest value of an INTEGER column (Postgres)
+_INTEGER_MAX = 2 ** 31 - 1
+
+FORMATS_BY_MIMETYPE = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/json-lines': 'jsonl',
+}
+
+def import_format(requested, mimetype, filename=''):
+    """'csv' or 'jsonl' from ?format=, the upload's content type or its file extension; None if unknown"""
+    if requested in ('csv', 'jsonl'):
+        return requested
+    if mimetype in FORMATS_BY_MIMETYPE:
+        return FORMATS_BY_MIMETYPE[mimetype]
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return None
+
+def read_rows(text, fmt):
+    """(line number, row dict or error) for each order of a decoded upload"""
+    return read_csv(text) if fmt == 'csv' else read_jsonl(text)
+
+def text_stream(stream):
+    """Decode a binary upload lazily (a BOM from spreadsheet exports is skipped)"""
+    if not hasattr(stream, 'read1'):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+def read_csv(text):
+    """(line number, row dict or error) for each CSV record; ',' or ';' separated, header first"""
+    header = text.readline(BULK_IMPORT_MAX_LINE)
+    # Spreadsheets exported with a Brazilian locale separate columns with ';'
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    fields = [_column(name) for name in next(csv.reader([header], delimiter=delimiter), [])]
+    if 'produto' not in fields:
+        yield 1, "Cabeçalho sem a coluna produto"
+        return
+
+    reader = csv.reader(text, delimiter=delimiter)
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num + 1, f"CSV inválido: {e}"
+            continue
+        if not any(value.strip() for value in record):
+            continue
+        yield reader.line_num + 1, {field: value for field, value in zip(fields, record) if field}
+
+def _column(name):
+    return COLUMN_ALIASES.get(fold(str(name)).strip())
+
+def read_jsonl(text):
+    """(line number, row dict or error) for each JSON object line"""
+    # Every line repeats the same keys; each distinct key is folded once per upload
+    columns = {}
+    for number, line in enumerate(iter(lambda: text.readline(BULK_IMPORT_MAX_LINE), ''), start=1):
+        if not line.strip():
+            continue
+        if not line.endswith('\n') and len(line) >= BULK_IMPORT_MAX_LINE:
+            # Skip the rest of an oversized line
+            while line and not line.endswith('\n'):
+                line = text.readline(BULK_IMPORT_MAX_LINE)
+            yield number, "Linha longa demais"
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield number, "Cada linha deve ser um objeto JSON"
+            continue
+        order = {}
+        for key, value in row.items():
+            if key not in columns and len(columns) < len(COLUMN_ALIASES) * 4:
+                columns[key] = _column(key)
+            field = columns[key] if key in columns else _column(key)
+            if field:
+                order[field] = value
+        yield number, order
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+def _integer(value, field, errors, minimum):
+    text = _text(value)
+    if not text:
+        return None
+    # Digits only: "1.000" could be one thousand or one
+    if not text.isdigit() or int(text) < minimum:
+        errors.append(f"Valor inválido para {field}: {text}")
+        return None
+    return int(text)
+
+def column_errors(values):
+    """What does not fit its customer_sessions column; one such value would fail the batch's insert on Postgres"""
+    errors = []
+    for field, value in values.items():
+        column_type = sessions.c[field].type
+        if value is None:
+            continue
+        if isinstance(column_type, String) and column_type.length and len(value) > column_type.length:
+            errors.append(f"{field} excede {column_type.length} caracteres")
+        elif isinstance(column_type, Numeric) and column_type.precision and \
+                abs(value) >= 10 ** (column_type.precision - (column_type.scale or 0)):
+            errors.append(f"{field} acima do máximo")
+        elif isinstance(column_type, Integer) and abs(value) > _INTEGER_MAX:
+            errors.append(f"{field} acima do máximo")
+    return errors
+
+def validate_row(row):
+    """Order fields of an imported row and the list of what is wrong with it"""
+    errors = []
+    order = {
+        'produto': _text(row.get('produto')),
+        'tamanho': _text(row.get('tamanho')),
+        'opcoes': _text(row.get('opcoes')) or None,
+        'quantidade': _integer(row.get('quantidade'), 'quantidade', errors, 1),
+        'numero_paginas': _integer(row.get('numero_paginas'), 'numero_paginas', errors, 0),
+        'nome': _text(row.get('nome')),
+        'cpf': _NON_DIGIT.sub('', _text(row.get('cpf'))),
+        'cep': _NON_DIGIT.sub('', _text(row.get('cep'))),
+        'endereco_completo': _text(row.get('endereco_completo')) or None,
+        'telefone': _NON_DIGIT.sub('', _text(row.get('telefone'))) or None,
+    }
+    for field in ('produto', 'tamanho', 'quantidade', 'nome'):
+        if not _text(row.get(field)):
+            errors.append(f"{field} obrigatório")
+    # Same rules as the chat extractor
+    if not is_valid_cpf(order['cpf']):
+        errors.append("CPF inválido")
+    if not is_valid_cep(order['cep']):
+        errors.append("CEP inválido")
+    errors += column_errors(order)
+    return order, errors
+
+def price_batch(rows):
+    """Price the valid rows of a batch in one pass; rows are dicts with line, order, errors"""
+    valid = [row for row in rows if not row['errors']]
+    for row, result in zip(valid, quote_batch([row['order'] for row in valid])):
+        if not result.get('success'):
+            row['errors'].append(result.get('error'))
+            continue
+        row['quote'] = result
+        # Prices and the stored options come from the quote: checked once it is known
+        row['errors'] += column_errors(session_values('', row))
+
+def session_values(import_id, row):
+    """customer_sessions row of an imported order (priced, waiting for its charge)"""
+    order, result = row['order'], row['quote']
+    now = datetime.utcnow()
+    return {
+        'session_id': f"import-{import_id}-{row['line']}",
+        'nome': order['nome'],
+        'cpf': order['cpf'],
+        'telefone': order['telefone'],
+        'endereco_completo': order['endereco_completo'],
+        'cep': order['cep'],
+        'produto': result['produto'],
+        'tamanho': result['tamanho'],
+        # "Campo: Opção" pairs, which pricing.parse_opcoes reads back unambiguously
+        'opcoes': '; '.join(f"{campo}: {opcao}" for campo, opcao in result['opcoes'].items()) or None,
+        'quantidade': result['quantidade'],
+        'numero_paginas': result['numero_paginas'] or None,
+        'itens_carrinho': 0,
+        'preco_unitario': result['preco_unitario'],
+        'preco_total_produto': result['preco_total_produto'],
+        'status': IMPORTED_STATUS,
+        'pix_gerado': False,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+def result_line(import_id, row):
+    """NDJSON result of one row"""
+    if row['errors']:
+        return {"linha": row['line'], "success": False, "errors": row['errors']}
+    result = row['quote']
+    return {
+        "linha": row['line'],
+        "success": True,
+        "session_id": f"import-{import_id}-{row['line']}" if import_id else None,
+        "produto": result['produto'],
+        "tamanho": result['tamanho'],
+        "opcoes": result['opcoes'],
+        "quantidade": result['quantidade'],
+        "numero_paginas": result['numero_paginas'],
+        "preco_unitario": result['preco_unitario'],
+        "preco_total_produto": result['preco_total_produto'],
+    }
+
+def import_orders(rows, import_id, engine=None, batch_size=BULK_IMPORT_BATCH_SIZE, max_rows=BULK_IMPORT_MAX_ROWS):
+    """Validate, price and store (line, row or error) pairs batch by batch; yields one result dict per row
+
+    Each batch is written in its own transaction before its results are
+    yielded, so a reported row is stored. Without an engine rows are only
+    validated and priced. Ends with a summary dict ("done": true).
+    """
+    started = time.monotonic()
+    counts = {"rows": 0, "imported": 0, "rejected": 0}
+    rows = iter(rows)
+    while True:
+        batch = []
+        for line, row in islice(rows, batch_size):
+            if isinstance(row, str):
+                batch.append({"line": line, "order": None, "errors": [row]})
+            else:
+                order, errors = validate_row(row)
+                batch.append({"line": line, "order": order, "errors": errors})
+        if not batch:
+            break
+        if counts["rows"] + len(batch) > max_rows:
+            batch = batch[:max_rows - counts["rows"]]
+            truncated = True
+        else:
+            truncated = False
+
+        price_batch(batch)
+        priced = [row for row in batch if not row['errors']]
+        if engine is not None and priced:
+            with engine.begin() as conn:
+                conn.execute(insert(sessions), [session_values(import_id, row) for row in priced])
+
+        counts["rows"] += len(batch)
+        counts["imported"] += len(priced)
+        counts["rejected"] += len(batch) - len(priced)
+        for row in batch:
+            yield result_line(import_id if engine is not None else None, row)
+        if truncated:
+            yield {"success": False, "errors": [f"Limite de {max_rows} linhas por arquivo atingido; o restante foi ignorado"]}
+            break
+
+    seconds = time.monotonic() - started
+    logging.info(f"Bulk import {import_id}: {counts} in {seconds:.1f}s")
+    yield {"done": True, "import_id": import_id, **counts, "seconds": round(seconds, 3)}
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from array import array
+from types import MappingProxyType
+
+CATALOG_PATH = os.environ.get(
+    'CATALOG_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'produtos.json')
+)
+
+# Compiled catalog written by `python catalog.py` (normalized rows, price columns and the
+# rendered prompt text), loaded instead of parsing produtos.json when it matches its version
+CATALOG_SNAPSHOT_PATH = os.environ.get('CATALOG_SNAPSHOT_PATH', os.path.splitext(CATALOG_PATH)[0] + '.snapshot')
+
+# Bumped whenever the snapshot layout changes; older snapshots are ignored
+SNAPSHOT_MAGIC = b'PDCATALOG'
+SNAPSHOT_FORMAT = 1
+
+# Minimum interval (seconds) between stat() checks of the catalog file
+CATALOG_CHECK_INTERVAL = float(os.environ.get('CATALOG_CHECK_INTERVAL', '1.0'))
+
+def parse_price(value):
+    """Normalize a price cell (float, int, "R$ x,yy", "-" or None) to float or None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).replace('R$', '').strip()
+    if not value or value == '-':
+        return None
+    if ',' in value:
+        value = value.replace('.', '').replace(',', '.')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def option_label(value):
+    """Normalize an 'Opção' cell to the label used as index key"""
+    if value is True:
+        return 'Sim'
+    if value is False:
+        return 'Não'
+    return str(value).strip()
+
+def normalize_rows(rows):
+    """produtos.json rows as (produto, tamanho, campo, opcao, preco_fixo, preco_unidade, preco_pagina)"""
+    return [
+        (
+            item['Produto'],
+            item['Tamanho'],
+            item['Campo'],
+            option_label(item['Opção']),
+            parse_price(item.get('Preço Fixo')),
+            parse_price(item.get('Preço/Unidade')),
+            parse_price(item.get('Preço/Página')),
+        )
+        for item in rows
+    ]
+
+class Catalog:
+    """Immutable index over produtos.json keyed by (Produto, Tamanho, Campo, Opção)
+
+    Built from normalize_rows() output; a snapshot also brings the price columns
+    and the rendered catalog texts.
+    """
+
+    def __init__(self, rows, version, price_columns=None, rendered=None):
+        entries = {}
+        tamanhos = {}
+        campos = {}
+
+        for produto, tamanho, campo, opcao, preco_fixo, preco_unidade, preco_pagina in rows:
+            entries[(produto, tamanho, campo, opcao)] = MappingProxyType({
+                'produto': produto,
+                'tamanho': tamanho,
+                'campo': campo,
+                'opcao': opcao,
+                'preco_fixo': preco_fixo,
+                'preco_unidade': preco_unidade,
+                'preco_pagina': preco_pagina,
+            })
+
+            tamanhos.setdefault(produto, {}).setdefault(tamanho, None)
+            campos.setdefault((produto, tamanho), {}).setdefault(campo, {})[opcao] = None
+
+        self.version = version
+        self.entries = MappingProxyType(entries)
+        self.produtos = tuple(tamanhos)
+        self.tamanhos = MappingProxyType({p: tuple(s) for p, s in tamanhos.items()})
+        self.campos = MappingProxyType({
+            key: MappingProxyType({campo: tuple(opcoes) for campo, opcoes in by_campo.items()})
+            for key, by_campo in campos.items()
+        })
+        self.estruturado = self._build_structured()
+        # (fixo, unidade, pagina) arrays in entries order, from a snapshot (pricing builds them otherwise)
+        self.price_columns = price_columns
+        self._rendered = dict(rendered or {})
+        self.text = self.render()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, produto, tamanho, campo, opcao):
+        """Look up a single catalog row, or None"""
+        return self.entries.get((produto, tamanho, campo, option_label(opcao)))
+
+    def options(self, produto, tamanho, campo=None):
+        """Return the Campo -> Opções mapping for a product size (or one Campo's options)"""
+        by_campo = self.campos.get((produto, tamanho), MappingProxyType({}))
+        if campo is None:
+            return by_campo
+        return by_campo.get(campo, ())
+
+    def _build_structured(self):
+        """Build the nested produto -> tamanhos -> opcoes list used by the chat flow"""
+        produtos_estruturados = []
+        for produto in self.produtos:
+            tamanhos = []
+            for tamanho in self.tamanhos[produto]:
+                opcoes = []
+                for campo, labels in self.campos[(produto, tamanho)].items():
+                    for opcao in labels:
+                        entry = self.entries[(produto, tamanho, campo, opcao)]
+                        opcoes.append({
+                            'nome': opcao,
+                            'preco': entry['preco_unidade'] or 0.0,
+                            'campo': campo
+                        })
+                tamanhos.append({'nome': tamanho, 'opcoes': opcoes})
+            produtos_estruturados.append({'nome': produto, 'tamanhos': tamanhos})
+        return produtos_estruturados
+
+    def render(self, produto=None, tamanho=None):
+        """Render the catalog text, optionally only one product (and size), memoized"""
+        key = (produto, tamanho)
+        text = self._rendered.get(key)
+        if text is not None:
+            return text
+
+        produtos = [produto] if produto in self.tamanhos else self.produtos
+        lines = ["CATÁLOGO DE PRODUTOS DA PAPELARIA DIGITAL:", ""]
+        for i, nome in enumerate(produtos, 1):
+            lines.append(f"{i}. {nome}")
+            tamanhos = self.tamanhos[nome]
+            if tamanho in tamanhos:
+                tamanhos = (tamanho,)
+            for size in tamanhos:
+                lines.append(f"   Tamanho: {size}")
+                for campo, labels in self.campos[(nome, size)].items():
+                    lines.append(f"     {campo}:")
+                    for opcao in labels:
+                        entry = self.entries[(nome, size, campo, opcao)]
+                        lines.append(f"       - {opcao}: {format_entry_price(entry)}")
+            lines.append("")
+        text = "\n".join(lines) + "\n"
+        self._rendered[key] = text
+        return text
+
+    def render_summary(self):
+        """Render a compact catalog listing: products and their sizes only"""
+        lines = ["CATÁLOGO DE PRODUTOS DA PAPELARIA DIGITAL (resumo):", ""]
+        for i, produto in enumerate(self.produtos, 1):
+            lines.append(f"{i}. {produto} - tamanhos: {', '.join(self.tamanhos[produto])}")
+        return "\n".join(lines) + "\n"
+
+def build_snapshot(source=CATALOG_PATH, path=CATALOG_SNAPSHOT_PATH):
+    """Compile produtos.json into a snapshot file; returns the catalog version"""
+    with open(source, 'rb') as f:
+        raw = f.read()
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    rows = normalize_rows(json.loads(raw.decode('utf-8')))
+    catalog = Catalog(rows, version)
+
+    # Every text the prompts can ask for: whole catalog, each product, each product size
+    for produto in catalog.produtos:
+        catalog.render(produto)
+        for tamanho in catalog.tamanhos[produto]:
+            catalog.render(produto, tamanho)
+
+    # In entries order, the row numbers of pricing.PriceTable
+    columns = [
+        array('d', (entry[column] or 0.0 for entry in catalog.entries.values())).tobytes()
+        for column in ('preco_fixo', 'preco_unidade', 'preco_pagina')
+    ]
+    payload = pickle.dumps({
+        "version": version,
+        "rows": rows,
+        "price_columns": columns,
+        "rendered": catalog._rendered,
+    }, protocol=5)
+
+    partial = path + '.partial'
+    with open(partial, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + bytes([SNAPSHOT_FORMAT]) + payload)
+    os.replace(partial, path)
+    return version
+
+def load_snapshot(version, path=CATALOG_SNAPSHOT_PATH):
+    """Catalog from the snapshot file, or None when it is missing, outdated or of another format"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    header = SNAPSHOT_MAGIC + bytes([SNAPSHOT_FORMAT])
+    if not data.startswith(header):
+        logging.warning(f"Catalog snapshot {path} has another format, run `python catalog.py`")
+        return None
+
+    # Only our own build step writes this file (it sits next to produtos.json)
+    snapshot = pickle.loads(memoryview(data)[len(header):])
+    if snapshot["version"] != version:
+        logging.warning(f"Catalog snapshot {path} is outdated ({snapshot['version']}, catalog {version}), "
+                        f"run `python catalog.py`")
+        return None
+    columns = []
+    for raw in snapshot["price_columns"]:
+        column = array('d')
+        column.frombytes(raw)
+        columns.append(column)
+    return Catalog(snapshot["rows"], version, tuple(columns), snapshot["rendered"])
+
+def format_entry_price(entry):
+    """Format the price dimensions of a catalog row for display"""
+    parts = []
+    if entry['preco_fixo']:
+        parts.append(f"R$ {entry['preco_fixo']:.2f} (fixo)")
+    if entry['preco_unidade']:
+        parts.append(f"R$ {entry['preco_unidade']:.2f}/unidade")
+    if entry['preco_pagina']:
+        parts.append(f"R$ {entry['preco_pagina']:.2f}/página")
+    return " + ".join(parts) if parts else "R$ 0.00"
+
+_lock = threading.Lock()
+_catalog = None
+_stat_key = None
+_next_check = 0.0
+
+def _file_stat_key(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def get_catalog(force=False):
+    """Return the current Catalog, reloading only when produtos.json changed"""
+    global _catalog, _stat_key, _next_check
+
+    catalog = _catalog
+    if catalog is not None and not force and time.monotonic() < _next_check:
+        return catalog
+
+    path = CATALOG_PATH
+    with _lock:
+        catalog = _catalog
+        if catalog is not None and not force and time.monotonic() < _next_check:
+            return catalog
+
+        stat_key = _file_stat_key(path)
+        _next_check = time.monotonic() + CATALOG_CHECK_INTERVAL
+        if catalog is not None and not force and stat_key == _stat_key:
+            return catalog
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        version = hashlib.sha1(raw).hexdigest()[:12]
+        _stat_key = stat_key
+
+        if catalog is not None and catalog.version == version:
+            return catalog
+
+        try:
+            new_catalog = load_snapshot(version) or Catalog(normalize_rows(json.loads(raw.decode('utf-8'))), version)
+        except (ValueError, KeyError, TypeError) as e:
+            if catalog is None:
+                raise
+            logging.error(f"Invalid catalog edit ignored, keeping version {catalog.version}: {e}")
+            return catalog
+
+        logging.info(f"Catalog loaded: {len(new_catalog)} rows, version {version}")
+        _catalog = new_catalog
+        return new_catalog
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    version = build_snapshot()
+    logging.info(f"Catalog snapshot written to {CATALOG_SNAPSHOT_PATH}, version {version}")
@@ -0,0 +1,145 @@
+import os
+import re
+import math
+
+# Two words are the same word with a typo when their trigram similarity (Dice) reaches this
+SEARCH_WORD_SIMILARITY = float(os.environ.get('SEARCH_WORD_SIMILARITY', '0.5'))
+
+# Minimum score of a match: share of the phrase's words (weighted by rarity) found in the text
+SEARCH_MIN_SCORE = float(os.environ.get('SEARCH_MIN_SCORE', '0.6'))
+
+# Shorter words, and anything with digits (sizes, grammages), must match exactly
+SEARCH_MIN_FUZZY_LENGTH = 4
+
+# Query words whose fuzzy matches are remembered per index (chat messages repeat the same words)
+SEARCH_WORD_CACHE_SIZE = 10000
+
+_SIZE = re.compile(r'(\d+(?:[,.]\d+)?)\s*[x×]\s*(\d+(?:[,.]\d+)?)')
+_WORD = re.compile(r'[a-z0-9]+(?:,\d+)?')
+
+# Words that never tell catalog entries apart
+_STOPWORDS = {'a', 'o', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na', 'para', 'pra', 'so'}
+
+def search_words(folded):
+    """Words of folded text as indexed: sizes joined ("14 x 21" -> "14x21"), no stopwords or single letters"""
+    folded = _SIZE.sub(lambda m: f"{m.group(1)}x{m.group(2)}".replace('.', ','), folded)
+    return [word for word in _WORD.findall(folded) if word not in _STOPWORDS and (len(word) > 1 or word.isdigit())]
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _fuzzy(word):
+    return len(word) >= SEARCH_MIN_FUZZY_LENGTH and not any(char.isdigit() for char in word)
+
+class SearchIndex:
+    """Accent-insensitive, typo-tolerant lookup of catalog phrases (trigram postings over their words)
+
+    Built from (folded phrase, kind, key) entries; several phrases may point to the
+    same key (aliases). Queries are folded text too (extraction.fold).
+    """
+
+    def __init__(self, entries):
+        self.docs = []
+        word_docs = {}
+        for phrase, kind, key in entries:
+            words = tuple(dict.fromkeys(search_words(phrase)))
+            if not words:
+                continue
+            for word in words:
+                word_docs.setdefault(word, []).append(len(self.docs))
+            self.docs.append((kind, key, words))
+
+        # Words found in many phrases ("livro", "capa") weigh less than distinctive ones ("grampo")
+        total = len(self.docs)
+        self.word_docs = {word: tuple(ids) for word, ids in word_docs.items()}
+        self.weights = {word: math.log(1 + total / len(ids)) for word, ids in word_docs.items()}
+        self.doc_weights = [sum(self.weights[word] for word in words) for _, _, words in self.docs]
+
+        self.postings = {}
+        self.gram_counts = {}
+        for word in self.word_docs:
+            if _fuzzy(word):
+                grams = _trigrams(word)
+                self.gram_counts[word] = len(grams)
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(word)
+        self._similar = {}
+
+    def similar_words(self, word):
+        """{indexed word: similarity} for one query word (exact match only when it is indexed)"""
+        if word in self.weights:
+            return {word: 1.0}
+        similar = self._similar.get(word)
+        if similar is not None:
+            return similar
+
+        similar = {}
+        if _fuzzy(word):
+            grams = _trigrams(word)
+            shared = {}
+            for gram in grams:
+                for candidate in self.postings.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, count in shared.items():
+                similarity = 2 * count / (len(grams) + self.gram_counts[candidate])
+                if similarity >= SEARCH_WORD_SIMILARITY:
+                    similar[candidate] = similarity
+        if len(self._similar) >= SEARCH_WORD_CACHE_SIZE:
+            self._similar.clear()
+        self._similar[word] = similar
+        return similar
+
+    def _match(self, similar, kind, keys):
+        # doc id -> {doc word: (similarity, query word position)}
+        matched = {}
+        for position, words_like in enumerate(similar):
+            for word, similarity in words_like.items():
+                for doc_id in self.word_docs[word]:
+                    doc_kind, key, _ = self.docs[doc_id]
+                    if (kind and doc_kind != kind) or (keys is not None and key not in keys):
+                        continue
+                    words = matched.setdefault(doc_id, {})
+                    if similarity > words.get(word, (0.0,))[0]:
+                        words[word] = (similarity, position)
+        return matched
+
+    def _ranked(self, folded, kind, keys, whole_text, typos_only=False):
+        query_words = search_words(folded)
+        similar = [self.similar_words(word) for word in query_words]
+        if typos_only and all(word in self.weights or not words_like for word, words_like in zip(query_words, similar)):
+            # Every word is either indexed as is or unknown: nothing misspelled to look for
+            return []
+        best = {}
+        for doc_id, words in self._match(similar, kind, keys).items():
+            if typos_only and all(similarity == 1.0 for similarity, _ in words.values()):
+                continue
+            score = sum(self.weights[word] * similarity for word, (similarity, _) in words.items()) / self.doc_weights[doc_id]
+            if whole_text:
+                # Resolving a value: words of the text the phrase does not explain count against it
+                score *= len({position for _, position in words.values()}) / len(query_words)
+            doc_kind, key, _ = self.docs[doc_id]
+            if score > best.get((doc_kind, key), 0.0):
+                best[(doc_kind, key)] = score
+        return sorted(((score, kind, key) for (kind, key), score in best.items()), key=lambda item: -item[0])
+
+    def search(self, folded, kind=None, keys=None, limit=5):
+        """Best matches of the whole text: [(score, kind, key)], highest first"""
+        return self._ranked(folded, kind, keys, True)[:limit]
+
+    def resolve(self, folded, kind, keys=None):
+        """Key the whole text refers to, or None when nothing (or more than one key) matches well enough"""
+        results = self._ranked(folded, kind, keys, True)
+        if not results or results[0][0] < SEARCH_MIN_SCORE:
+            return None
+        if len(results) > 1 and results[1][0] == results[0][0]:
+            return None
+        return results[0][2]
+
+    def mentions(self, folded, kind=None, keys=None, typos_only=False):
+        """Entries mentioned anywhere in a message: [(score, kind, key)] above SEARCH_MIN_SCORE
+
+        With typos_only, only entries matched through at least one misspelled word.
+        """
+        results = self._ranked(folded, kind, keys, False, typos_only)
+        return [result for result in results if result[0] >= SEARCH_MIN_SCORE]
@@ -0,0 +1,84 @@
+import time
+import asyncio
+
+from prompts import record_prompt_usage
+from metrics import stage
+from routing import record_route
+from response_cache import response_cache
+from app import (
+    app,
+    OPENAI_API_KEY,
+    init_database,
+    prepare_chat_turn,
+    finish_chat_turn,
+    cache_chat_reply,
+    commit_unit_of_work,
+)
+
+_openai_client = None
+
+def get_async_openai_client():
+    """Return the process-wide AsyncOpenAI client, creating it on first use"""
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+async def close_async_clients():
+    """Close the shared async clients (ASGI lifespan shutdown)"""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+def _run_and_release(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Flush this step's unit of work so the pooled connection is not held across awaits
+        commit_unit_of_work()
+
+async def run_db(func, *args, **kwargs):
+    """Run blocking database work on the default thread pool, sharing the caller's app context"""
+    # asyncio.to_thread copies contextvars, so the worker thread sees the same
+    # app context and therefore the same Flask-SQLAlchemy session
+    return await asyncio.to_thread(_run_and_release, func, *args, **kwargs)
+
+async def chat_turn_async(session_id, user_message):
+    """Run one /chat turn: DB work on threads, the OpenAI call awaited; returns (reply, pix_job)"""
+    # Flask's before_request hooks do not run on this path; only a flag check once set up
+    # (the ASGI lifespan startup warms up before the first request anyway)
+    init_database()
+    with app.app_context():
+        customer_session, should_generate_pix, messages, route, cache_key, local_response = await run_db(
+            prepare_chat_turn, session_id, user_message
+        )
+
+        cached_response = response_cache.get(cache_key)
+        if local_response is not None:
+            ai_response = local_response
+        elif cached_response is not None:
+            ai_response = cached_response
+        else:
+            openai_started = time.perf_counter()
+            with stage('openai'):
+                response = await get_async_openai_client().chat.completions.create(
+                    model=route['model'],
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=route['max_tokens']
+                )
+
+            record_route(route, time.perf_counter() - openai_started, response.usage)
+            record_prompt_usage(response.usage)
+            ai_response = response.choices[0].message.content
+
+        # Order/PIX planning queues the charge on the PIX workers; the reply never waits on the gateway
+        final_response, pix_job = await run_db(
+            finish_chat_turn, session_id, customer_session, should_generate_pix, ai_response
+        )
+        if cached_response is None:
+            cache_chat_reply(cache_key, ai_response, final_response)
+
+        return final_response, pix_job
@@ -0,0 +1,208 @@
+import os
+import re
+import threading
+
+from catalog import get_catalog
+from pricing import quote, get_price_table, resolve_produto
+from extraction import NEGATION, fold, get_vocabulary, is_valid_cpf, is_valid_cep
+
+# Answer turns that only carry order data (or invalid CPF/CEP) from templates, without OpenAI
+DIALOGUE_LOCAL_REPLIES = os.environ.get('DIALOGUE_LOCAL_REPLIES', '1') == '1'
+
+# Words left over after removing the recognized data that still count as a pure data turn
+DIALOGUE_MAX_FREE_WORDS = int(os.environ.get('DIALOGUE_MAX_FREE_WORDS', '1'))
+
+# Fields asked in order; the PIX charge is issued once the first seven are filled
+ORDER_FIELDS = ('produto', 'tamanho', 'opcoes', 'quantidade', 'nome', 'cpf', 'cep', 'endereco_completo')
+
+# Words that carry no meaning of their own around order data ("meu CPF é ...", "quero 100 livros ...")
+FILLER_WORDS = {
+    'a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'um', 'uma', 'com', 'sem', 'em', 'no', 'na',
+    'para', 'pra', 'por', 'favor', 'ok', 'sim', 'entao', 'tambem', 'so', 'apenas',
+    'eu', 'me', 'meu', 'minha', 'sou', 'chamo', 'nome', 'cpf', 'cep', 'telefone', 'celular', 'whatsapp',
+    'endereco', 'moro', 'quero', 'queria', 'preciso', 'gostaria', 'vou', 'querer', 'fazer', 'pedir',
+    'unidade', 'unidades', 'exemplar', 'exemplares', 'copia', 'copias', 'livro', 'livros', 'peca', 'pecas',
+    'pagina', 'paginas', 'folha', 'folhas', 'tamanho', 'quantidade', 'opcao', 'opcoes',
+    'mais', 'outro', 'outra', 'item', 'itens', 'produto', 'adicionar', 'adiciona', 'acrescentar', 'carrinho',
+}
+
+# Anything that reads like a question or a request for advice goes to the LLM
+_QUESTION = re.compile(
+    r'\?|\b(?:qual|quais|quanto|quantos|quantas|como|quando|onde|porque|por que|diferenca|prazo|desconto|'
+    r'pode|podem|voces|tem|existe|ajuda|duvida|recomenda|melhor|cancelar|mudar|trocar|alterar)\b'
+)
+_WORDS = re.compile(r'[a-z]+')
+_DIGIT_RUNS = re.compile(r'\d[\d.\-\s]*\d')
+
+QUESTIONS = {
+    'produto': "Qual produto você deseja? Trabalhamos com: {produtos}.",
+    'tamanho': "Para o {produto}, temos os tamanhos: {tamanhos}. Qual você prefere?",
+    'opcoes': "Quais opções você deseja para o {produto} {tamanho}?\n{opcoes}",
+    'quantidade': "Quantas unidades você precisa?",
+    'nome': "Para finalizar o pedido, qual é o seu nome completo?",
+    'cpf': "Qual é o seu CPF?",
+    'cep': "Qual é o CEP de entrega?",
+    'endereco_completo': "Qual é o endereço completo de entrega (rua e número)?",
+}
+
+INVALID_CPF = "O CPF informado não é válido. 🙏 Pode conferir e enviar novamente os 11 dígitos?"
+INVALID_CEP = "O CEP informado não parece válido. 🙏 Envie os 8 dígitos, por exemplo 01310-100."
+
+_stats_lock = threading.Lock()
+dialogue_stats = {"turns": 0, "local": 0, "llm": 0}
+
+def record_turn(reason):
+    """Count one chat turn by how it was answered (a local reason, or 'llm')"""
+    with _stats_lock:
+        dialogue_stats["turns"] += 1
+        dialogue_stats["llm" if reason == 'llm' else "local"] += 1
+        if reason != 'llm':
+            dialogue_stats[reason] = dialogue_stats.get(reason, 0) + 1
+
+def dialogue_snapshot():
+    """Counters plus the fraction of turns answered without OpenAI"""
+    with _stats_lock:
+        stats = dict(dialogue_stats)
+    stats["local_ratio"] = round(stats["local"] / stats["turns"], 4) if stats["turns"] else 0.0
+    return stats
+
+def free_words(message, extracted_data):
+    """Words of the message that are neither recognized order data nor filler"""
+    folded = fold(message)
+    for value in extracted_data.values():
+        if isinstance(value, str) and not value.isdigit():
+            folded = folded.replace(fold(value), ' ')
+    vocabulary = get_vocabulary()
+    folded = vocabulary.pattern.sub(' ', folded)
+    # Misspelled catalog words ("grampu") were read as order data too; correctly spelled ones
+    # left over were not recognized and still count
+    return [
+        word for word in _WORDS.findall(folded)
+        if word not in FILLER_WORDS and len(word) > 1
+        and (word in vocabulary.index.weights or not vocabulary.index.similar_words(word))
+    ]
+
+def missing_fields(customer_session):
+    return [field for field in ORDER_FIELDS if not getattr(customer_session, field, None)]
+
+def _invalid_document(message, extracted_data, customer_session):
+    folded = fold(message)
+    digit_runs = [re.sub(r'\D', '', run) for run in _DIGIT_RUNS.findall(folded)]
+    if 'cpf' in folded and not customer_session.cpf and 'cpf' not in extracted_data:
+        if any(len(run) >= 9 and not is_valid_cpf(run) for run in digit_runs):
+            return 'invalid_cpf', INVALID_CPF
+    if 'cep' in folded and not customer_session.cep and 'cep' not in extracted_data:
+        if any(len(run) >= 5 and not is_valid_cep(run) for run in digit_runs):
+            return 'invalid_cep', INVALID_CEP
+    return None
+
+def _acknowledge(extracted_data):
+    parts = []
+    for field, value in extracted_data.items():
+        if field == 'quantidade':
+            parts.append(f"{value} unidades")
+        elif field == 'numero_paginas':
+            parts.append(f"{value} páginas")
+        elif field == 'cpf':
+            parts.append("CPF ✅")
+        elif field == 'cep':
+            parts.append(f"CEP {value[:5]}-{value[5:]}")
+        elif field == 'telefone':
+            parts.append(f"telefone {value}")
+        elif field == 'endereco_completo':
+            parts.append(f"endereço {value}")
+        elif field in ('nome', 'produto', 'tamanho', 'opcoes'):
+            parts.append(str(value))
+    return f"Anotado: {', '.join(parts)}. 📝" if parts else ""
+
+def _cart_line(cart_quotes, customer_session):
+    added = "; ".join(
+        f"{result['quantidade']} x {result['produto']} {result['tamanho']} (R$ {result['preco_total_produto']:.2f})"
+        for result in cart_quotes
+    )
+    return (f"🛒 Adicionado ao carrinho: {added}. "
+            f"Seu carrinho tem {customer_session.itens_carrinho} item(ns); tudo sai em um único PIX.")
+
+def _quote_line(customer_session):
+    result = quote(
+        customer_session.produto,
+        customer_session.tamanho,
+        customer_session.opcoes,
+        customer_session.quantidade,
+        customer_session.numero_paginas
+    )
+    if not result.get('success'):
+        return None
+    if not result['preco_total_produto']:
+        # Priced only by options not chosen yet: no meaningful total to confirm
+        return ""
+    return (f"💰 Orçamento: {result['quantidade']} x {result['produto']} {result['tamanho']} = "
+            f"R$ {result['preco_total_produto']:.2f} (R$ {result['preco_unitario']:.2f}/unidade). "
+            f"O frete é calculado pelo CEP de entrega.")
+
+def _question(field, customer_session):
+    catalog = get_catalog()
+    produto = resolve_produto(get_price_table(), customer_session.produto)
+    if field == 'produto':
+        return QUESTIONS['produto'].format(produtos=', '.join(catalog.produtos))
+    if field == 'tamanho':
+        if not produto:
+            return None
+        return QUESTIONS['tamanho'].format(produto=produto, tamanhos=', '.join(catalog.tamanhos[produto]))
+    if field == 'opcoes':
+        options = catalog.options(produto, customer_session.tamanho) if produto else {}
+        if not options:
+            return None
+        listing = "\n".join(
+            f"- {campo}: {', '.join(labels)}" for campo, labels in options.items() if campo != 'Produto'
+        )
+        return QUESTIONS['opcoes'].format(produto=produto, tamanho=customer_session.tamanho, opcoes=listing)
+    return QUESTIONS[field]
+
+def local_reply(user_message, customer_session, extracted_data, cart_quotes=()):
+    """Template reply for a turn the order state machine can answer, or None to ask OpenAI
+
+    Returns (reason, reply). Handled: invalid CPF/CEP, and turns that only carry
+    order data (or add products to the cart, cart_quotes being the lines added),
+    answered with what was recorded, a price once the product is priceable, and
+    the next missing field. Completed orders are answered by the PIX flow, which
+    replaces the reply anyway.
+    """
+    if not DIALOGUE_LOCAL_REPLIES or customer_session is None or customer_session.pix_gerado:
+        return None
+    if _QUESTION.search(fold(user_message)):
+        return None
+
+    invalid = _invalid_document(user_message, extracted_data, customer_session)
+    if invalid:
+        return invalid
+
+    if NEGATION.search(get_vocabulary().pattern.sub(' ', fold(user_message))):
+        # "não quero shrink" is not data to acknowledge; catalog options such as "Sem Shrink" are removed first
+        return None
+
+    if not (extracted_data or cart_quotes) or len(free_words(user_message, extracted_data)) > DIALOGUE_MAX_FREE_WORDS:
+        return None
+
+    missing = missing_fields(customer_session)
+    if not missing or missing == ['endereco_completo']:
+        # Every field the charge needs is there: the PIX flow writes the reply
+        return 'order_complete', "✅ Recebi todos os dados do pedido."
+
+    lines = [_cart_line(cart_quotes, customer_session) if cart_quotes else "", _acknowledge(extracted_data)]
+    reason = 'cart' if cart_quotes else 'next_field'
+    if {'produto', 'tamanho', 'opcoes', 'quantidade', 'numero_paginas'} & extracted_data.keys():
+        if all(getattr(customer_session, field) for field in ('produto', 'tamanho', 'opcoes', 'quantidade')):
+            quote_line = _quote_line(customer_session)
+            if quote_line is None:
+                # Size or option the catalog does not have: let the LLM sort it out
+                return None
+            if quote_line:
+                lines.append(quote_line)
+                reason = 'quote'
+
+    question = _question(missing[0], customer_session)
+    if question is None:
+        return None
+    lines.append(question)
+    return reason, "\n\n".join(line for line in lines if line)
@@ -0,0 +1,395 @@
+import re
+import threading
+
+from catalog import get_catalog
+from catalog_search import SearchIndex
+
+# Accent folding that keeps string length, so match offsets stay valid
+_FOLD = str.maketrans(
+    'áàâãäéèêëíìîïóòôõöúùûüçÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇ',
+    'aaaaaeeeeiiiiooooouuuucAAAAAEEEEIIIIOOOOOUUUUC'
+)
+
+# Paper formats customers use instead of the catalog size
+SIZE_ALIASES = {
+    'a4': '21x29,7',
+    'a5': '14x21',
+}
+
+# Common phrasings for catalog options, applied only when the option exists
+OPTION_SYNONYMS = {
+    'com shrink': 'Shrink Adicional',
+    'shrink': 'Shrink Adicional',
+    'wire o': 'Wire-o',
+    'wireo': 'Wire-o',
+    'pur': 'Quadrado ( P.U.R. )',
+    'lombada quadrada': 'Quadrado ( P.U.R. )',
+    'laminacao fosca': 'Laminação Fosco',
+    'laminacao brilhante': 'Laminação Brilho',
+    'preto e branco': 'Preto / Branco',
+}
+
+# Fields and tokens scanned in a single finditer pass over the folded message
+_TOKENS = (
+    r'(?P<cpf>\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b)'
+    r'|(?P<telefone>\(?\b\d{2}\)?\s?\d{4,5}-?\d{4}\b)'
+    r'|(?P<cep>\b\d{5}-?\d{3}\b)'
+    r'|\b(?P<quantidade>\d+)\s*(?:unidades?|pecas?|exemplares?|copias?|livros?)\b'
+    r'|\b(?P<paginas>\d+)\s*(?:paginas?|folhas?|pags?)\b'
+)
+
+# Asking to add one more product line to the order (the current one goes to the cart)
+_ADD_ITEM = re.compile(
+    r'\b(?:mais (?:um|uma) (?:item|produto|livro|modelo)|outro (?:item|produto|livro|modelo)|outra encomenda|'
+    r'no carrinho)\b'
+)
+
+# "Adiciona ..." adds a product line only when an item noun follows or a product is named;
+# "adiciona laminação fosca" adds an option to the current line
+_ADD_VERB = re.compile(r'\b(?:tambem quero|adicion(?:ar|a|e)|acrescent(?:ar|a|e))\b(?P<rest>(?:\s+\w+){0,4})')
+_ITEM_NOUN = re.compile(r'\b(?:ite(?:m|ns)|produtos?|livros?|modelos?)\b')
+
+# Where one product line of a message may end: ";", "+", new lines, commas and "e"
+_ITEM_SPLIT = re.compile(r'[;+\n,]|\be\b')
+
+# Fields of one product line (models.CART_LINE_FIELDS)
+_LINE_FIELDS = ('produto', 'tamanho', 'opcoes', 'quantidade', 'numero_paginas')
+
+_NAME_WORD = r'[A-ZÁÀÂÃÉÈÊÍÌÓÒÔÕÚÙÇ][a-záàâãéèêíìóòôõúùç]+'
+_FULL_NAME = _NAME_WORD + r'(?:\s+(?:(?:d[aeo]s?|e)\s+)?' + _NAME_WORD + r')*'
+
+_NAME_PATTERNS = (
+    re.compile(r'\b(?:meu nome é|me chamo|eu sou|sou)\s+(' + _FULL_NAME + ')', re.IGNORECASE),
+    re.compile(r'nome[:\s]+(' + _FULL_NAME + ')', re.IGNORECASE),
+    # Bare full name: only capitalized words count here
+    re.compile(r'\b(' + _NAME_WORD + r'\s+(?:(?:d[aeo]s?|e)\s+)?' + _FULL_NAME + r')\b'),
+)
+
+_ADDRESS_PATTERNS = (
+    re.compile(r'(?:endereço|endereco|moro|reside|residencia|residência)(?:\s+(?:é|na|no|em))?[:\s]+([^,\n]+(?:,\s*\d+)?)', re.IGNORECASE),
+    re.compile(r'\b((?:rua|r\.|avenida|av\.?|travessa|alameda|praça|praca|rodovia|estrada)\s+[^,\n]+,?\s*\d+)', re.IGNORECASE),
+)
+
+# Words that cannot start a customer name
+_NAME_STOPWORDS = {
+    'da', 'de', 'do', 'das', 'dos', 'e', 'sou', 'eu', 'meu', 'minha', 'quero', 'moro', 'oi', 'ola', 'bom', 'boa',
+    # Street types: "Avenida Paulista, 1578" is an address, not a name
+    'rua', 'avenida', 'av', 'travessa', 'alameda', 'praca', 'rodovia', 'estrada',
+}
+
+_NON_DIGIT = re.compile(r'\D')
+_PHONE_WORD = re.compile(r'\b(?:telefone|tel|celular|cel|whatsapp|whats|zap|fone)\b')
+_SPACES = re.compile(r'\s+')
+
+# "não quero shrink", "sem o shrink", "tira a laminação": the option right after is not wanted.
+# Catalog options starting with these words ("Sem Shrink") are matched whole and never negated
+NEGATION = re.compile(r'\b(?:nao|nem|sem|tira|tirar|tire|retira|retirar|remove|remover)\b')
+_NEGATED = re.compile(
+    NEGATION.pattern + r'(?:\s+(?:quero|queria|preciso|precisa|vou|mais|o|a|os|as|com|de|do|da))*\s*$'
+)
+
+def fold(text):
+    """Lowercase and strip accents without changing the string length"""
+    return text.lower().translate(_FOLD)
+
+def is_valid_cpf(cpf):
+    """Validate an 11-digit CPF including its check digits"""
+    cpf = _NON_DIGIT.sub('', cpf or '')
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+    for size in (9, 10):
+        total = sum(int(cpf[i]) * (size + 1 - i) for i in range(size))
+        digit = (total * 10) % 11 % 10
+        if digit != int(cpf[size]):
+            return False
+    return True
+
+def is_valid_cep(cep):
+    """Validate an 8-digit CEP"""
+    cep = _NON_DIGIT.sub('', cep or '')
+    return len(cep) == 8 and cep != '00000000'
+
+def _said_cpf(folded, start):
+    """True when the number at start is called a CPF: the nearest of "cpf" or a phone word before it"""
+    cpf_at = folded.rfind('cpf', 0, start)
+    phone_at = max((match.start() for match in _PHONE_WORD.finditer(folded, 0, start)), default=-1)
+    if cpf_at < 0 and phone_at < 0:
+        return 'cpf' in folded and not _PHONE_WORD.search(folded)
+    return cpf_at > phone_at
+
+def _alternation(phrases):
+    """Regex alternation over folded phrases, longest first, tolerant to spacing"""
+    parts = []
+    for phrase in sorted(set(phrases), key=len, reverse=True):
+        parts.append(r'\s+'.join(re.escape(word) for word in phrase.split()))
+    return '|'.join(parts) if parts else r'(?!)'
+
+def _size_key(text):
+    return _SPACES.sub('', text).replace('×', 'x').replace('.', ',')
+
+def product_aliases(nome):
+    """Derive the phrases that refer to a catalog product name"""
+    folded = fold(nome)
+    base = re.sub(r'\s*\(.*?\)', '', folded).strip()
+    aliases = {folded, base}
+    aliases.update(m.strip() for m in re.findall(r'\((.*?)\)', folded))
+
+    segments = [s.strip() for s in base.split('/')]
+    if len(segments) > 1:
+        prefix = segments[0].rsplit(' ', 1)[0]
+        aliases.add(segments[0])
+        aliases.update(f"{prefix} {segment}" for segment in segments[1:])
+
+    for alias in list(aliases):
+        if alias.startswith('livro '):
+            aliases.add('livros ' + alias[len('livro '):])
+            aliases.add(alias[len('livro '):])
+    return {alias for alias in aliases if alias and alias != 'livro'}
+
+class Vocabulary:
+    """Compiled product, size and option vocabulary for one catalog version"""
+
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.produtos = {}
+        self.tamanhos = {}
+        self.opcoes = {}
+        self.product_words = set()
+
+        for produto in catalog.produtos:
+            for alias in product_aliases(produto):
+                self.produtos.setdefault(alias, produto)
+            self.product_words.update(w for w in fold(produto).split() if len(w) > 3)
+
+        sizes = set()
+        for produto, tamanhos in catalog.tamanhos.items():
+            sizes.update(tamanhos)
+        size_patterns = []
+        for tamanho in sizes:
+            self.tamanhos[_size_key(fold(tamanho))] = tamanho
+            width, _, height = fold(tamanho).partition('x')
+            size_patterns.append(
+                re.escape(width).replace(',', '[,.]') + r'\s*[x×]\s*' + re.escape(height).replace(',', '[,.]')
+            )
+        for alias, tamanho in SIZE_ALIASES.items():
+            if tamanho in sizes:
+                self.tamanhos[alias] = tamanho
+                size_patterns.append(r'\b' + re.escape(alias) + r'\b')
+
+        labels = set()
+        # (produto, tamanho) and produto -> the option values above that it offers
+        self.offered = {}
+        for (produto, tamanho), by_campo in catalog.campos.items():
+            offered = self.offered.setdefault((produto, tamanho), set())
+            for campo, opcoes in by_campo.items():
+                if campo == 'Produto':
+                    continue
+                folded_campo = fold(campo)
+                if set(opcoes) <= {'Sim', 'Não'}:
+                    self.opcoes.setdefault(f"com {folded_campo}", f"{campo}: Sim")
+                    self.opcoes.setdefault(f"sem {folded_campo}", f"{campo}: Não")
+                    offered.update((f"{campo}: Sim", f"{campo}: Não"))
+                    continue
+                for opcao in opcoes:
+                    labels.add(opcao)
+                    offered.add(opcao)
+                    if opcao == 'Nenhum':
+                        self.opcoes.setdefault(f"sem {folded_campo}", f"{campo}: Nenhum")
+                        offered.add(f"{campo}: Nenhum")
+                    elif len(opcao) > 3:
+                        self.opcoes.setdefault(fold(opcao), opcao)
+            self.offered.setdefault(produto, set()).update(offered)
+        for phrase, opcao in OPTION_SYNONYMS.items():
+            if opcao in labels:
+                self.opcoes.setdefault(phrase, opcao)
+
+        campos = {campo for by_campo in catalog.campos.values() for campo in by_campo if campo != 'Produto'}
+        self.index = SearchIndex(
+            [(alias, 'produto', produto) for alias, produto in self.produtos.items()]
+            + [(key, 'tamanho', tamanho) for key, tamanho in self.tamanhos.items()]
+            + [(phrase, 'opcao', opcao) for phrase, opcao in self.opcoes.items()]
+            + [(fold(campo), 'campo', campo) for campo in campos]
+        )
+
+        self.pattern = re.compile(
+            _TOKENS
+            + r'|\b(?P<produto>' + _alternation(self.produtos) + r')\b'
+            + r'|(?<![\d,.])(?P<tamanho>' + '|'.join(sorted(size_patterns, key=len, reverse=True)) + r')(?![\d,.]*\d)'
+            + r'|\b(?P<opcao>' + _alternation(self.opcoes) + r')\b'
+        )
+
+_lock = threading.Lock()
+_vocabulary = None
+
+def get_vocabulary():
+    """Return the compiled Vocabulary for the current catalog version"""
+    global _vocabulary
+    catalog = get_catalog()
+    vocabulary = _vocabulary
+    if vocabulary is None or vocabulary.version != catalog.version:
+        with _lock:
+            vocabulary = _vocabulary
+            if vocabulary is None or vocabulary.version != catalog.version:
+                vocabulary = Vocabulary(catalog)
+                _vocabulary = vocabulary
+    return vocabulary
+
+def extract_fields(message, vocabulary=None, produto=None, tamanho=None):
+    """Walk the message once and return every recognizable field
+
+    Options are kept only if the product (and size) offers them: the ones the
+    message names, else the given produto/tamanho (the session's line).
+    """
+    vocabulary = vocabulary or get_vocabulary()
+    folded = fold(message)
+    fields = {}
+    opcoes = []
+
+    for match in vocabulary.pattern.finditer(folded):
+        kind = match.lastgroup
+        text = match.group(kind)
+
+        if kind == 'produto':
+            fields.setdefault('produto', vocabulary.produtos[_SPACES.sub(' ', text)])
+        elif kind == 'tamanho':
+            fields.setdefault('tamanho', vocabulary.tamanhos.get(_size_key(text)))
+        elif kind == 'opcao':
+            opcao = vocabulary.opcoes[_SPACES.sub(' ', text)]
+            if opcao not in opcoes and not _NEGATED.search(folded, max(0, match.start() - 40), match.start()):
+                opcoes.append(opcao)
+        elif kind == 'cpf':
+            digits = _NON_DIGIT.sub('', text)
+            if is_valid_cpf(digits):
+                fields.setdefault('cpf', digits)
+            elif len(digits) >= 10 and '.' not in text and not _said_cpf(folded, match.start()):
+                # A mistyped CPF is not a phone number: bare digits, not said to be a CPF
+                fields.setdefault('telefone', digits)
+        elif kind == 'telefone':
+            digits = _NON_DIGIT.sub('', text)
+            if len(digits) >= 10:
+                fields.setdefault('telefone', digits)
+        elif kind == 'cep':
+            digits = _NON_DIGIT.sub('', text)
+            if is_valid_cep(digits):
+                fields.setdefault('cep', digits)
+        elif kind == 'quantidade':
+            fields.setdefault('quantidade', int(text))
+        elif kind == 'paginas':
+            fields.setdefault('numero_paginas', int(text))
+
+    if 'produto' not in fields or not opcoes:
+        # Misspelled product and option names the exact vocabulary missed ("livro grampu", "espirau")
+        exact_opcoes = bool(opcoes)
+        for _, kind, key in vocabulary.index.mentions(folded, typos_only=True):
+            if kind == 'produto':
+                fields.setdefault('produto', key)
+            elif kind == 'opcao' and not exact_opcoes and key not in opcoes and not NEGATION.search(folded):
+                # No position to tell which option a negation is about: none is taken
+                opcoes.append(key)
+
+    if opcoes:
+        if fields.get('produto'):
+            produto, tamanho = fields['produto'], fields.get('tamanho') or (tamanho if fields['produto'] == produto else None)
+        offered = vocabulary.offered.get((produto, tamanho) if tamanho else produto)
+        if offered is not None:
+            opcoes = [opcao for opcao in opcoes if opcao in offered]
+    if opcoes:
+        fields['opcoes'] = ', '.join(opcoes)
+    return {key: value for key, value in fields.items() if value is not None}
+
+def wants_another_item(message, vocabulary=None):
+    """True when the customer asks to add one more product to the order"""
+    folded = fold(message)
+    if _ADD_ITEM.search(folded):
+        return True
+    verb = _ADD_VERB.search(folded)
+    if verb is None:
+        return False
+    if _ITEM_NOUN.search(verb.group('rest')):
+        return True
+    vocabulary = vocabulary or get_vocabulary()
+    return any(match.lastgroup == 'produto' for match in vocabulary.pattern.finditer(folded))
+
+def adds_option(message, vocabulary=None):
+    """True when the customer asks to add something to the current line rather than a new product"""
+    return bool(_ADD_VERB.search(fold(message))) and not wants_another_item(message, vocabulary)
+
+def merge_opcoes(current, added):
+    """Options of a line plus the ones added; parse_opcoes keeps the last option of each Campo"""
+    present = fold(current).lower()
+    tokens = [token.strip() for token in added.split(',') if fold(token.strip()).lower() not in present]
+    return ', '.join([current] + tokens) if tokens else current
+
+def extract_items(message, vocabulary=None):
+    """Product lines of a message naming several products, in order; [] for zero or one product
+
+    The message is cut at separators and each piece naming a product starts a
+    new line; pieces without one ("50 unidades", "shrink") belong to the line
+    before them.
+    """
+    vocabulary = vocabulary or get_vocabulary()
+    folded = fold(message)
+    starts = [match.start() for match in vocabulary.pattern.finditer(folded) if match.lastgroup == 'produto']
+    if len(starts) < 2:
+        return []
+
+    # Offsets where a line ends: the last separator before each product mention after the first
+    cuts = []
+    separators = [match.start() for match in _ITEM_SPLIT.finditer(folded)]
+    for product_start in starts[1:]:
+        cut = max((offset for offset in separators if offset < product_start), default=None)
+        if cut is not None and cut > starts[0] and (not cuts or cut > cuts[-1]):
+            cuts.append(cut)
+
+    items = []
+    for line_start, line_end in zip([0] + cuts, cuts + [len(message)]):
+        fields = extract_fields(message[line_start:line_end], vocabulary)
+        if 'produto' in fields:
+            items.append({field: fields[field] for field in _LINE_FIELDS if field in fields})
+    return items if len(items) > 1 else []
+
+def _extract_name(message, vocabulary):
+    for pattern in _NAME_PATTERNS:
+        name_match = pattern.search(message)
+        if name_match:
+            potential_name = name_match.group(1).strip()
+            words = fold(potential_name).split()
+            # Validate it's not just a product name
+            if (len(words) >= 2 and words[0] not in _NAME_STOPWORDS
+                    and not vocabulary.product_words.intersection(words) and 'livro' not in words):
+                return potential_name
+    return None
+
+def _extract_address(message):
+    for pattern in _ADDRESS_PATTERNS:
+        address_match = pattern.search(message)
+        if address_match:
+            potential_address = address_match.group(1).strip()
+            # Validate it looks like an address
+            if any(char.isdigit() for char in potential_address) and len(potential_address) > 5:
+                return potential_address
+    return None
+
+def extract_customer_data_from_message(message, customer_session):
+    """Extract the customer data fields the session does not have yet (and options asked to be added)"""
+    vocabulary = get_vocabulary()
+    fields = extract_fields(message, vocabulary, customer_session.produto, customer_session.tamanho)
+    updates = {key: value for key, value in fields.items() if not getattr(customer_session, key, None)}
+
+    if fields.get('opcoes') and customer_session.opcoes and adds_option(message, vocabulary):
+        # "adiciona laminação fosca": the line keeps its options and gets this one too
+        opcoes = merge_opcoes(customer_session.opcoes, fields['opcoes'])
+        if opcoes != customer_session.opcoes:
+            updates['opcoes'] = opcoes
+
+    if not customer_session.nome:
+        nome = _extract_name(message, vocabulary)
+        if nome:
+            updates['nome'] = nome
+
+    if not customer_session.endereco_completo:
+        endereco = _extract_address(message)
+        if endereco:
+            updates['endereco_completo'] = endereco
+
+    return updates
@@ -0,0 +1,349 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import get_catalog
+
+# Melhor Envio quote endpoint; without a token the fixed freight value is used
+FREIGHT_API_URL = os.environ.get(
+    'FREIGHT_API_URL',
+    "https://sandbox.melhorenvio.com.br/api/v2/me/shipment/calculate"
+)
+FREIGHT_API_TOKEN = os.environ.get('FREIGHT_API_TOKEN')
+
+# 'melhorenvio', 'fake' or 'fixed'; defaults to melhorenvio when a token is configured
+FREIGHT_PROVIDER = os.environ.get('FREIGHT_PROVIDER', 'melhorenvio' if FREIGHT_API_TOKEN else 'fixed')
+FREIGHT_ORIGIN_CEP = os.environ.get('FREIGHT_ORIGIN_CEP', '01310100')
+FREIGHT_FALLBACK_VALUE = float(os.environ.get('FREIGHT_FALLBACK_VALUE', '15.50'))
+
+# Quotes are shared by every destination with the same CEP prefix (5 digits = CEP sector)
+FREIGHT_CACHE_TTL = float(os.environ.get('FREIGHT_CACHE_TTL', '21600'))
+FREIGHT_CACHE_MAX_ENTRIES = int(os.environ.get('FREIGHT_CACHE_MAX_ENTRIES', '4096'))
+FREIGHT_CEP_PREFIX = int(os.environ.get('FREIGHT_CEP_PREFIX', '5'))
+
+# Comma-separated CEPs (or prefixes) quoted for every product profile at startup
+FREIGHT_PRECOMPUTE_CEPS = os.environ.get('FREIGHT_PRECOMPUTE_CEPS', '')
+# Usual print runs: the boxes of one-line orders of these quantities are the precomputed profiles
+FREIGHT_PRECOMPUTE_QUANTITIES = os.environ.get('FREIGHT_PRECOMPUTE_QUANTITIES', '1,50,100,200,500')
+
+# Box used when nothing is known about the order: height, width, length (cm) and weight (kg)
+DEFAULT_PACKAGE = {"altura": 10, "largura": 15, "comprimento": 20, "peso": 0.5}
+
+# Paper model of one book: miolo sheets of PAGE_GRAMMAGE (g/m², 2 pages each) plus a front and back cover
+PAGE_GRAMMAGE = 75
+SHEET_THICKNESS = 0.01
+COVER_GRAMMAGE = 250
+COVER_THICKNESS = 0.05
+# Capa dura: board covers
+HARD_COVER_GRAMMAGE = 1200
+HARD_COVER_THICKNESS = 0.3
+# Pages assumed when the order does not say
+FREIGHT_DEFAULT_PAGES = int(os.environ.get('FREIGHT_DEFAULT_PAGES', '48'))
+
+# Largest box a carrier takes (kg, cm of stacked books); larger orders ship as several equal boxes
+FREIGHT_BOX_MAX_WEIGHT = float(os.environ.get('FREIGHT_BOX_MAX_WEIGHT', '30'))
+FREIGHT_BOX_MAX_HEIGHT = float(os.environ.get('FREIGHT_BOX_MAX_HEIGHT', '60'))
+# Boxes are rounded up to these steps so similar orders share cached quotes
+PACKAGE_WEIGHT_STEP = 0.5
+PACKAGE_HEIGHT_STEP = 2
+
+def normalize_cep(cep):
+    return ''.join(char for char in str(cep or '') if char.isdigit())
+
+def parse_freight_response(services):
+    """Pick the cheapest service without errors from a Melhor Envio quote"""
+    options = [
+        service for service in services
+        if isinstance(service, dict) and not service.get('error') and service.get('price')
+    ]
+    if not options:
+        return None
+
+    cheapest = min(options, key=lambda service: float(service['price']))
+    prazo = cheapest.get('delivery_time')
+    return {
+        "success": True,
+        "valor": round(float(cheapest['price']), 2),
+        "prazo": f"{prazo} dias úteis" if prazo else "5-7 dias úteis",
+        "servico": cheapest.get('name', '')
+    }
+
+class MelhorEnvioProvider:
+    """Quotes through the Melhor Envio shipment calculate API"""
+
+    name = 'melhorenvio'
+
+    def __init__(self, url=FREIGHT_API_URL, token=FREIGHT_API_TOKEN):
+        self.url = url
+        self.token = token
+
+    def quote(self, origem_cep, destino_cep, package):
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self.token}",
+            "User-Agent": "Papelaria Digital"
+        }
+        box = {
+            "height": package['altura'],
+            "width": package['largura'],
+            "length": package['comprimento'],
+            "weight": package['peso']
+        }
+        payload = {
+            "from": {"postal_code": origem_cep},
+            "to": {"postal_code": destino_cep},
+        }
+        volumes = package.get('volumes', 1)
+        if volumes > 1:
+            payload["volumes"] = [box] * volumes
+        else:
+            payload["package"] = box
+
+        from http_client import get_outbound_client
+
+        # A quote has no side effects, so it is safe to retry on timeouts and 5xx
+        response = get_outbound_client('freight').post(self.url, idempotent=True, json=payload, headers=headers)
+        if response.status_code == 200:
+            quoted = parse_freight_response(response.json())
+            if quoted:
+                return quoted
+        raise ValueError(f"Freight API returned {response.status_code}: {response.text[:200]}")
+
+class FixedFreightProvider:
+    """Flat freight value, used while no freight API is configured"""
+
+    name = 'fixed'
+
+    def __init__(self, valor=FREIGHT_FALLBACK_VALUE):
+        self.valor = valor
+
+    def quote(self, origem_cep, destino_cep, package):
+        return {"success": True, "valor": self.valor, "prazo": "5-7 dias úteis"}
+
+class FakeFreightProvider:
+    """Deterministic local provider for tests and benchmarks: price by CEP region and size"""
+
+    name = 'fake'
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def quote(self, origem_cep, destino_cep, package):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        distance = abs(int(destino_cep[:1] or 0) - int(origem_cep[:1] or 0))
+        volume = package['altura'] * package['largura'] * package['comprimento'] / 1000
+        valor = (12.0 + 4.5 * distance + 0.8 * volume + 6.0 * package['peso']) * package.get('volumes', 1)
+        return {
+            "success": True,
+            "valor": round(valor, 2),
+            "prazo": f"{3 + distance} dias úteis",
+            "servico": "Fake"
+        }
+
+PROVIDERS = {
+    'melhorenvio': MelhorEnvioProvider,
+    'fixed': FixedFreightProvider,
+    'fake': FakeFreightProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_freight_provider():
+    """Return the configured freight provider (FREIGHT_PROVIDER)"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = PROVIDERS[FREIGHT_PROVIDER]()
+    return _provider
+
+def set_freight_provider(provider):
+    """Swap the freight provider (tests, benchmarks) and drop quotes cached from the old one"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+    freight_cache.clear()
+
+def _sides(tamanho):
+    """Page size as (width, length), whole cm, smallest first; None unless it reads like 14x21"""
+    try:
+        sides = sorted(math.ceil(float(side.replace(',', '.'))) for side in str(tamanho).split('x'))
+    except (AttributeError, ValueError):
+        return None
+    return sides if len(sides) == 2 else None
+
+def book_load(produto, tamanho, quantidade=1, numero_paginas=None):
+    """Footprint (cm), stacked height (cm) and weight (kg) of the books of one order line"""
+    sides = _sides(tamanho) or [DEFAULT_PACKAGE['largura'], DEFAULT_PACKAGE['comprimento']]
+    sheets = math.ceil((int(numero_paginas or 0) or FREIGHT_DEFAULT_PAGES) / 2)
+    hard_cover = 'dura' in str(produto or '').lower()
+    cover_grammage = HARD_COVER_GRAMMAGE if hard_cover else COVER_GRAMMAGE
+    cover_thickness = HARD_COVER_THICKNESS if hard_cover else COVER_THICKNESS
+    area = sides[0] * sides[1] / 10000
+    books = max(1, int(quantidade or 1))
+    return {
+        "largura": sides[0],
+        "comprimento": sides[1],
+        "altura": round(books * (sheets * SHEET_THICKNESS + 2 * cover_thickness), 3),
+        "peso": round(books * area * (sheets * PAGE_GRAMMAGE + 2 * cover_grammage) / 1000, 3),
+    }
+
+def box_package(load):
+    """Split a load into equal boxes within the carrier limits, rounded to the package steps"""
+    volumes = max(1, math.ceil(load['peso'] / FREIGHT_BOX_MAX_WEIGHT), math.ceil(load['altura'] / FREIGHT_BOX_MAX_HEIGHT))
+    altura = math.ceil(load['altura'] / volumes / PACKAGE_HEIGHT_STEP) * PACKAGE_HEIGHT_STEP
+    peso = math.ceil(load['peso'] / volumes / PACKAGE_WEIGHT_STEP) * PACKAGE_WEIGHT_STEP
+    package = {"altura": max(altura, PACKAGE_HEIGHT_STEP), "largura": load['largura'],
+               "comprimento": load['comprimento'], "peso": max(peso, PACKAGE_WEIGHT_STEP)}
+    if volumes > 1:
+        package["volumes"] = volumes
+    return package
+
+def package_for(produto, tamanho, quantidade=1, numero_paginas=None):
+    """Boxes for one order line: page-size footprint, height and weight scaled by books and pages"""
+    return box_package(book_load(produto, tamanho, quantidade, numero_paginas))
+
+def shipment_package(lines):
+    """Boxes for a whole order (lines with produto, tamanho, quantidade, numero_paginas) on its largest footprint"""
+    loads = [
+        book_load(line.get('produto'), line.get('tamanho'), line.get('quantidade'), line.get('numero_paginas'))
+        for line in lines
+    ]
+    largest = max(loads, key=lambda load: load['largura'] * load['comprimento'])
+    return box_package({
+        "largura": largest['largura'],
+        "comprimento": largest['comprimento'],
+        "altura": sum(load['altura'] for load in loads),
+        "peso": sum(load['peso'] for load in loads),
+    })
+
+def package_key(package):
+    return (package['altura'], package['largura'], package['comprimento'], package['peso'], package.get('volumes', 1))
+
+_profiles = (None, ())
+
+def catalog_package_profiles():
+    """Distinct shipment boxes of one-line orders of every catalog product size at the usual print runs
+
+    Computed once per catalog version, with the default page count: these are
+    the packages shipment_package() builds for the most common orders.
+    """
+    global _profiles
+    catalog = get_catalog()
+    version, profiles = _profiles
+    if version != catalog.version:
+        quantities = [int(q) for q in FREIGHT_PRECOMPUTE_QUANTITIES.split(',') if q.strip()]
+        unique = {}
+        for produto, tamanhos in catalog.tamanhos.items():
+            for tamanho in tamanhos:
+                for quantidade in quantities:
+                    package = shipment_package([{"produto": produto, "tamanho": tamanho, "quantidade": quantidade}])
+                    unique.setdefault(package_key(package), package)
+        profiles = tuple(unique.values())
+        _profiles = (catalog.version, profiles)
+    return profiles
+
+class FreightCache:
+    """TTL + LRU cache of quotes keyed by destination CEP prefix and package dimensions"""
+
+    def __init__(self, ttl=FREIGHT_CACHE_TTL, max_entries=FREIGHT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "precomputed": 0}
+
+    def key(self, destino_cep, package):
+        return (normalize_cep(destino_cep)[:FREIGHT_CEP_PREFIX], package_key(package))
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_precomputed(self, count):
+        with self._lock:
+            self.stats["precomputed"] += count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+freight_cache = FreightCache()
+_precompute_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='freight')
+
+def _quote_uncached(destino_cep, package, origem_cep):
+    result = get_freight_provider().quote(normalize_cep(origem_cep), normalize_cep(destino_cep), package)
+    if result.get('success'):
+        freight_cache.set(freight_cache.key(destino_cep, package), result)
+    return result
+
+def precompute_quotes(destino_cep, origem_cep=FREIGHT_ORIGIN_CEP):
+    """Quote every catalog package profile for a destination not yet in the cache"""
+    quoted = 0
+    for package in catalog_package_profiles():
+        if freight_cache.key(destino_cep, package) in freight_cache:
+            continue
+        try:
+            _quote_uncached(destino_cep, package, origem_cep)
+            quoted += 1
+        except Exception as e:
+            logging.error(f"Error precomputing freight to {destino_cep}: {e}")
+            break
+    freight_cache.record_precomputed(quoted)
+    return quoted
+
+def quote_freight(destino_cep, package=None, origem_cep=FREIGHT_ORIGIN_CEP):
+    """Freight for one package to a destination, served from the CEP-prefix cache when possible"""
+    package = package or dict(DEFAULT_PACKAGE)
+    key = freight_cache.key(destino_cep, package)
+    cached = freight_cache.get(key)
+    if cached is not None:
+        return dict(cached, cached=True)
+
+    logging.debug(f"Calculating freight from {origem_cep} to {destino_cep}")
+    result = _quote_uncached(destino_cep, package, origem_cep)
+
+    # A new destination will likely order again: quote the other product profiles in the background
+    if result.get('success') and get_freight_provider().name != 'fixed':
+        _precompute_pool.submit(precompute_quotes, destino_cep, origem_cep)
+    return result
+
+def warm_freight_cache():
+    """Precompute quotes for FREIGHT_PRECOMPUTE_CEPS in the background"""
+    for cep in FREIGHT_PRECOMPUTE_CEPS.split(','):
+        cep = normalize_cep(cep)
+        if cep:
+            _precompute_pool.submit(precompute_quotes, cep.ljust(8, '0'))
@@ -0,0 +1,163 @@
+import os
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Outbound HTTP defaults shared by the PIX gateway and the freight provider
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '30'))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '20'))
+
+# Retries after the first attempt; backoff is exponential with full jitter
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', '0.2'))
+HTTP_BACKOFF_MAX = float(os.environ.get('HTTP_BACKOFF_MAX', '2'))
+
+# Consecutive failures that open a service's circuit, and seconds before a trial call
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', '30'))
+
+# Statuses that say the request was not processed and can be sent again
+RETRY_STATUSES = frozenset({429, 503})
+# Statuses worth retrying only when repeating the request is harmless
+RETRY_STATUSES_IDEMPOTENT = frozenset({500, 502, 503, 504, 429})
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without calling the service while its circuit is open"""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half-open trial -> closed"""
+
+    def __init__(self, name, threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Whether a call may go out now; only one trial call while half-open"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logging.info(f"Circuit {self.name} closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logging.error(f"Circuit {self.name} opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+def backoff_delay(attempt, base=HTTP_BACKOFF, cap=HTTP_BACKOFF_MAX):
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+def is_retryable_status(status_code, idempotent):
+    return status_code in (RETRY_STATUSES_IDEMPOTENT if idempotent else RETRY_STATUSES)
+
+def is_retryable_error(error, idempotent):
+    """Connect failures never reached the server; other errors only retry idempotent calls"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    return idempotent and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+class OutboundClient:
+    """Keep-alive session for one external service with timeouts, retries and a circuit breaker"""
+
+    def __init__(self, name, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 retries=HTTP_RETRIES, pool_size=HTTP_POOL_SIZE):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.breaker = CircuitBreaker(name)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, idempotent=False, **kwargs):
+        """Send a request through the pooled session; raises requests exceptions like requests.request"""
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit open, skipping call to {url}")
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.breaker.record_failure()
+                if attempt >= self.retries or not is_retryable_error(e, idempotent):
+                    raise
+                logging.warning(f"{self.name} request failed ({e}), retrying")
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                if attempt >= self.retries or not is_retryable_status(response.status_code, idempotent):
+                    return response
+                logging.warning(f"{self.name} answered {response.status_code}, retrying")
+                response.close()
+
+            attempt += 1
+            time.sleep(backoff_delay(attempt))
+
+    def post(self, url, idempotent=False, **kwargs):
+        return self.request('POST', url, idempotent=idempotent, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, idempotent=True, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+_clients = {}
+_lock = threading.Lock()
+
+def get_outbound_client(name):
+    """Return the process-wide OutboundClient for a service ('pix', 'freight', ...)"""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = OutboundClient(name)
+                _clients[name] = client
+    return client
+
+def close_outbound_clients():
+    """Close every pooled session (process shutdown)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
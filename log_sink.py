@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+# How conversation logs reach the database:
+#   transactional - added to the request's unit of work, committed with the turn
+#   group         - bulk inserted by the sink; the turn waits until its rows are committed
+#   buffered      - bulk inserted by the sink; the turn does not wait (rows of the last
+#                   LOG_FLUSH_INTERVAL_MS are lost if the process crashes)
+LOG_DURABILITY = os.environ.get('LOG_DURABILITY', 'transactional')
+
+# Flush when this many rows are buffered, or every LOG_FLUSH_INTERVAL_MS
+LOG_FLUSH_ROWS = int(os.environ.get('LOG_FLUSH_ROWS', '200'))
+LOG_FLUSH_INTERVAL_MS = int(os.environ.get('LOG_FLUSH_INTERVAL_MS', '100'))
+
+# Writers block once this many rows are waiting (database down or too slow)
+LOG_MAX_BUFFERED_ROWS = int(os.environ.get('LOG_MAX_BUFFERED_ROWS', '10000'))
+
+# Seconds a 'group' writer waits for its rows to be committed
+LOG_GROUP_COMMIT_TIMEOUT = float(os.environ.get('LOG_GROUP_COMMIT_TIMEOUT', '5'))
+
+# Rows the database refuses (constraint, over-length value) are logged here, one JSON line each
+dead_letter_log = logging.getLogger('log_sink.dead_letter')
+
+def _unavailable(error):
+    """Whether a write failed because of the database (retry later) rather than the row itself"""
+    return isinstance(error, (OperationalError, InterfaceError)) or getattr(error, 'connection_invalidated', False)
+
+class LogSink:
+    """Write-behind buffer that bulk inserts rows into one table from a background thread"""
+
+    def __init__(self, table, mode=LOG_DURABILITY, flush_rows=LOG_FLUSH_ROWS,
+                 flush_interval_ms=LOG_FLUSH_INTERVAL_MS, max_rows=LOG_MAX_BUFFERED_ROWS):
+        self.table = table
+        self.mode = mode
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.engine = None
+        self.stats = {"rows": 0, "flushes": 0, "errors": 0, "dead_letters": 0}
+
+        self._buffer = []
+        self._inflight = []
+        self._written = 0   # sequence number of the last row accepted
+        self._flushed = 0   # sequence number of the last row committed
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.engine is not None and self.mode != 'transactional'
+
+    def start(self, engine):
+        """Start the flusher thread; rows are written with this engine"""
+        self.engine = engine
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def write(self, row):
+        """Buffer one row; in 'group' mode, return only once it is committed"""
+        if self._closed:
+            # Shutting down: nothing will flush the buffer any more
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.table), [row])
+            return row
+
+        with self._cond:
+            while len(self._buffer) + len(self._inflight) >= self.max_rows and not self._closed:
+                self._cond.wait(self.flush_interval)
+            self._buffer.append(row)
+            self._written += 1
+            sequence = self._written
+            if len(self._buffer) >= self.flush_rows or self.mode == 'group':
+                self._cond.notify_all()
+
+            if self.mode == 'group':
+                deadline = time.monotonic() + LOG_GROUP_COMMIT_TIMEOUT
+                while self._flushed < sequence:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Conversation log not committed within {LOG_GROUP_COMMIT_TIMEOUT}s")
+                    self._cond.wait(remaining)
+        return row
+
+    def pending_for(self, session_id):
+        """Rows of a session not yet committed (buffered or being flushed), oldest first"""
+        with self._cond:
+            return [row for row in self._inflight + self._buffer if row['session_id'] == session_id]
+
+    def _ready(self):
+        # Group commit: flush as soon as a writer waits; rows batch up while a flush is in flight
+        if self.mode == 'group':
+            return bool(self._buffer) or self._closed
+        return len(self._buffer) >= self.flush_rows or self._closed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._ready, self.flush_interval)
+                if self._closed and not self._buffer:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Bulk insert every buffered row in one transaction, row by row if the batch is refused"""
+        with self._cond:
+            if self._inflight or not self._buffer:
+                return 0
+            self._inflight, self._buffer = self._buffer, []
+            rows = self._inflight
+            sequence = self._written
+
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.table), rows)
+            inserted, retry = len(rows), []
+        except Exception as e:
+            logging.error(f"Error flushing {len(rows)} conversation logs: {e}")
+            inserted, retry = (0, rows) if _unavailable(e) else self._insert_each(rows)
+
+        with self._cond:
+            self._inflight = []
+            self.stats["rows"] += inserted
+            if retry:
+                # Database unavailable: keep the rows, in order, for the next flush
+                self._buffer = retry + self._buffer
+                self.stats["errors"] += 1
+            else:
+                self._flushed = sequence
+                self.stats["flushes"] += 1
+                self._cond.notify_all()
+        if retry:
+            time.sleep(self.flush_interval)
+        return inserted
+
+    def sync(self, timeout=LOG_GROUP_COMMIT_TIMEOUT):
+        """Commit every row written so far, waiting for a flush already in flight"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            sequence = self._written
+        while True:
+            self.flush()
+            with self._cond:
+                if self._flushed >= sequence:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Conversation logs not committed within {timeout}s")
+                if self._inflight:
+                    self._cond.wait(min(remaining, self.flush_interval))
+
+    def _insert_each(self, rows):
+        """Insert rows one transaction each; a refused row is dead-lettered so it cannot block the rest
+
+        Returns the number inserted and the rows left to retry (from the first
+        one that failed because the database became unavailable).
+        """
+        inserted = 0
+        for index, row in enumerate(rows):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(self.table), [row])
+                inserted += 1
+            except Exception as e:
+                if _unavailable(e):
+                    return inserted, rows[index:]
+                dead_letter_log.error(json.dumps({"table": self.table.name, "error": str(e).splitlines()[0], "row": row},
+                                                 ensure_ascii=False, default=str))
+                with self._cond:
+                    self.stats["dead_letters"] += 1
+        return inserted, []
+
+    def close(self):
+        """Flush what is left and stop the flusher thread (process shutdown)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=LOG_GROUP_COMMIT_TIMEOUT)
+        while self.engine is not None and self._buffer and not self._inflight:
+            if not self.flush():
+                break
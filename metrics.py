@@ -0,0 +1,120 @@
+import os
+import time
+import bisect
+import threading
+
+# Per-stage timings of chat turns, exported on /metrics; with METRICS_ENABLED=0 the
+# timers are no-ops and /metrics returns 404
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Latency histogram with one series per label value (Prometheus cumulative buckets)"""
+
+    def __init__(self, name, help, label, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        """{label_value: (bucket counts, sum)}"""
+        with self._lock:
+            return {label_value: (list(counts), total) for label_value, (counts, total) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="{_format(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {cumulative}')
+        return lines
+
+class _StageTimer:
+    __slots__ = ('histogram', 'name', 'started')
+
+    def __init__(self, histogram, name):
+        self.histogram = histogram
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopTimer()
+
+_histograms = []
+
+def register_histogram(histogram):
+    """Export a histogram on /metrics; returns it"""
+    _histograms.append(histogram)
+    return histogram
+
+stage_seconds = register_histogram(Histogram('chat_stage_seconds', 'Time spent in each stage of a chat turn', 'stage'))
+request_seconds = register_histogram(Histogram('http_request_seconds', 'Request handling time per endpoint', 'endpoint'))
+
+def stage(name):
+    """Time a block as one stage of a chat turn: `with stage('openai'): ...`"""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _StageTimer(stage_seconds, name)
+
+def record_stage(name, seconds):
+    """Record a stage timed by the caller (e.g. spread over a streamed response)"""
+    if METRICS_ENABLED:
+        stage_seconds.observe(name, seconds)
+
+# Counters kept by other modules (caches, sinks, token usage), read when /metrics is scraped
+_stats_sources = []
+
+def register_stats(name, help, source):
+    """Export the numeric values of source() (a dict) as `name{stat="key"} value`"""
+    _stats_sources.append((name, help, source))
+
+def render_metrics():
+    """Every histogram and registered stats source in the Prometheus text format"""
+    lines = []
+    for histogram in _histograms:
+        lines += histogram.render()
+    for name, help, source in _stats_sources:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for key, value in sorted(source().items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f'{name}{{stat="{key}"}} {_format(value)}')
+    return "\n".join(lines) + "\n"
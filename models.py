@@ -8,6 +8,9 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 
+# Product fields of an order line, on the session (line being filled in) and on cart items
+CART_LINE_FIELDS = ('produto', 'tamanho', 'opcoes', 'quantidade', 'numero_paginas')
+
 class CustomerSession(db.Model):
     """Model to store customer session data and order progress"""
     __tablename__ = 'customer_sessions'
@@ -28,6 +31,7 @@ class CustomerSession(db.Model):
     opcoes = db.Column(db.String(255))
     quantidade = db.Column(db.Integer)
     numero_paginas = db.Column(db.Integer)  # For products with page pricing
+    itens_carrinho = db.Column(db.Integer, default=0)  # Lines already in the cart (CartItem), besides the one above
     
     # Pricing Information
     preco_unitario = db.Column(db.Numeric(10, 2))
@@ -36,7 +40,7 @@ class CustomerSession(db.Model):
     preco_total_final = db.Column(db.Numeric(10, 2))
     
     # Order Status
-    status = db.Column(db.String(50), default='em_andamento')  # em_andamento, completo, cancelado
+    status = db.Column(db.String(50), default='em_andamento')  # em_andamento, completo, cancelado, importado
     pix_gerado = db.Column(db.Boolean, default=False)
     pix_url = db.Column(db.Text)
     
@@ -62,6 +66,7 @@ class CustomerSession(db.Model):
             'opcoes': self.opcoes,
             'quantidade': self.quantidade,
             'numero_paginas': self.numero_paginas,
+            'itens_carrinho': self.itens_carrinho,
             'preco_unitario': float(self.preco_unitario) if self.preco_unitario else None,
             'preco_total_produto': float(self.preco_total_produto) if self.preco_total_produto else None,
             'frete': float(self.frete) if self.frete else None,
@@ -97,6 +102,24 @@ class CustomerSession(db.Model):
         """Check if all required fields are filled"""
         return len(self.get_missing_fields()) == 0
     
+    def current_line(self):
+        """Product line being filled in, as a dict of the cart line fields"""
+        return {field: getattr(self, field) for field in CART_LINE_FIELDS}
+    
+    def line_complete(self):
+        """Check if the product line being filled in can be priced"""
+        return all([self.produto, self.tamanho, self.opcoes, self.quantidade])
+    
+    def has_order_lines(self):
+        """Check if there is something to charge: a complete line, or cart lines and no line half filled"""
+        return self.line_complete() or (not self.produto and bool(self.itens_carrinho))
+    
+    def clear_line(self):
+        """Empty the product line (moved to the cart), so the next product can be filled in"""
+        for field in CART_LINE_FIELDS:
+            setattr(self, field, None)
+        self.updated_at = datetime.utcnow()
+    
     def update_field(self, field_name, value):
         """Update a specific field in the session"""
         if hasattr(self, field_name):
@@ -108,6 +131,10 @@ class CustomerSession(db.Model):
 class ConversationLog(db.Model):
     """Model to store conversation history"""
     __tablename__ = 'conversation_logs'
+    __table_args__ = (
+        # Serves "latest N messages of a session" as a single index range scan
+        db.Index('ix_conversation_logs_session_timestamp', 'session_id', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(255), nullable=False)
@@ -116,4 +143,69 @@ class ConversationLog(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<ConversationLog {self.session_id}: {self.role}>'
\ No newline at end of file
+        return f'<ConversationLog {self.session_id}: {self.role}>'
+    
+    @classmethod
+    def recent(cls, session_id, limit=20):
+        """Get the most recent messages of a session, oldest first"""
+        logs = cls.query.filter_by(session_id=session_id).order_by(
+            cls.timestamp.desc(), cls.id.desc()
+        ).limit(limit).all()
+        logs.reverse()
+        return logs
+
+class CartItem(db.Model):
+    """Product line added to a session's cart; every line is charged in the session's single PIX"""
+    __tablename__ = 'cart_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(255), nullable=False, index=True)
+    produto = db.Column(db.String(255), nullable=False)
+    tamanho = db.Column(db.String(50))
+    opcoes = db.Column(db.String(255))
+    quantidade = db.Column(db.Integer)
+    numero_paginas = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CartItem {self.session_id}: {self.quantidade} x {self.produto}>'
+    
+    def line(self):
+        """Cart line fields as a dict, as priced by pricing.quote_batch"""
+        return {field: getattr(self, field) for field in CART_LINE_FIELDS}
+
+class PixJob(db.Model):
+    """Background PIX charge, one per session: idempotency_key is sha256("session:" + session_id)"""
+    __tablename__ = 'pix_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    session_id = db.Column(db.String(255), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'auto' or 'legacy'
+    # pending, processing, completed, failed (no charge went out, may be retried) or
+    # needs_reconciliation (the charge may exist: looked up at the gateway, never resent)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    valor = db.Column(db.Numeric(10, 2))
+    order_data = db.Column(db.Text, nullable=False)  # JSON of the planned order, including the charge
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    
+    pix_id = db.Column(db.String(100))
+    pix_url = db.Column(db.Text)
+    resposta = db.Column(db.Text)  # Reply shown to the customer once the job finished
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PixJob {self.id} {self.session_id}: {self.status}>'
+    
+    def to_dict(self):
+        """Public view of the job, polled by the frontend"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'valor': float(self.valor) if self.valor is not None else None,
+            'pix_url': self.pix_url,
+            'response': self.resposta
+        }
@@ -0,0 +1,202 @@
+import re
+import threading
+from array import array
+
+from catalog import get_catalog
+from extraction import get_vocabulary, fold
+
+_OPCOES_SPLIT = re.compile(r'\s*[;,\n]\s*')
+
+class PriceTable:
+    """Typed price columns for one catalog version, indexed by row number"""
+
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.fixo = array('d')
+        self.unidade = array('d')
+        self.pagina = array('d')
+        # A catalog loaded from a snapshot comes with its price columns
+        columns = catalog.price_columns
+        if columns is not None:
+            self.fixo, self.unidade, self.pagina = columns
+        # (produto, tamanho) -> {(campo, opcao): row}
+        self.rows = {}
+        # (produto, tamanho) -> {opcao.lower(): (campo, opcao)} for free-text options
+        self.labels = {}
+
+        for row, (key, entry) in enumerate(catalog.entries.items()):
+            produto, tamanho, campo, opcao = key
+            if columns is None:
+                self.fixo.append(entry['preco_fixo'] or 0.0)
+                self.unidade.append(entry['preco_unidade'] or 0.0)
+                self.pagina.append(entry['preco_pagina'] or 0.0)
+            self.rows.setdefault((produto, tamanho), {})[(campo, opcao)] = row
+            self.labels.setdefault((produto, tamanho), {}).setdefault(opcao.lower(), (campo, opcao))
+
+        self.produtos = catalog.produtos
+        self.tamanhos = catalog.tamanhos
+
+_lock = threading.Lock()
+_table = None
+
+def get_price_table():
+    """Return the PriceTable for the current catalog version"""
+    global _table
+    catalog = get_catalog()
+    table = _table
+    if table is None or table.version != catalog.version:
+        with _lock:
+            table = _table
+            if table is None or table.version != catalog.version:
+                table = PriceTable(catalog)
+                _table = table
+    return table
+
+def resolve_produto(table, produto):
+    """Map a product name (exact or partial, e.g. "Livro Grampo") to its catalog name"""
+    if not produto:
+        return None
+    if produto in table.tamanhos:
+        return produto
+    wanted = produto.lower()
+    for nome in table.produtos:
+        if wanted in nome.lower():
+            return nome
+    # Accents, typos and word order ("livro grampu canoa", "capa couche")
+    nome = get_vocabulary().index.resolve(fold(produto), 'produto')
+    return nome if nome in table.tamanhos else None
+
+def resolve_tamanho(table, produto, tamanho):
+    """Map a size as written ("14 x 21", "A5") to the product's catalog size"""
+    if not tamanho or (produto, tamanho) in table.rows:
+        return tamanho
+    sizes = set(table.tamanhos.get(produto, ()))
+    return get_vocabulary().index.resolve(fold(str(tamanho)), 'tamanho', sizes) or tamanho
+
+def split_opcoes(opcoes):
+    """Tokens of a free-text options selection ("Laminação Fosco, Shrink Adicional")"""
+    return [token for token in _OPCOES_SPLIT.split(str(opcoes)) if token]
+
+def parse_opcoes(table, produto, tamanho, opcoes):
+    """Turn a selection (dict Campo -> Opção, or free text) into a dict Campo -> Opção
+
+    Returns the selection and the free-text tokens that name no option of the product size.
+    """
+    if not opcoes:
+        return {}, []
+    if isinstance(opcoes, dict):
+        return dict(opcoes), []
+
+    labels = table.labels.get((produto, tamanho), {})
+    selected = {}
+    unknown = []
+    for token in split_opcoes(opcoes):
+        campo, sep, opcao = token.partition(':')
+        if sep and (campo.strip(), opcao.strip()) in table.rows.get((produto, tamanho), {}):
+            selected[campo.strip()] = opcao.strip()
+            continue
+        match = labels.get(token.lower()) or _resolve_opcao(table, produto, tamanho, token)
+        if match:
+            selected[match[0]] = match[1]
+        else:
+            unknown.append(token)
+    return selected, unknown
+
+def _resolve_opcao(table, produto, tamanho, token):
+    """(campo, opcao) of the product size's option a free-text token names, despite typos"""
+    rows = table.rows.get((produto, tamanho), {})
+    keys = {opcao for _, opcao in rows} | {f"{campo}: {opcao}" for campo, opcao in rows}
+    key = get_vocabulary().index.resolve(fold(token), 'opcao', keys)
+    if key is None:
+        return None
+    campo, sep, opcao = key.partition(': ')
+    if sep and (campo, opcao) in rows:
+        return campo, opcao
+    return table.labels[(produto, tamanho)].get(key.lower())
+
+def _resolve_line(table, produto, tamanho, opcoes):
+    """(produto, tamanho, options, price row indices) of an order line, or an error dict"""
+    produto_nome = resolve_produto(table, produto)
+    if not produto_nome:
+        return {"success": False, "error": f"Produto não encontrado: {produto}"}
+
+    tamanho = resolve_tamanho(table, produto_nome, tamanho)
+    rows = table.rows.get((produto_nome, tamanho))
+    if rows is None:
+        return {"success": False, "error": f"Tamanho {tamanho} não disponível para {produto_nome}"}
+
+    selected, unknown = parse_opcoes(table, produto_nome, tamanho, opcoes)
+    if unknown:
+        # Pricing without them would charge for less than the customer asked for
+        return {"success": False, "error": f"Opção não encontrada para {produto_nome} {tamanho}: {', '.join(unknown)}"}
+    indices = []
+    for campo, opcao in selected.items():
+        row = rows.get((campo, opcao))
+        if row is None:
+            return {"success": False, "error": f"Opção inválida para {campo}: {opcao}"}
+        indices.append(row)
+
+    # Base price row ("Produto" Campo) applies to every order of that product
+    base = rows.get(('Produto', produto_nome))
+    if base is not None and 'Produto' not in selected:
+        indices.append(base)
+    return produto_nome, tamanho, selected, indices
+
+def _quote_one(table, produto, tamanho, opcoes, quantidade, numero_paginas, resolved=None):
+    # Orders of a batch repeat the same few lines; their names are resolved once
+    if isinstance(opcoes, dict):
+        resolved = None
+    key = (produto, tamanho, opcoes)
+    line = resolved.get(key) if resolved is not None else None
+    if line is None:
+        line = _resolve_line(table, produto, tamanho, opcoes)
+        if resolved is not None:
+            resolved[key] = line
+    if isinstance(line, dict):
+        return dict(line)
+    produto_nome, tamanho, selected, indices = line
+
+    fixo, unidade, pagina = table.fixo, table.unidade, table.pagina
+    total_fixo = sum(fixo[i] for i in indices)
+    preco_unitario = sum(unidade[i] for i in indices)
+    preco_pagina = sum(pagina[i] for i in indices)
+
+    quantidade = int(quantidade or 0)
+    numero_paginas = int(numero_paginas or 0)
+    total_paginas = preco_pagina * numero_paginas
+    total = total_fixo + preco_unitario * quantidade + total_paginas
+
+    return {
+        "success": True,
+        "produto": produto_nome,
+        "tamanho": tamanho,
+        "opcoes": dict(selected),
+        "quantidade": quantidade,
+        "numero_paginas": numero_paginas,
+        "preco_fixo": round(total_fixo, 2),
+        "preco_unitario": round(preco_unitario, 2),
+        "preco_pagina": round(preco_pagina, 2),
+        "preco_total_produto": round(total, 2),
+        "catalog_version": table.version
+    }
+
+def quote(produto, tamanho, opcoes=None, quantidade=1, numero_paginas=0):
+    """Price one order: Preço Fixo + quantidade * Preço/Unidade + páginas * Preço/Página"""
+    return _quote_one(get_price_table(), produto, tamanho, opcoes, quantidade, numero_paginas)
+
+def quote_batch(pedidos):
+    """Price many orders (dicts with produto, tamanho, opcoes, quantidade, numero_paginas) at once"""
+    table = get_price_table()
+    resolved = {}
+    return [
+        _quote_one(
+            table,
+            pedido.get('produto'),
+            pedido.get('tamanho'),
+            pedido.get('opcoes'),
+            pedido.get('quantidade', 1),
+            pedido.get('numero_paginas', 0),
+            resolved
+        )
+        for pedido in pedidos
+    ]
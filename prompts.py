@@ -0,0 +1,253 @@
+import os
+import logging
+import threading
+
+from catalog import get_catalog
+from pricing import get_price_table, resolve_produto
+
+try:
+    import tiktoken
+except ImportError:  # optional: exact counts when installed, estimate otherwise
+    tiktoken = None
+
+# Upper bound for the input tokens of one OpenAI call (system + history + message)
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', '6000'))
+
+# Most recent messages always kept verbatim; older ones may be shortened
+PROMPT_RECENT_MESSAGES = int(os.environ.get('PROMPT_RECENT_MESSAGES', '4'))
+PROMPT_TRUNCATED_CHARS = int(os.environ.get('PROMPT_TRUNCATED_CHARS', '240'))
+
+# Bump when STATIC_INSTRUCTIONS change; part of the cached prefix
+PROMPT_VERSION = 'v2'
+
+STATIC_INSTRUCTIONS = """Você é um atendente virtual inteligente da 'Papelaria Digital', especializado em atendimento completo de vendas.
+
+INSTRUÇÕES IMPORTANTES:
+1. NUNCA repita perguntas sobre informações já coletadas (veja as informações do cliente enviadas após o catálogo).
+
+2. Foque apenas nos campos que ainda estão faltando.
+
+3. Seja inteligente para interpretar variações, erros de digitação e sinônimos dos produtos.
+
+4. Se um campo já está preenchido, NÃO pergunte novamente sobre ele.
+
+5. Quando tiver TODAS as informações obrigatórias, retorne um JSON com a seguinte estrutura:
+{
+    "action": "generate_pix",
+    "data": {
+        "produto": "nome do produto",
+        "tamanho": "tamanho selecionado",
+        "opcoes": "opções selecionadas",
+        "quantidade": numero,
+        "nome": "nome completo",
+        "cpf": "cpf sem pontuação",
+        "endereco": "endereço completo",
+        "cep": "cep sem pontuação",
+        "valor_produto": valor_do_produto,
+        "descricao": "descrição do pedido"
+    }
+}
+
+5. Mantenha um tom amigável e profissional, como um verdadeiro atendente de papelaria.
+
+6. Ajude o cliente a escolher produtos adequados às suas necessidades.
+
+7. Se o cliente perguntar sobre prazo de entrega, informe que será calculado após confirmar o endereço.
+
+8. Seja preciso com os preços consultando sempre o catálogo fornecido.
+
+IMPORTANTE: Só gere o JSON de ação quando TODAS as informações obrigatórias estiverem coletadas."""
+
+_encoding = None
+
+def count_tokens(text):
+    """Count tokens with tiktoken when available, else estimate about 4 characters per token"""
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.encoding_for_model("gpt-4o")
+            except Exception:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def count_message_tokens(message):
+    """Tokens of one chat message including the per-message overhead"""
+    return count_tokens(message['content']) + 4
+
+def catalog_slice_key(customer_session, compact=False):
+    """(produto, tamanho) of the catalog slice relevant to the session, or None for the summary"""
+    if compact:
+        return None
+    
+    produto = tamanho = None
+    if customer_session is not None and customer_session.produto:
+        produto = resolve_produto(get_price_table(), customer_session.produto)
+        tamanho = customer_session.tamanho if produto else None
+    return (produto, tamanho)
+
+# Byte-identical static prefixes, one per (catalog version, catalog slice)
+_prefix_lock = threading.Lock()
+_prefix_cache = {}
+_prefix_catalog_version = None
+
+def get_static_prefix(customer_session=None, compact_catalog=False):
+    """Instructions + catalog slice: the stable, memoized head of every prompt"""
+    global _prefix_catalog_version
+    catalog = get_catalog()
+    key = catalog_slice_key(customer_session, compact_catalog)
+    
+    prefix = _prefix_cache.get(key) if _prefix_catalog_version == catalog.version else None
+    if prefix is not None:
+        return prefix
+    
+    produtos_text = catalog.render_summary() if key is None else catalog.render(*key)
+    prefix = f"""{STATIC_INSTRUCTIONS}
+[prompt {PROMPT_VERSION} / catálogo {catalog.version}]
+
+CATÁLOGO DE PRODUTOS:
+{produtos_text}"""
+    
+    with _prefix_lock:
+        if _prefix_catalog_version != catalog.version:
+            _prefix_cache.clear()
+            _prefix_catalog_version = catalog.version
+        _prefix_cache[key] = prefix
+    return prefix
+
+def get_session_context(customer_session=None):
+    """Volatile per-session state, sent after the static prefix"""
+    # Build context about what information we already have
+    context_info = ""
+    missing_fields = []
+    
+    if customer_session:
+        filled_info = []
+        if customer_session.produto:
+            filled_info.append(f"Produto: {customer_session.produto}")
+        if customer_session.tamanho:
+            filled_info.append(f"Tamanho: {customer_session.tamanho}")
+        if customer_session.opcoes:
+            filled_info.append(f"Opções: {customer_session.opcoes}")
+        if customer_session.quantidade:
+            filled_info.append(f"Quantidade: {customer_session.quantidade}")
+        if customer_session.numero_paginas:
+            filled_info.append(f"Número de páginas: {customer_session.numero_paginas}")
+        if customer_session.itens_carrinho:
+            filled_info.append(f"Itens já no carrinho (cobrados no mesmo PIX): {customer_session.itens_carrinho}")
+        if customer_session.nome:
+            filled_info.append(f"Nome: {customer_session.nome}")
+        if customer_session.cpf:
+            filled_info.append(f"CPF: {customer_session.cpf}")
+        if customer_session.endereco_completo:
+            filled_info.append(f"Endereço: {customer_session.endereco_completo}")
+        if customer_session.cep:
+            filled_info.append(f"CEP: {customer_session.cep}")
+        
+        missing_fields = customer_session.get_missing_fields()
+        
+        if filled_info:
+            context_info = f"\n\nINFORMAÇÕES JÁ COLETADAS DO CLIENTE:\n" + "\n".join([f"- {info}" for info in filled_info])
+        
+        if missing_fields:
+            context_info += f"\n\nCAMPOS QUE AINDA PRECISAM SER COLETADOS:\n" + "\n".join([f"- {field}" for field in missing_fields])
+    
+    return context_info.strip()
+
+def get_system_prompt(customer_session=None, compact_catalog=False):
+    """Get the detailed system prompt for the AI assistant (static prefix + session state)"""
+    context_info = get_session_context(customer_session)
+    prefix = get_static_prefix(customer_session, compact_catalog)
+    return f"{prefix}\n{context_info}" if context_info else prefix
+
+def shorten(text, limit=PROMPT_TRUNCATED_CHARS):
+    """Cut a message down to `limit` characters"""
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + " [...]"
+
+def summarize_dropped(dropped):
+    """One system note standing in for history that did not fit the budget"""
+    user_lines = [shorten(m['content'], 80) for m in dropped if m['role'] == 'user']
+    summary = f"Resumo: {len(dropped)} mensagens anteriores foram omitidas."
+    if user_lines:
+        summary += " O cliente havia dito: " + " | ".join(user_lines[-5:])
+    return {"role": "system", "content": summary}
+
+def build_chat_messages(customer_session, conversation_history, user_message, budget=None):
+    """Assemble the OpenAI messages for a turn within the prompt token budget"""
+    budget = budget or PROMPT_TOKEN_BUDGET
+    
+    # Static prefix first (cacheable upstream), volatile session state right after it
+    prefix_message = {"role": "system", "content": get_static_prefix(customer_session)}
+    context_info = get_session_context(customer_session)
+    context_messages = [{"role": "system", "content": context_info}] if context_info else []
+    user_entry = {"role": "user", "content": user_message}
+    
+    fixed_tokens = sum(count_message_tokens(m) for m in context_messages) + count_message_tokens(user_entry)
+    used = count_message_tokens(prefix_message) + fixed_tokens
+    
+    # Catalog is the biggest block: fall back to the compact listing when it does not fit
+    if used > budget:
+        prefix_message = {"role": "system", "content": get_static_prefix(customer_session, compact_catalog=True)}
+        used = count_message_tokens(prefix_message) + fixed_tokens
+    
+    # Walk history newest first; recent turns verbatim, older ones shortened, the rest summarized
+    kept = []
+    dropped = []
+    for position, message in enumerate(reversed(conversation_history)):
+        if dropped:
+            dropped.append(message)
+            continue
+        
+        candidate = message
+        if position >= PROMPT_RECENT_MESSAGES:
+            candidate = {"role": message['role'], "content": shorten(message['content'])}
+        
+        tokens = count_message_tokens(candidate)
+        if used + tokens > budget:
+            dropped.append(message)
+            continue
+        used += tokens
+        kept.append(candidate)
+    
+    kept.reverse()
+    messages = [prefix_message, *context_messages]
+    if dropped:
+        dropped.reverse()
+        note = summarize_dropped(dropped)
+        if used + count_message_tokens(note) <= budget:
+            messages.append(note)
+            used += count_message_tokens(note)
+    messages.extend(kept)
+    messages.append(user_entry)
+    
+    if used > budget:
+        logging.warning(f"Prompt over budget: {used} > {budget} tokens")
+    return messages
+
+# Prompt-cache accounting across all OpenAI calls of this process
+_usage_lock = threading.Lock()
+prompt_usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+def record_prompt_usage(usage):
+    """Record cached vs uncached prompt tokens reported by an OpenAI response"""
+    if usage is None:
+        return 0, 0
+    
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = (getattr(details, 'cached_tokens', 0) or 0) if details else 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    
+    with _usage_lock:
+        prompt_usage["calls"] += 1
+        prompt_usage["prompt_tokens"] += prompt_tokens
+        prompt_usage["cached_tokens"] += cached_tokens
+        prompt_usage["completion_tokens"] += completion_tokens
+    
+    logging.debug(f"OpenAI prompt tokens: {prompt_tokens} ({cached_tokens} cached, {prompt_tokens - cached_tokens} uncached)")
+    return prompt_tokens, cached_tokens
@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from extraction import fold
+
+try:
+    import redis
+except ImportError:  # optional: shared cache across workers when installed and configured
+    redis = None
+
+# Seconds a cached reply stays valid; 0 disables the cache
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', '600'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+
+# Optional shared backend (e.g. redis://localhost:6379/0) checked after the in-process cache
+RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')
+
+# Session fields that may appear in a reply and must never be shared across customers
+PERSONAL_FIELDS = ('nome', 'cpf', 'telefone', 'cep', 'endereco_completo')
+
+# Order fields that change the answer to the same question
+STATE_FIELDS = ('produto', 'tamanho', 'opcoes', 'quantidade', 'numero_paginas', 'itens_carrinho')
+
+# Digit runs that look like CPF, CEP or phone numbers, valid or not, and e-mail addresses
+_PERSONAL_DATA = re.compile(r'\d[\d.\-/\s()]{6,}\d|\S+@\S+')
+_PUNCTUATION = re.compile(r'[^\w\s,]+')
+_SPACES = re.compile(r'\s+')
+
+def normalize_message(message):
+    """Fold case, accents, punctuation and spacing so equivalent questions share a key"""
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', fold(message))).strip()
+
+def carries_personal_data(message, customer_session=None, extracted_data=None):
+    """True when the message or the session holds customer data a reply could echo"""
+    if extracted_data and any(field in extracted_data for field in PERSONAL_FIELDS):
+        return True
+    if customer_session is not None and any(getattr(customer_session, field, None) for field in PERSONAL_FIELDS):
+        return True
+    return bool(_PERSONAL_DATA.search(message))
+
+def response_cache_key(user_message, customer_session, catalog_version, *parts):
+    """Key a reply on the normalized message, order state, catalog version and prompt/model"""
+    state = [getattr(customer_session, field, None) for field in STATE_FIELDS]
+    raw = json.dumps([normalize_message(user_message), state, catalog_version, *parts], ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """In-process TTL + LRU cache of AI replies, optionally backed by a shared store"""
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES, url=RESPONSE_CACHE_URL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "skipped": 0, "evictions": 0}
+
+        self.shared = None
+        if url and redis is not None:
+            self.shared = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        elif url:
+            logging.warning("RESPONSE_CACHE_URL set but redis is not installed; using in-process cache only")
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _store_local(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get(self, key):
+        """Return the cached reply for a key, or None"""
+        if not self.enabled or key is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(f"chat-reply:{key}")
+            except Exception as e:
+                logging.error(f"Shared response cache unavailable: {e}")
+                value = None
+            if value is not None:
+                value = value.decode('utf-8')
+                self._store_local(key, value, now + self.ttl)
+                self._count("shared_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        """Cache a reply for the configured TTL"""
+        if not self.enabled or key is None or not value:
+            return
+        self._store_local(key, value, time.monotonic() + self.ttl)
+        self._count("stores")
+
+        if self.shared is not None:
+            try:
+                self.shared.setex(f"chat-reply:{key}", int(self.ttl) or 1, value.encode('utf-8'))
+            except Exception as e:
+                logging.error(f"Shared response cache unavailable: {e}")
+
+    def skip(self):
+        """Count a turn that was not eligible for caching"""
+        self._count("skipped")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        """Current counters plus size and hit ratio"""
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries))
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["shared_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+response_cache = ResponseCache()
@@ -0,0 +1,186 @@
+import os
+import gzip
+import json
+import time
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select, delete, exists, or_, text
+
+from models import CustomerSession, ConversationLog, PixJob, CartItem
+
+# Old rows are written to compressed JSONL archives, then deleted in short batches so the
+# hot tables (and their indexes) stay small without long locks. Run periodically (cron):
+#   python retention.py
+
+# Abandoned chats (order in progress, never charged) without any activity (row update or
+# message) for this long are archived and deleted; charged and imported orders are kept
+RETENTION_SESSION_IDLE_DAYS = int(os.environ.get('RETENTION_SESSION_IDLE_DAYS', '30'))
+
+# Messages older than this are archived and deleted, also from sessions still in use
+RETENTION_LOG_DAYS = int(os.environ.get('RETENTION_LOG_DAYS', '90'))
+
+# Where the compressed JSONL archives are written, one file per table and batch
+RETENTION_ARCHIVE_DIR = os.environ.get('RETENTION_ARCHIVE_DIR', 'archive')
+
+# Rows per delete transaction, and pause between batches to let the application through
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '500'))
+RETENTION_BATCH_PAUSE_MS = int(os.environ.get('RETENTION_BATCH_PAUSE_MS', '50'))
+
+sessions = CustomerSession.__table__
+logs = ConversationLog.__table__
+pix_jobs = PixJob.__table__
+cart_items = CartItem.__table__
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+def write_archive(table_name, rows, archive_dir=RETENTION_ARCHIVE_DIR):
+    """Write rows to a new gzip-compressed JSONL file; returns its path"""
+    directory = os.path.join(archive_dir, table_name)
+    os.makedirs(directory, exist_ok=True)
+    ids = [row['id'] for row in rows]
+    path = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{min(ids)}-{max(ids)}.jsonl.gz")
+
+    # Written under a temporary name and synced: rows are only deleted once the file is complete
+    partial = path + '.partial'
+    with open(partial, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            for row in rows:
+                f.write(json.dumps(dict(row), default=_json_default, ensure_ascii=False).encode('utf-8') + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    return path
+
+def read_archive(path):
+    """Rows of an archive file, as dicts"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def _idle(cutoff):
+    # An abandoned chat: still in progress, never charged (no PIX job at all, so none is orphaned),
+    # and not updated and without messages since the cutoff. Paid and imported orders are business records
+    return (
+        or_(sessions.c.status == 'em_andamento', sessions.c.status.is_(None)),
+        sessions.c.pix_gerado.isnot(True),
+        sessions.c.updated_at < cutoff,
+        ~exists().where(logs.c.session_id == sessions.c.session_id, logs.c.timestamp >= cutoff),
+        ~exists().where(pix_jobs.c.session_id == sessions.c.session_id),
+    )
+
+def _pause():
+    time.sleep(RETENTION_BATCH_PAUSE_MS / 1000)
+
+def expire_idle_sessions(engine, cutoff, batch_size=RETENTION_BATCH_SIZE, archive_dir=RETENTION_ARCHIVE_DIR, on_expire=None):
+    """Archive and delete abandoned idle sessions with their messages and cart lines; returns (sessions, messages) deleted"""
+    expired_sessions = expired_logs = 0
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(sessions).where(sessions.c.id > last_id, *_idle(cutoff)).order_by(sessions.c.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            session_ids = [row['session_id'] for row in rows]
+            log_rows = conn.execute(
+                select(logs).where(logs.c.session_id.in_(session_ids)).order_by(logs.c.id)
+            ).mappings().all()
+            cart_rows = conn.execute(
+                select(cart_items).where(cart_items.c.session_id.in_(session_ids)).order_by(cart_items.c.id)
+            ).mappings().all()
+
+        write_archive(sessions.name, rows, archive_dir)
+        if log_rows:
+            write_archive(logs.name, log_rows, archive_dir)
+        if cart_rows:
+            write_archive(cart_items.name, cart_rows, archive_dir)
+
+        with engine.begin() as conn:
+            # Checked again: a customer may have come back while the batch was archived
+            still_idle = [session_id for (session_id,) in conn.execute(
+                select(sessions.c.session_id).where(sessions.c.session_id.in_(session_ids), *_idle(cutoff))
+            )]
+            if still_idle:
+                expired_logs += conn.execute(delete(logs).where(logs.c.session_id.in_(still_idle))).rowcount
+                conn.execute(delete(cart_items).where(cart_items.c.session_id.in_(still_idle)))
+                expired_sessions += conn.execute(delete(sessions).where(sessions.c.session_id.in_(still_idle))).rowcount
+
+        if on_expire and still_idle:
+            on_expire(still_idle)
+        _pause()
+    return expired_sessions, expired_logs
+
+def archive_old_logs(engine, cutoff, batch_size=RETENTION_BATCH_SIZE, archive_dir=RETENTION_ARCHIVE_DIR):
+    """Archive and delete messages older than the cutoff; returns how many were deleted"""
+    archived = 0
+    while True:
+        # Ids grow with time, so the oldest messages are at the head of the primary key
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(logs).where(logs.c.timestamp < cutoff).order_by(logs.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            break
+
+        write_archive(logs.name, rows, archive_dir)
+        with engine.begin() as conn:
+            archived += conn.execute(delete(logs).where(logs.c.id.in_([row['id'] for row in rows]))).rowcount
+        _pause()
+    return archived
+
+def discard_session(engine, session_id):
+    """Delete a session, its messages and cart (conversation reset); sessions with a PIX charge are kept"""
+    with engine.begin() as conn:
+        charged = conn.execute(
+            select(sessions.c.id).where(sessions.c.session_id == session_id, sessions.c.pix_gerado.is_(True))
+        ).first() or conn.execute(
+            select(pix_jobs.c.id).where(pix_jobs.c.session_id == session_id).limit(1)
+        ).first()
+        if charged:
+            return False
+        conn.execute(delete(logs).where(logs.c.session_id == session_id))
+        conn.execute(delete(cart_items).where(cart_items.c.session_id == session_id))
+        return conn.execute(delete(sessions).where(sessions.c.session_id == session_id)).rowcount > 0
+
+def compact_tables(engine):
+    """Let the database reuse the space of deleted rows (plain VACUUM, no exclusive lock)"""
+    if engine.dialect.name != 'postgresql':
+        # SQLite reuses freed pages for new rows by itself
+        return
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for table in (sessions, logs, cart_items):
+            conn.execute(text(f"VACUUM (ANALYZE) {table.name}"))
+
+def run_retention(engine, now=None, archive_dir=RETENTION_ARCHIVE_DIR, on_expire=None):
+    """Expire idle sessions, then archive old messages; returns the counts"""
+    now = now or datetime.utcnow()
+    started = time.monotonic()
+
+    expired_sessions, expired_logs = expire_idle_sessions(
+        engine, now - timedelta(days=RETENTION_SESSION_IDLE_DAYS), archive_dir=archive_dir, on_expire=on_expire
+    )
+    archived_logs = archive_old_logs(engine, now - timedelta(days=RETENTION_LOG_DAYS), archive_dir=archive_dir)
+    if expired_sessions or archived_logs:
+        compact_tables(engine)
+
+    result = {"sessions": expired_sessions, "session_logs": expired_logs, "old_logs": archived_logs}
+    logging.info(f"Retention: {result} in {time.monotonic() - started:.1f}s, archived to {archive_dir}")
+    return result
+
+if __name__ == '__main__':
+    from app import app, db, session_cache
+
+    def invalidate(session_ids):
+        for session_id in session_ids:
+            session_cache.invalidate(session_id)
+
+    with app.app_context():
+        run_retention(db.engine, on_expire=invalidate)
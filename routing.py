@@ -0,0 +1,83 @@
+import os
+import re
+import threading
+
+from extraction import fold
+from metrics import Histogram, register_histogram, METRICS_ENABLED
+
+# Model tiers: 'fast' for slot-filling and short turns, 'full' for everything else.
+# An empty OPENAI_MODEL_FAST sends every turn to the full tier.
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')
+OPENAI_MAX_TOKENS = int(os.environ.get('OPENAI_MAX_TOKENS', '1000'))
+OPENAI_MODEL_FAST = os.environ.get('OPENAI_MODEL_FAST', 'gpt-4o-mini')
+OPENAI_MAX_TOKENS_FAST = int(os.environ.get('OPENAI_MAX_TOKENS_FAST', '300'))
+
+# Messages longer than this always go to the full tier
+ROUTING_FAST_MAX_CHARS = int(os.environ.get('ROUTING_FAST_MAX_CHARS', '120'))
+
+# USD per 1M tokens (input, output), for the cost estimates in the routing stats
+MODEL_PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+# Comparisons, advice, complaints and changes need the full model
+_HARD = re.compile(
+    r'\b(?:diferenca|compar\w*|recomend\w*|melhor|indica\w*|explica\w*|por que|porque|'
+    r'problema|reclama\w*|errad\w*|cancel\w*|troca\w*|devolu\w*|mudar|alterar|desconto|prazo)\b'
+)
+
+def route_turn(user_message, customer_session, extracted_data):
+    """Pick the model tier of a turn: {"tier", "model", "max_tokens", "reason"}"""
+    folded = fold(user_message)
+    if not OPENAI_MODEL_FAST:
+        tier, reason = 'full', 'single_tier'
+    elif len(user_message) > ROUTING_FAST_MAX_CHARS:
+        tier, reason = 'full', 'long'
+    elif _HARD.search(folded):
+        tier, reason = 'full', 'hard'
+    elif extracted_data:
+        tier, reason = 'fast', 'slot_filling'
+    elif customer_session is not None and customer_session.pix_gerado:
+        tier, reason = 'fast', 'after_order'
+    elif '?' in user_message and customer_session is not None and customer_session.produto:
+        # Questions about a product being configured: options and prices from the catalog slice
+        tier, reason = 'full', 'product_question'
+    else:
+        tier, reason = 'fast', 'short'
+
+    if tier == 'fast':
+        return {"tier": tier, "model": OPENAI_MODEL_FAST, "max_tokens": OPENAI_MAX_TOKENS_FAST, "reason": reason}
+    return {"tier": tier, "model": OPENAI_MODEL, "max_tokens": OPENAI_MAX_TOKENS, "reason": reason}
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """USD cost of one call from MODEL_PRICES (0 for unknown models)"""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+openai_seconds = register_histogram(Histogram('openai_request_seconds', 'OpenAI call latency per model tier', 'tier'))
+
+_stats_lock = threading.Lock()
+routing_stats = {}
+
+def record_route(route, seconds, usage=None):
+    """Record a routed OpenAI call: decision, latency, tokens and estimated cost per tier"""
+    prompt_tokens = (getattr(usage, 'prompt_tokens', 0) or 0) if usage is not None else 0
+    completion_tokens = (getattr(usage, 'completion_tokens', 0) or 0) if usage is not None else 0
+    cost = estimate_cost(route['model'], prompt_tokens, completion_tokens)
+    tier = route['tier']
+
+    with _stats_lock:
+        routing_stats[f"{tier}_calls"] = routing_stats.get(f"{tier}_calls", 0) + 1
+        routing_stats[f"{tier}_seconds"] = routing_stats.get(f"{tier}_seconds", 0.0) + seconds
+        routing_stats[f"{tier}_prompt_tokens"] = routing_stats.get(f"{tier}_prompt_tokens", 0) + prompt_tokens
+        routing_stats[f"{tier}_completion_tokens"] = routing_stats.get(f"{tier}_completion_tokens", 0) + completion_tokens
+        routing_stats[f"{tier}_cost_usd"] = routing_stats.get(f"{tier}_cost_usd", 0.0) + cost
+        reason_key = f"reason_{route['reason']}"
+        routing_stats[reason_key] = routing_stats.get(reason_key, 0) + 1
+    if METRICS_ENABLED:
+        openai_seconds.observe(tier, seconds)
+
+def routing_snapshot():
+    with _stats_lock:
+        return {key: round(value, 6) if isinstance(value, float) else value for key, value in routing_stats.items()}
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+try:
+    import redis
+except ImportError:  # optional: shared cache across workers when installed and configured
+    redis = None
+
+SESSION_CACHE_MAX_ENTRIES = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', '5000'))
+
+# Shared backend (e.g. redis://localhost:6379/1); local entries are then checked against its versions
+SESSION_CACHE_URL = os.environ.get('SESSION_CACHE_URL')
+
+# Without a shared backend a process-local entry cannot see other instances' writes (serverless,
+# several workers), so the local cache is opt-in: SESSION_CACHE_LOCAL=1 for a single worker only
+SESSION_CACHE_LOCAL = os.environ.get('SESSION_CACHE_LOCAL', '1' if SESSION_CACHE_URL else '0') == '1'
+
+# Shared entries expire so abandoned sessions do not pile up in the backend
+SESSION_CACHE_SHARED_TTL = int(os.environ.get('SESSION_CACHE_SHARED_TTL', '86400'))
+
+# Local entries are reloaded from the database after this many seconds, so rows deleted
+# by another process (retention runs) do not linger in a worker's cache
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', '3600'))
+
+def row_values(instance):
+    """Column values of a mapped row, as a plain dict"""
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs}
+
+def _encode(values):
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, Decimal) else value
+        for key, value in values.items()
+    })
+
+def _decode(model, text):
+    values = json.loads(text)
+    for column in inspect(model).columns:
+        value = values.get(column.key)
+        if value is None:
+            continue
+        python_type = column.type.python_type
+        if python_type is datetime:
+            values[column.key] = datetime.fromisoformat(value)
+        elif python_type is Decimal:
+            values[column.key] = Decimal(value)
+    return values
+
+class SessionCache:
+    """Versioned cache of CustomerSession rows: process-local LRU plus optional shared backend
+
+    Every committed write stores the row under a new version (write-through),
+    but only if the writer loaded the version currently cached; otherwise the
+    entry is invalidated and the next reader goes to the database. Readers only
+    use a local entry whose version matches the shared one, so a row changed by
+    another worker is never served stale.
+    """
+
+    def __init__(self, model, max_entries=SESSION_CACHE_MAX_ENTRIES, url=SESSION_CACHE_URL, local=SESSION_CACHE_LOCAL):
+        self.model = model
+        self.max_entries = max_entries
+        self.local = local
+        # session_id -> (version, values or None for an invalidated row, stored_at)
+        self._entries = OrderedDict()
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "stale": 0, "writes": 0, "invalidations": 0}
+        self.max_served_age = 0.0
+
+        self.shared = None
+        if url and redis is not None:
+            self.shared = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        elif url:
+            logging.warning("SESSION_CACHE_URL set but redis is not installed; using the local session cache only")
+
+    @property
+    def enabled(self):
+        return self.local or self.shared is not None
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _store_local(self, session_id, version, values):
+        with self._lock:
+            self._entries[session_id] = (version, values, time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _version_key(self, session_id):
+        return f"customer-session:version:{session_id}"
+
+    def _lookup(self, session_id):
+        """Return (values or None, version the caller must present when writing back)"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+                if entry[1] is not None and time.monotonic() - entry[2] > SESSION_CACHE_TTL:
+                    # Expired: keep the version (write-backs still check it), drop the values
+                    entry = self._entries[session_id] = (entry[0], None, entry[2])
+
+        if self.shared is None:
+            if entry is None or entry[1] is None:
+                return None, entry[0] if entry else 0
+            self._served(entry)
+            self._count("hits")
+            return entry[1], entry[0]
+
+        try:
+            version = int(self.shared.get(self._version_key(session_id)) or 0)
+        except Exception as e:
+            logging.error(f"Shared session cache unavailable: {e}")
+            return None, None
+        if entry is not None and entry[1] is not None:
+            if entry[0] == version:
+                self._served(entry)
+                self._count("hits")
+                return entry[1], version
+            # Another worker committed a newer version of this row
+            self._count("stale")
+
+        try:
+            text = self.shared.get(f"customer-session:{session_id}:{version}") if version else None
+        except Exception as e:
+            logging.error(f"Shared session cache unavailable: {e}")
+            return None, None
+        if text is None:
+            return None, version
+        values = _decode(self.model, text)
+        if self.local:
+            self._store_local(session_id, version, values)
+        self._count("shared_hits")
+        return values, version
+
+    def _served(self, entry):
+        age = time.monotonic() - entry[2]
+        with self._lock:
+            self.max_served_age = max(self.max_served_age, age)
+
+    def get(self, session_id):
+        """Return (detached instance or None, version to pass to put() after committing)"""
+        if not self.enabled:
+            return None, None
+        values, version = self._lookup(session_id)
+        if values is None:
+            self._count("misses")
+            return None, version
+
+        instance = self.model(**values)
+        # Mark it as loaded from the database so it attaches clean, without a SELECT
+        make_transient_to_detached(instance)
+        return instance, version
+
+    def put(self, session_id, values, expected_version):
+        """Write-through of a committed row; returns its new version, or None if it was invalidated"""
+        if not self.enabled or expected_version is None:
+            return None
+
+        if self.shared is not None:
+            key = self._version_key(session_id)
+            try:
+                with self.shared.pipeline() as pipe:
+                    pipe.watch(key)
+                    if int(pipe.get(key) or 0) != expected_version:
+                        pipe.unwatch()
+                        self.invalidate(session_id)
+                        return None
+                    pipe.multi()
+                    pipe.incr(key)
+                    pipe.expire(key, SESSION_CACHE_SHARED_TTL)
+                    version = expected_version + 1
+                    pipe.setex(f"customer-session:{session_id}:{version}", SESSION_CACHE_SHARED_TTL, _encode(values))
+                    pipe.execute()
+            except Exception as e:
+                # Includes WatchError: another worker wrote this row meanwhile
+                logging.info(f"Session cache write for {session_id} skipped: {e}")
+                self.invalidate(session_id)
+                return None
+            if self.local:
+                self._store_local(session_id, version, dict(values))
+            self._count("writes")
+            return version
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if (entry[0] if entry else 0) != expected_version:
+                # Loaded before someone else's write: these values may miss that write
+                self.stats["invalidations"] += 1
+                self._entries[session_id] = (next(self._versions), None, time.monotonic())
+                return None
+            version = next(self._versions)
+            self.stats["writes"] += 1
+        self._store_local(session_id, version, dict(values))
+        return version
+
+    def invalidate(self, session_id):
+        """Drop a row everywhere (failed commit, deletion, out-of-band update)"""
+        with self._lock:
+            self.stats["invalidations"] += 1
+        # A tombstone with a new version fails every write-back based on older reads
+        self._store_local(session_id, next(self._versions), None)
+        if self.shared is not None:
+            try:
+                # A new version without a snapshot makes every worker reload from the database
+                self.shared.incr(self._version_key(session_id))
+            except Exception as e:
+                logging.error(f"Shared session cache unavailable: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        """Counters plus size, hit ratio and the oldest entry age served (seconds)"""
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries))
+            stats["max_served_age"] = round(self.max_served_age, 3)
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["shared_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
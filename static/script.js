@@ -44,11 +44,12 @@ async function handleSubmit(e) {
     setLoading(true);
     
     try {
-        // Send message to backend
-        const response = await fetch('/chat', {
+        // Send message to backend and render the reply as it streams in
+        const response = await fetch('/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
             },
             body: JSON.stringify({ 
                 message: message,
@@ -60,18 +61,46 @@ async function handleSubmit(e) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
-        const data = await response.json();
+        let botMessage = null;
+        let botText = '';
+        let failed = false;
+        let pixJob = null;
         
-        if (data.success) {
-            // Add bot response to chat
-            addMessage('bot', data.response);
+        await readEventStream(response, function(event, data) {
+            if (event === 'error') {
+                failed = true;
+                return;
+            }
+            if (event === 'done') {
+                pixJob = data.pix_job;
+                return;
+            }
+            if (event === 'replace') {
+                botText = data.response;
+            } else if (data.delta) {
+                botText += data.delta;
+            } else {
+                return;
+            }
             
-            // Check if response contains PIX information
-            if (data.response.includes('PIX GERADO') || data.response.includes('Link de pagamento')) {
-                showPixModal(data.response);
+            if (!botMessage) {
+                loadingIndicator.classList.add('d-none');
+                botMessage = addMessage('bot', botText);
+            } else {
+                updateMessage(botMessage, botText);
             }
-        } else {
+        });
+        
+        if (failed || !botMessage) {
             addMessage('bot', 'Desculpe, ocorreu um erro. Tente novamente.');
+        } else if (botText.includes('PIX GERADO') || botText.includes('Link de pagamento')) {
+            // Check if response contains PIX information
+            showPixModal(botText);
+        }
+        
+        // The PIX charge is issued in the background: wait for it without blocking the chat
+        if (pixJob && ['pending', 'processing', 'needs_reconciliation'].includes(pixJob.status)) {
+            pollPixJob(pixJob.id);
         }
         
     } catch (error) {
@@ -83,6 +112,48 @@ async function handleSubmit(e) {
     }
 }
 
+// PIX jobs being polled: every turn while a charge runs returns the same job
+const polledPixJobs = new Set();
+
+// Poll a background PIX job until it finishes, then show its reply
+async function pollPixJob(jobId, attempt = 0) {
+    if (attempt === 0) {
+        if (polledPixJobs.has(jobId)) {
+            return;
+        }
+        polledPixJobs.add(jobId);
+    }
+    const sessionId = encodeURIComponent(localStorage.getItem('chat_session_id'));
+    
+    try {
+        const response = await fetch(`/pix/jobs/${jobId}?session_id=${sessionId}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        const job = data.pix_job;
+        if (job.status === 'completed' || job.status === 'failed') {
+            // A failed job is retried under the same id
+            polledPixJobs.delete(jobId);
+            addMessage('bot', job.response || 'Desculpe, não foi possível gerar o PIX. Tente novamente.');
+            if (job.status === 'completed') {
+                showPixModal(job.response);
+            }
+            return;
+        }
+    } catch (error) {
+        console.error('Error polling PIX job:', error);
+    }
+    
+    if (attempt < 60) {
+        setTimeout(() => pollPixJob(jobId, attempt + 1), Math.min(1000 + attempt * 250, 5000));
+    } else {
+        polledPixJobs.delete(jobId);
+        addMessage('bot', 'O PIX está demorando mais que o esperado. Envie uma mensagem para verificar o status do seu pedido.');
+    }
+}
+
 // Add message to chat
 function addMessage(sender, content) {
     const messageDiv = document.createElement('div');
@@ -110,6 +181,51 @@ function addMessage(sender, content) {
     
     chatMessages.appendChild(messageDiv);
     scrollToBottom();
+    return messageDiv;
+}
+
+// Replace the content of a message already in the chat (streaming updates)
+function updateMessage(messageDiv, content) {
+    const contentDiv = messageDiv.querySelector('.message-content');
+    const timeDiv = contentDiv.querySelector('.message-time');
+    
+    contentDiv.innerHTML = formatMessageContent(content);
+    contentDiv.appendChild(timeDiv);
+    scrollToBottom();
+}
+
+// Read a Server-Sent Events response body, calling onEvent(event, data) per message
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            }
+            
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
 }
 
 // Format message content for better display
@@ -223,7 +339,10 @@ async function resetConversation() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-            }
+            },
+            body: JSON.stringify({
+                session_id: localStorage.getItem('chat_session_id')
+            })
         });
         
         if (response.ok) {
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+# Read at import time by app.py and http_client.py: a scratch database and short backoffs
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault('HTTP_BACKOFF', '0.01')
+os.environ.setdefault('HTTP_BACKOFF_MAX', '0.02')
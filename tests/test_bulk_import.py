@@ -0,0 +1,18 @@
+import pytest
+
+from bulk_import import import_orders
+
+ORDER = {'produto': 'Livro Grampo', 'tamanho': '14x21', 'opcoes': 'shrink', 'quantidade': '100',
+         'nome': 'João da Silva', 'cpf': '529.982.247-25', 'cep': '01310-100'}
+
+@pytest.mark.parametrize('field, value, error', [
+    ('nome', 'x' * 256, 'nome excede 255 caracteres'),
+    ('telefone', '1' * 16, 'telefone excede 15 caracteres'),
+    ('quantidade', '99999999999', 'quantidade acima do máximo'),
+    ('quantidade', '500000000', 'preco_total_produto acima do máximo'),
+])
+def test_value_too_large_for_its_column_rejects_only_its_row(field, value, error):
+    results = list(import_orders([(1, ORDER), (2, dict(ORDER, **{field: value})), (3, ORDER)], 'test'))
+    assert [result['success'] for result in results[:3]] == [True, False, True]
+    assert error in results[1]['errors']
+    assert results[-1]['done']
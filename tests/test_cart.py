@@ -0,0 +1,39 @@
+import pytest
+
+from stubs import FakeOpenAI
+
+@pytest.fixture
+def chat(monkeypatch):
+    import app as chat_app
+    monkeypatch.setattr(chat_app, 'openai_client', FakeOpenAI(0))
+    return chat_app, chat_app.app.test_client()
+
+def session_after(chat, session_id, messages):
+    chat_app, client = chat
+    for message in messages:
+        assert client.post('/chat', json={'message': message, 'session_id': session_id}).get_json()['success']
+    with chat_app.app.app_context():
+        return chat_app.CustomerSession.query.filter_by(session_id=session_id).first()
+
+def test_adding_an_option_keeps_it_on_the_current_line(chat):
+    session = session_after(chat, 'add-option', ["Quero 100 livros grampo 14x21 com shrink", "adiciona laminação fosca"])
+    assert session.produto == 'Livro Grampo (canoa)'
+    assert session.opcoes == 'Shrink Adicional, Laminação Fosco'
+    assert session.itens_carrinho == 0
+
+def test_adding_a_product_moves_the_line_to_the_cart(chat):
+    session = session_after(chat, 'add-product', ["Quero 100 livros grampo 14x21 com shrink",
+                                                  "adiciona 50 livros grampo 21x29,7 com laminação brilho"])
+    assert session.itens_carrinho == 1
+    assert session.tamanho == '21x29,7'
+
+@pytest.mark.parametrize('message, another', [
+    ("adiciona laminação fosca", False),
+    ("também quero shrink", False),
+    ("adicionar outro produto", True),
+    ("acrescenta mais um livro", True),
+    ("também quero 50 livros capa dura 14x21", True),
+])
+def test_wants_another_item(message, another):
+    from extraction import wants_another_item
+    assert wants_another_item(message) is another
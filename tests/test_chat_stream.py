@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from stubs import FakeOpenAI, start_pix_stub
+
+LEGACY_ACTION = '{"action": "generate_pix", "nome": "João da Silva", "cpf": "52998224725", "valor": 115.5}'
+
+def events(response):
+    """(event, data) pairs of a Server-Sent Events body"""
+    parsed = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+        if 'data' in lines:
+            parsed.append((lines.get('event', 'message'), json.loads(lines['data'])))
+    return parsed
+
+@pytest.fixture
+def chat_app(monkeypatch):
+    import app as chat_app
+    server, url = start_pix_stub(delay=0)
+    monkeypatch.setattr(chat_app, 'PIX_API_URL', url)
+    yield chat_app
+    server.shutdown()
+    server.server_close()
+
+def stream(chat_app, monkeypatch, session_id, text):
+    monkeypatch.setattr(chat_app, 'openai_client', FakeOpenAI(0, text=text))
+    client = chat_app.app.test_client()
+    return events(client.post('/chat/stream', json={'message': "Podem emitir a cobrança do meu pedido agora?",
+                                                    'session_id': session_id}))
+
+def test_legacy_pix_action_is_never_streamed(chat_app, monkeypatch):
+    sent = stream(chat_app, monkeypatch, 'stream-json', '  ' + LEGACY_ACTION)
+    deltas = "".join(data['delta'] for event, data in sent if 'delta' in data)
+    assert deltas == ""
+    assert [event for event, _ in sent][-2:] == ['replace', 'done']
+    assert '52998224725' not in sent[-2][1]['response']
+
+def test_plain_reply_is_streamed(chat_app, monkeypatch):
+    sent = stream(chat_app, monkeypatch, 'stream-text', "Claro, já vou verificar o seu pedido.")
+    assert "".join(data.get('delta', '') for _, data in sent).strip() == "Claro, já vou verificar o seu pedido."
+    assert [event for event, _ in sent][-1] == 'done'
@@ -0,0 +1,29 @@
+import pytest
+
+from stubs import FakeOpenAI
+
+@pytest.fixture
+def chat(monkeypatch):
+    import app as chat_app
+    monkeypatch.setattr(chat_app, 'openai_client', FakeOpenAI(0))
+    return chat_app, chat_app.app.test_client()
+
+def send(client, session_id, message):
+    return client.post('/chat', json={'message': message, 'session_id': session_id})
+
+def test_negated_option_is_not_recorded_and_goes_to_openai(chat):
+    chat_app, client = chat
+    send(client, 'negated', "Quero 100 livros grampo 14x21")
+    reply = send(client, 'negated', "não quero shrink")
+    assert reply.headers['X-Reply-Source'] == 'openai'
+    assert 'Shrink' not in reply.get_json()['response']
+    with chat_app.app.app_context():
+        assert chat_app.CustomerSession.query.filter_by(session_id='negated').first().opcoes is None
+
+def test_sem_option_of_the_catalog_is_answered_locally(chat):
+    chat_app, client = chat
+    send(client, 'sem-shrink', "Quero 100 livros grampo 14x21")
+    reply = send(client, 'sem-shrink', "sem shrink")
+    assert reply.headers['X-Reply-Source'] == 'local'
+    with chat_app.app.app_context():
+        assert chat_app.CustomerSession.query.filter_by(session_id='sem-shrink').first().opcoes == 'Sem Shrink'
@@ -0,0 +1,59 @@
+import pytest
+
+from stubs import start_pix_stub
+from freight import (
+    MelhorEnvioProvider, book_load, package_for, shipment_package, FREIGHT_BOX_MAX_WEIGHT, FREIGHT_BOX_MAX_HEIGHT
+)
+
+@pytest.fixture
+def freight_url():
+    server, url = start_pix_stub(delay=0)
+    yield server, url.replace('/api/pagamento', '/api/v2/me/shipment/calculate')
+    server.shutdown()
+    server.server_close()
+
+def test_package_grows_with_quantity_and_pages():
+    one = package_for('Livro Grampo (canoa)', '14x21', 1)
+    hundred = package_for('Livro Grampo (canoa)', '14x21', 100)
+    thick = package_for('Livro Grampo (canoa)', '14x21', 100, 400)
+    assert (one['largura'], one['comprimento']) == (14, 21)
+    assert hundred['peso'] > one['peso'] and hundred['altura'] > one['altura']
+    assert thick['peso'] > hundred['peso']
+
+def test_large_order_ships_in_boxes_within_carrier_limits():
+    package = package_for('Livro Capa Dura', '21x29,7', 1000, 200)
+    assert package['volumes'] > 1
+    assert package['peso'] <= FREIGHT_BOX_MAX_WEIGHT
+    assert package['altura'] <= FREIGHT_BOX_MAX_HEIGHT
+    load = book_load('Livro Capa Dura', '21x29,7', 1000, 200)
+    assert package['peso'] * package['volumes'] >= load['peso']
+    assert package['altura'] * package['volumes'] >= load['altura']
+
+def test_cart_boxes_every_line_on_the_largest_footprint():
+    lines = [
+        {'produto': 'Livro Capa Dura', 'tamanho': '14x21', 'quantidade': 50},
+        {'produto': 'Livro Grampo (canoa)', 'tamanho': '21x29,7', 'quantidade': 30},
+    ]
+    package = shipment_package(lines)
+    assert (package['largura'], package['comprimento']) == (21, 30)
+    assert package['peso'] >= max(package_for(line['produto'], line['tamanho'], line['quantidade'])['peso'] for line in lines)
+
+def test_melhor_envio_quotes_every_box(freight_url):
+    server, url = freight_url
+    provider = MelhorEnvioProvider(url=url, token='test')
+    provider.quote('01310100', '20040002', package_for('Livro Grampo (canoa)', '14x21', 100))
+    assert 'package' in server.last_payload and 'volumes' not in server.last_payload
+
+    package = package_for('Livro Capa Dura', '21x29,7', 1000, 200)
+    provider.quote('01310100', '20040002', package)
+    assert len(server.last_payload['volumes']) == package['volumes']
+    assert server.last_payload['volumes'][0]['weight'] == package['peso']
+
+def test_precomputed_profiles_are_the_boxes_of_usual_orders():
+    from catalog import get_catalog
+    from freight import catalog_package_profiles, package_key
+    produto = get_catalog().produtos[0]
+    tamanho = get_catalog().tamanhos[produto][0]
+    profiles = {package_key(package) for package in catalog_package_profiles()}
+    for quantidade in (1, 100, 500):
+        assert package_key(shipment_package([{'produto': produto, 'tamanho': tamanho, 'quantidade': quantidade}])) in profiles
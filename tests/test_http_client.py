@@ -0,0 +1,137 @@
+import socket
+import time
+
+import pytest
+import requests
+
+from stubs import start_pix_stub
+from http_client import OutboundClient, CircuitBreaker, CircuitOpenError
+from freight import MelhorEnvioProvider
+
+PAYLOAD = {"name": "Cliente Teste", "cpfCnpj": "52998224725", "value": 60.0, "billingType": "pix"}
+
+@pytest.fixture
+def stub():
+    server, url = start_pix_stub(delay=0)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def test_pooled_client_reuses_one_connection(stub):
+    server, url = stub
+    client = OutboundClient('test')
+    for _ in range(5):
+        assert client.post(url, json=PAYLOAD).status_code == 200
+    assert server.requests == 5
+    assert server.connections == 1
+
+def test_post_retried_on_503(stub):
+    server, url = stub
+    server.fail_next = 2
+    response = OutboundClient('test', retries=2).post(url, json=PAYLOAD)
+    assert response.status_code == 200
+    assert server.requests == 3
+
+def test_pix_charge_succeeds_after_503s(stub, monkeypatch):
+    import app as chat_app
+    server, url = stub
+    monkeypatch.setattr(chat_app, 'PIX_API_URL', url)
+    server.fail_next = 2
+    result = chat_app.generate_pix("Cliente Teste", "52998224725", 60.0, "Teste")
+    assert result['success']
+    assert server.requests == 3
+
+@pytest.mark.parametrize('status', [500, 502, 504])
+def test_post_not_retried_on_server_errors(stub, status):
+    server, url = stub
+    server.fail_next, server.fail_status = 1, status
+    response = OutboundClient('test', retries=2).post(url, json=PAYLOAD)
+    assert response.status_code == status
+    assert server.requests == 1
+
+@pytest.mark.parametrize('status', [500, 502, 504])
+def test_idempotent_call_retried_on_server_errors(stub, status):
+    server, url = stub
+    server.fail_next, server.fail_status = 1, status
+    response = OutboundClient('test', retries=2).post(url, idempotent=True, json=PAYLOAD)
+    assert response.status_code == 200
+    assert server.requests == 2
+
+def test_post_not_retried_on_read_timeout(stub):
+    server, url = stub
+    server.stall_next, server.stall = 1, 0.5
+    client = OutboundClient('test', read_timeout=0.1, retries=2)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.post(url, json=PAYLOAD)
+    time.sleep(0.6)
+    assert server.requests == 1
+
+def test_idempotent_call_retried_on_read_timeout(stub):
+    server, url = stub
+    server.stall_next, server.stall = 1, 0.5
+    response = OutboundClient('test', read_timeout=0.1, retries=2).post(url, idempotent=True, json=PAYLOAD)
+    assert response.status_code == 200
+    assert server.requests == 2
+
+def test_post_retried_when_connection_times_out():
+    client = OutboundClient('test', connect_timeout=0.05, retries=2)
+    attempts = []
+    def refuse(*args, **kwargs):
+        attempts.append(1)
+        raise requests.exceptions.ConnectTimeout("connect timed out")
+    client.session.request = refuse
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        client.post("http://127.0.0.1:9/api/pagamento", json=PAYLOAD)
+    assert len(attempts) == 3
+
+def test_circuit_opens_and_fails_fast():
+    client = OutboundClient('dead', connect_timeout=0.2, retries=0)
+    client.breaker = CircuitBreaker('dead', threshold=3, reset_timeout=60)
+    dead_url = f"http://127.0.0.1:{free_port()}/api/pagamento"
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError) as error:
+            client.post(dead_url, json=PAYLOAD)
+        assert not isinstance(error.value, CircuitOpenError)
+    assert client.breaker.state == 'open'
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        client.post(dead_url, json=PAYLOAD)
+    assert time.perf_counter() - started < 0.05
+
+def test_half_open_circuit_allows_one_trial_and_closes_on_success(stub):
+    server, url = stub
+    client = OutboundClient('test', retries=0)
+    client.breaker = CircuitBreaker('test', threshold=1, reset_timeout=0.05)
+    server.fail_next = 1
+    assert client.post(url, json=PAYLOAD).status_code == 503
+    assert client.breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.post(url, json=PAYLOAD)
+
+    time.sleep(0.06)
+    assert client.breaker.state == 'half_open'
+    assert client.breaker.allow()
+    assert not client.breaker.allow()
+    client.breaker.record_success()
+    assert client.post(url, json=PAYLOAD).status_code == 200
+    assert client.breaker.state == 'closed'
+
+def test_freight_quote_picks_cheapest_service(stub):
+    server, url = stub
+    provider = MelhorEnvioProvider(url=url.replace('/api/pagamento', '/api/v2/me/shipment/calculate'), token='test')
+    quoted = provider.quote('01310100', '20040002', {"altura": 10, "largura": 15, "comprimento": 20, "peso": 0.5})
+    assert quoted == {"success": True, "valor": 18.4, "prazo": "7 dias úteis", "servico": "PAC"}
+
+def test_freight_quote_retried_after_503(stub):
+    server, url = stub
+    server.fail_next = 1
+    provider = MelhorEnvioProvider(url=url.replace('/api/pagamento', '/api/v2/me/shipment/calculate'), token='test')
+    quoted = provider.quote('01310100', '20040002', {"altura": 10, "largura": 15, "comprimento": 20, "peso": 0.5})
+    assert quoted['valor'] == 18.4
+    assert server.requests == 2
@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, create_engine, select
+
+from log_sink import LogSink
+
+def row(content, session_id='s1'):
+    return {"session_id": session_id, "role": "user", "content": content, "timestamp": datetime.utcnow()}
+
+@pytest.fixture
+def sink(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    table = Table('logs', MetaData(),
+                  Column('id', Integer, primary_key=True),
+                  Column('session_id', String(100), nullable=False),
+                  Column('role', String(20), nullable=False),
+                  Column('content', Text, nullable=False),
+                  Column('timestamp', String(40)))
+    sink = LogSink(table, mode='buffered', flush_rows=1000, flush_interval_ms=10)
+    sink.engine = engine  # driven by hand: no flusher thread
+    yield sink, engine, table
+    engine.dispose()
+
+def stored(engine, table):
+    with engine.connect() as conn:
+        return [content for (content,) in conn.execute(select(table.c.content).order_by(table.c.id))]
+
+def test_refused_row_is_dead_lettered_and_the_rest_inserted(sink, caplog):
+    sink, engine, table = sink
+    table.create(engine)
+    for content in ("oi", None, "quero 100 livros"):
+        sink.write(row(content))
+
+    with caplog.at_level(logging.ERROR, logger='log_sink.dead_letter'):
+        assert sink.flush() == 2
+    assert stored(engine, table) == ["oi", "quero 100 livros"]
+    assert sink.stats["dead_letters"] == 1
+    assert sink.pending_for('s1') == []
+    assert any('"content": null' in record.getMessage() for record in caplog.records if record.name == 'log_sink.dead_letter')
+
+def test_rows_kept_while_the_database_is_unavailable(sink):
+    sink, engine, table = sink
+    sink.write(row("oi"))
+    # Table missing: an OperationalError, not the row's fault
+    assert sink.flush() == 0
+    assert sink.stats["dead_letters"] == 0
+    assert [r['content'] for r in sink.pending_for('s1')] == ["oi"]
+
+    table.create(engine)
+    assert sink.flush() == 1
+    assert stored(engine, table) == ["oi"]
+
+def test_transactional_is_the_default_durability(monkeypatch):
+    import importlib
+    import log_sink
+    monkeypatch.delenv('LOG_DURABILITY', raising=False)
+    assert importlib.reload(log_sink).LOG_DURABILITY == 'transactional'
+    monkeypatch.undo()
+    importlib.reload(log_sink)
+
+def test_sync_waits_for_a_flush_in_flight(sink):
+    import threading
+    from sqlalchemy import event
+    sink, engine, table = sink
+    table.create(engine)
+    inserting, release = threading.Event(), threading.Event()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def slow_insert(*args):
+        inserting.set()
+        release.wait(5)
+
+    sink.write(row("oi"))
+    flusher = threading.Thread(target=sink.flush)
+    flusher.start()
+    assert inserting.wait(5)
+    sink.write(row("tchau"))
+    # A plain flush returns at once while another one is in flight
+    assert sink.flush() == 0
+
+    syncing = threading.Thread(target=sink.sync)
+    syncing.start()
+    syncing.join(0.1)
+    assert syncing.is_alive()
+    release.set()
+    syncing.join(5)
+    flusher.join(5)
+    assert stored(engine, table) == ["oi", "tchau"]
+    assert sink.pending_for('s1') == []
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from stubs import FakeOpenAI, start_pix_stub
+
+ORDER = ["Quero 100 livros grampo 14x21 com shrink", "Meu nome é João da Silva", "CPF 529.982.247-25, CEP 01310-100"]
+
+class RecordingExecutor:
+    """Stands in for the PIX worker pool: the test runs the queued jobs itself"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append((fn.__name__, *args))
+
+@pytest.fixture
+def chat(monkeypatch):
+    import app as chat_app
+    server, url = start_pix_stub(delay=0)
+    monkeypatch.setattr(chat_app, 'PIX_API_URL', url)
+    monkeypatch.setattr(chat_app, 'openai_client', FakeOpenAI(0))
+    monkeypatch.setattr(chat_app, 'pix_executor', RecordingExecutor())
+    yield chat_app, chat_app.app.test_client(), server
+    server.shutdown()
+    server.server_close()
+
+def send(client, session_id, message):
+    return client.post('/chat', json={'message': message, 'session_id': session_id}).get_json()
+
+def place_order(client, session_id):
+    for message in ORDER:
+        reply = send(client, session_id, message)
+    return reply['pix_job']['id']
+
+def job_state(chat_app, job_id):
+    with chat_app.app.app_context():
+        job = chat_app.db.session.get(chat_app.PixJob, job_id)
+        return job.status, job.pix_id, job.attempts
+
+def make_stale(chat_app, job_id, **values):
+    with chat_app.app.app_context():
+        stale = datetime.utcnow() - timedelta(seconds=chat_app.PIX_JOB_TIMEOUT + 1)
+        chat_app.db.session.execute(chat_app.update(chat_app.PixJob).where(chat_app.PixJob.id == job_id).values(
+            status='processing', updated_at=stale, **values
+        ))
+        chat_app.db.session.commit()
+
+def test_order_is_locked_while_its_pix_job_is_pending(chat):
+    chat_app, client, server = chat
+    job_id = place_order(client, 'lock')
+
+    for message in ["também quero 50 livros grampo 14x21", "CPF 111.444.777-35"]:
+        reply = send(client, 'lock', message)
+        assert reply['pix_job']['id'] == job_id
+        assert 'não pode ser alterado' in reply['response']
+
+    with chat_app.app.app_context():
+        assert chat_app.PixJob.query.filter_by(session_id='lock').count() == 1
+        session = chat_app.CustomerSession.query.filter_by(session_id='lock').first()
+        assert session.cpf == '52998224725'
+        assert session.itens_carrinho == 0
+
+def test_stale_job_without_a_charge_is_retried_after_reconciliation(chat):
+    chat_app, client, server = chat
+    job_id = place_order(client, 'stale')
+    make_stale(chat_app, job_id, attempts=1)
+
+    polled = client.get(f'/pix/jobs/{job_id}?session_id=stale').get_json()['pix_job']
+    assert polled['status'] == 'needs_reconciliation'
+    # Still locked: nothing is charged again before the gateway is asked
+    assert 'não pode ser alterado' in send(client, 'stale', "pode tentar de novo?")['response']
+    assert job_state(chat_app, job_id)[0] == 'needs_reconciliation'
+
+    chat_app.reconcile_pix_job(job_id)
+    assert job_state(chat_app, job_id)[0] == 'failed'
+    assert server.lookups == 1
+
+    retried = send(client, 'stale', "pode tentar de novo?")['pix_job']
+    assert (retried['id'], retried['status']) == (job_id, 'pending')
+    chat_app.run_pix_job(job_id)
+    assert job_state(chat_app, job_id)[0] == 'completed'
+    assert server.last_payload['externalReference'] == f"pixjob-{job_id}-2"
+
+def test_stale_job_whose_charge_went_out_completes_without_a_second_charge(chat):
+    chat_app, client, server = chat
+    job_id = place_order(client, 'sent')
+    # The worker sent the charge and died before recording the answer
+    assert chat_app.generate_pix("João da Silva", "52998224725", 115.5, "Pedido", referencia=f"pixjob-{job_id}-1")['success']
+    make_stale(chat_app, job_id, attempts=1)
+    client.get(f'/pix/jobs/{job_id}?session_id=sent')
+
+    chat_app.reconcile_pix_job(job_id)
+    status, pix_id, _ = job_state(chat_app, job_id)
+    assert (status, pix_id) == ('completed', server.charges[0]['id'])
+    assert server.requests == 1
+
+def test_error_after_the_charge_is_reconciled_not_resent(chat, monkeypatch):
+    chat_app, client, server = chat
+    job_id = place_order(client, 'crash')
+
+    def broken(*args):
+        raise RuntimeError("template error")
+    with monkeypatch.context() as patch:
+        patch.setattr(chat_app, 'render_order_reply', broken)
+        chat_app.run_pix_job(job_id)
+    status, pix_id, _ = job_state(chat_app, job_id)
+    assert status == 'needs_reconciliation' and pix_id == server.charges[0]['id']
+
+    reply = send(client, 'crash', "pode tentar de novo?")
+    assert 'confirmando' in reply['response']
+    chat_app.reconcile_pix_job(job_id)
+    assert job_state(chat_app, job_id)[0] == 'completed'
+    assert server.requests == 1 and server.lookups == 0
+
+def test_read_timeout_leaves_the_job_for_reconciliation(chat, monkeypatch):
+    import time
+    from http_client import get_outbound_client
+    chat_app, client, server = chat
+    job_id = place_order(client, 'timeout')
+
+    monkeypatch.setattr(get_outbound_client('pix'), 'timeout', (1, 0.1))
+    server.stall_next, server.stall = 1, 0.3
+    chat_app.run_pix_job(job_id)
+    assert job_state(chat_app, job_id)[0] == 'needs_reconciliation'
+
+    time.sleep(0.4)
+    chat_app.reconcile_pix_job(job_id)
+    status, pix_id, _ = job_state(chat_app, job_id)
+    assert (status, pix_id) == ('completed', server.charges[0]['id'])
+    assert len(server.charges) == 1
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+import retention
+
+def test_only_abandoned_chats_are_expired(tmp_path, monkeypatch):
+    import app as chat_app
+    chat_app.init_database()
+    monkeypatch.setattr(retention, 'RETENTION_BATCH_PAUSE_MS', 0)
+    old = datetime.utcnow() - timedelta(days=60)
+
+    with chat_app.app.app_context():
+        db = chat_app.db
+        for session_id, status, pix_gerado in [('ret-abandoned', 'em_andamento', False), ('ret-imported', 'importado', False),
+                                               ('ret-paid', 'em_andamento', True), ('ret-charging', 'em_andamento', False)]:
+            db.session.add(chat_app.CustomerSession(session_id=session_id, status=status, pix_gerado=pix_gerado,
+                                                    created_at=old, updated_at=old))
+        db.session.add(chat_app.PixJob(session_id='ret-charging', idempotency_key='ret-charging', kind='auto', status='completed', order_data='{}',
+                                       created_at=old, updated_at=old))
+        db.session.commit()
+
+        expired, _ = retention.expire_idle_sessions(db.engine, datetime.utcnow() - timedelta(days=30), archive_dir=str(tmp_path))
+        kept = {s.session_id for s in chat_app.CustomerSession.query.filter(chat_app.CustomerSession.session_id.like('ret-%'))}
+        assert expired == 1
+        assert kept == {'ret-imported', 'ret-paid', 'ret-charging'}
+        assert chat_app.PixJob.query.filter_by(session_id='ret-charging').count() == 1
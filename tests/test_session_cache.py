@@ -0,0 +1,41 @@
+import importlib
+
+import pytest
+
+@pytest.fixture
+def chat_app(monkeypatch):
+    import app as chat_app
+    chat_app.init_database()
+    monkeypatch.setattr(chat_app.session_cache, 'local', True)
+    chat_app.session_cache.clear()
+    yield chat_app
+    chat_app.session_cache.clear()
+
+def load_in_request(chat_app, session_id):
+    with chat_app.app.test_request_context():
+        return chat_app.get_or_create_customer_session(session_id).cpf
+
+def test_write_through_keeps_rows_autoflushed_before_the_commit(chat_app):
+    with chat_app.app.test_request_context():
+        chat_app.get_or_create_customer_session('autoflush')
+        chat_app.commit_unit_of_work()
+
+    with chat_app.app.test_request_context():
+        chat_app.update_customer_session('autoflush', cpf='52998224725')
+        # Any query autoflushes the row: is_modified() is False by the time of the commit
+        chat_app.PixJob.query.filter_by(session_id='autoflush').first()
+        chat_app.commit_unit_of_work()
+
+    cached, _ = chat_app.session_cache.get('autoflush')
+    assert cached is not None and cached.cpf == '52998224725'
+    assert load_in_request(chat_app, 'autoflush') == '52998224725'
+
+def test_local_cache_is_opt_in_without_a_shared_backend(monkeypatch):
+    import session_cache
+    monkeypatch.delenv('SESSION_CACHE_URL', raising=False)
+    monkeypatch.delenv('SESSION_CACHE_LOCAL', raising=False)
+    assert not importlib.reload(session_cache).SESSION_CACHE_LOCAL
+    monkeypatch.setenv('SESSION_CACHE_LOCAL', '1')
+    assert importlib.reload(session_cache).SESSION_CACHE_LOCAL
+    monkeypatch.undo()
+    importlib.reload(session_cache)